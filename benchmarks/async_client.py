@@ -0,0 +1,99 @@
+""" Requests per second of the threaded requests client against the asyncio httpx client,
+both talking to the local stub server (benchmarks/stub_coingecko.py) with a simulated round trip.
+
+Raw GETs at a few concurrency levels, then a cache-writing batch refresh of COINS coins, then a run
+where the stub throttles every 10th request to show both clients honour Retry-After.
+The rate limiter is lifted for the benchmark, the stub plays the API.
+
+    python benchmarks/async_client.py [REQUESTS] [COINS]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from api_client import http_client, async_http_client
+from cache import configure_engine
+from project_utils import CoinMetaData
+from stub_coingecko import stub_coingecko
+
+LATENCY = 0.05
+PARAMS = {'vs_currency': 'usd', 'days': 1}
+
+
+def sync_gets(url: str, n_requests: int, concurrency: int) -> None:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: http_client.get_with_size(url, PARAMS), range(n_requests)))
+
+
+async def async_gets(url: str, n_requests: int) -> None:
+    await asyncio.gather(*[async_http_client.get_with_size(url, PARAMS) for _ in range(n_requests)])
+    await async_http_client.aclose()
+
+
+def timed(label: str, n_requests: int, run) -> None:
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f"    {label:<34} {n_requests / elapsed:8.1f} req/s  ({elapsed:.2f} s)")
+
+
+def raw_gets(stub_url: str, n_requests: int) -> None:
+    url = f'{stub_url}/coins/bitcoin/market_chart'
+    print(f"{n_requests} GETs, {LATENCY * 1000:.0f} ms simulated round trip")
+    for concurrency in (1, 5, 20):
+        timed(f"requests, {concurrency} threads", n_requests, lambda: sync_gets(url, n_requests, concurrency))
+    timed(f"httpx asyncio, {async_http_client.ASYNC_MAX_CONCURRENCY} in flight", n_requests,
+          lambda: asyncio.run(async_gets(url, n_requests)))
+
+
+def batch_refresh(stub_url: str, n_coins: int) -> None:
+    urls = {CoinMetaData(f'coin-{i}', 'usd'): f'{stub_url}/coins/coin-{i}/market_chart' for i in range(n_coins)}
+    starting_dt = datetime.now(timezone.utc) - timedelta(days=1)
+    print(f"\nbatch refresh of {n_coins} coins (1 day each) into an empty cache")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'sync.db')}")
+        timed("get_time_series_batch", n_coins,
+              lambda: http_client.get_time_series_batch(urls, starting_dt, 'historical_data'))
+
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'async.db')}")
+
+        async def run():
+            results = await async_http_client.get_time_series_batch(urls, starting_dt, 'historical_data')
+            await async_http_client.aclose()
+            assert all(report.rows_upserted for _, report in results.values())
+
+        timed("async get_time_series_batch", n_coins, lambda: asyncio.run(run()))
+
+
+def throttled(n_requests: int) -> None:
+    print(f"\n{n_requests} GETs, every 10th answered with 429 + Retry-After: 1")
+    with stub_coingecko(latency=LATENCY, throttle_every=10) as stub:
+        url = f'{stub.url}/coins/bitcoin/market_chart'
+        timed("requests, 20 threads", n_requests, lambda: sync_gets(url, n_requests, 20))
+    print(f"    ({stub.throttled} throttled)")
+    with stub_coingecko(latency=LATENCY, throttle_every=10) as stub:
+        url = f'{stub.url}/coins/bitcoin/market_chart'
+        timed("httpx asyncio", n_requests, lambda: asyncio.run(async_gets(url, n_requests)))
+    print(f"    ({stub.throttled} throttled)")
+
+
+def main(n_requests: int = 200, n_coins: int = 50) -> None:
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+
+    with stub_coingecko(latency=LATENCY) as stub:
+        raw_gets(stub.url, n_requests)
+        batch_refresh(stub.url, n_coins)
+    throttled(n_requests // 4)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,70 @@
+""" Throughput of a bulk backfill of a year of COINS coins over the local stub server
+(benchmarks/stub_coingecko.py) with a simulated round trip, interrupted halfway and resumed.
+
+The stub answers every range 5-minutely, so rows per request are higher than CoinGecko's hourly windows;
+requests and resumption are what carry over.
+
+    python benchmarks/backfill.py [COINS]
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from api_client import http_client, backfill, plan_backfill
+from cache import configure_engine
+from project_utils import CoinMetaData
+from stub_coingecko import stub_coingecko
+
+LATENCY = 0.1
+
+
+class Interrupted(BaseException):
+    """ Stands in for a Ctrl+C or a killed process. """
+
+
+def report(label: str, result, requests: int) -> None:
+    print(f"    {label:<22} {requests:4d} requests, {result.rows_upserted:9,d} rows, "
+          f"{result.seconds:6.1f} s, {result.rows_per_second:9,.0f} rows/s")
+
+
+def main(n_coins: int = 5) -> None:
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+    coin_metas = [CoinMetaData(f'coin-{i}', 'usd') for i in range(n_coins)]
+    start = datetime.now(timezone.utc) - timedelta(days=364)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, stub_coingecko(latency=LATENCY) as stub:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        planned = sum(len(plan_backfill(coin_meta, start)) for coin_meta in coin_metas)
+        print(f"{n_coins} coins, a year each, {LATENCY * 1000:.0f} ms simulated round trip, {planned} planned requests")
+
+        done = 0
+
+        def interrupt_halfway(_):
+            nonlocal done
+            done += 1
+            if done == planned // 2:
+                raise Interrupted
+
+        try:
+            backfill(coin_metas, start, calls_per_minute=10 ** 6, api_url=stub.url, on_chunk=interrupt_halfway)
+        except Interrupted:
+            print(f"    interrupted after {done} requests")
+
+        before = stub.requests
+        resumed = backfill(coin_metas, start, calls_per_minute=10 ** 6, api_url=stub.url)
+        report('resumed', resumed, stub.requests - before)
+
+        with tempfile.TemporaryDirectory() as fresh_dir:
+            configure_engine(f"sqlite:///{os.path.join(fresh_dir, 'cache.db')}")
+            before = stub.requests
+            report('uninterrupted', backfill(coin_metas, start, calls_per_minute=10 ** 6, api_url=stub.url),
+                   stub.requests - before)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,56 @@
+""" Refreshing COINS coins into an empty cache one after another (get_time_series in a loop) against
+one get_time_series_batch call (parallel downloads, one write transaction), over the local stub server
+(benchmarks/stub_coingecko.py) with a simulated round trip. The rate limiter is lifted, the stub plays the API.
+
+    python benchmarks/batch_fetch.py [COINS]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from api_client import http_client
+from cache import configure_engine
+from config import BATCH_MAX_WORKERS
+from project_utils import CoinMetaData
+from stub_coingecko import stub_coingecko
+
+LATENCY = 0.3
+DAYS = 30
+
+
+def timed(label: str, stub, run) -> None:
+    before = stub.requests
+    started = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - started
+    rows = sum(report.rows_upserted for _, report in results.values())
+    print(f"    {label:<34} {elapsed:6.2f} s, {stub.requests - before:3d} requests, "
+          f"{rows:9,d} rows upserted, {rows / elapsed:9,.0f} rows/s")
+
+
+def main(n_coins: int = 20) -> None:
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+    starting_dt = datetime.now(timezone.utc) - timedelta(days=DAYS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, stub_coingecko(latency=LATENCY) as stub:
+        urls = {CoinMetaData(f'coin-{i}', 'usd'): f'{stub.url}/coins/coin-{i}/market_chart' for i in range(n_coins)}
+        print(f"{n_coins} coins, {DAYS} days each, {LATENCY * 1000:.0f} ms simulated round trip")
+
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'sequential.db')}")
+        timed('sequential get_time_series', stub,
+              lambda: {coin_meta: http_client.get_time_series(url, coin_meta, starting_dt, 'historical_data')
+                       for coin_meta, url in urls.items()})
+
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'batch.db')}")
+        timed(f'get_time_series_batch ({BATCH_MAX_WORKERS} workers)', stub,
+              lambda: http_client.get_time_series_batch(urls, starting_dt, 'historical_data'))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,86 @@
+""" Downsampled reads of a YEARS-long 5-minute OHLC history: the whole series loaded into a frame,
+then filtered and resampled in pandas, against fetch_columns(start, end, bucket_ms=...) aggregating
+inside SQLite. Rows read from the cache, best of REPEATS, and whether both give the same bars.
+
+    python benchmarks/bucket_pushdown.py [YEARS]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+import pandas as pd
+
+from cache import CacheManager, configure_engine, get_connection
+from cache.cache_manager import BUCKET_AGGREGATIONS
+from project_utils import CoinMetaData, make_time_series_frame, utc_from_cached_ts
+
+COIN_META = CoinMetaData('bitcoin', 'usd')
+START_MS = 1_600_000_000_000
+STEP_MS = 300_000
+REPEATS = 3
+OHLC_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+def fill_cache(n_rows: int) -> int:
+    timestamps = START_MS + np.arange(n_rows) * STEP_MS
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.002, n_rows)))
+    with CacheManager(COIN_META, 'ohlc_data') as cache:
+        cache.upsert(np.c_[timestamps, close, close * 1.002, close * 0.998, close].tolist())
+    return int(timestamps[-1])
+
+
+def in_pandas(start, end, bucket: timedelta) -> tuple[pd.DataFrame, int]:
+    with get_connection() as conn:
+        frame = make_time_series_frame(CacheManager(COIN_META, 'ohlc_data', conn=conn).fetch_columns(), COIN_META)
+    rows_read = len(frame)
+    window = frame.loc[start:end, OHLC_COLUMNS]
+    bars = (window
+            .resample(bucket, origin='epoch')
+            .agg({col: BUCKET_AGGREGATIONS[col] for col in OHLC_COLUMNS})
+            .dropna())
+    return bars, rows_read
+
+
+def pushed_down(start, end, bucket: timedelta) -> tuple[pd.DataFrame, int]:
+    with get_connection() as conn:
+        data = CacheManager(COIN_META, 'ohlc_data', conn=conn).fetch_columns(
+            start, end, bucket_ms=int(bucket.total_seconds() * 1000))
+    bars = make_time_series_frame(data, COIN_META)[OHLC_COLUMNS]
+    return bars, len(bars)
+
+
+def best_of(run) -> tuple[float, pd.DataFrame, int]:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        bars, rows_read = run()
+        timings.append(time.perf_counter() - started)
+    return min(timings), bars, rows_read
+
+
+def main(years: int = 3) -> None:
+    n_rows = years * 365 * 86_400_000 // STEP_MS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        end = utc_from_cached_ts(fill_cache(n_rows))
+        print(f"{n_rows:,} cached 5-minute candles ({years} years), best of {REPEATS}")
+
+        for label, span, bucket in (('30 days in 4h bars', timedelta(days=30), timedelta(hours=4)),
+                                    ('1 year in 1D bars', timedelta(days=365), timedelta(days=1)),
+                                    (f'{years} years in 1W bars', timedelta(days=365 * years), timedelta(days=7))):
+            start = end - span
+            pandas_s, expected, pandas_rows = best_of(lambda: in_pandas(start, end, bucket))
+            pushed_s, bars, pushed_rows = best_of(lambda: pushed_down(start, end, bucket))
+            same = expected.index.equals(bars.index) and np.allclose(expected.to_numpy(), bars.to_numpy())
+            print(f"    {label:<20} pandas {pandas_rows:8,d} rows {pandas_s * 1000:7.1f} ms, "
+                  f"pushed down {pushed_rows:6,d} rows {pushed_s * 1000:6.1f} ms, same bars: {same}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
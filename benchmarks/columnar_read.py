@@ -0,0 +1,86 @@
+""" Reading N cached 5-minute rows into a frame through CacheManager.fetch_local (one dict per row)
+against fetch_columns (typed NumPy columns), from a warm cache.
+
+Each path runs in a freshly spawned process, so its peak RSS growth (ru_maxrss after the reads minus
+before them) isn't hidden by the other path's allocations or by the cache being filled. Best of REPEATS for the timing.
+
+    python benchmarks/columnar_read.py [N]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+
+from cache import CacheManager, configure_engine, get_connection
+from project_utils import CoinMetaData, make_time_series_frame
+
+COIN_META = CoinMetaData('bitcoin', 'usd')
+START_MS = 1_600_000_000_000
+STEP_MS = 300_000
+REPEATS = 3
+
+
+def fill_cache(db_url: str, n_rows: int) -> None:
+    configure_engine(db_url)
+    timestamps = START_MS + np.arange(n_rows) * STEP_MS
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.002, n_rows)))
+    with CacheManager(COIN_META, 'historical_data') as cache:
+        cache.upsert({'prices': np.c_[timestamps, prices].tolist(),
+                      'market_caps': np.c_[timestamps, prices * 1e9].tolist(),
+                      'total_volumes': np.c_[timestamps, prices * 1e6].tolist()})
+
+
+def read(columnar: bool):
+    with get_connection() as conn:
+        cache = CacheManager(COIN_META, 'historical_data', conn=conn)
+        data = cache.fetch_columns() if columnar else cache.fetch_local()
+    return make_time_series_frame(data, COIN_META)
+
+
+def run_path(db_url: str, columnar: bool, results) -> None:
+    configure_engine(db_url)
+    rss_before = _peak_rss_bytes()
+    read(columnar)  # warm the page cache
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        n_rows = len(read(columnar))
+        timings.append(time.perf_counter() - started)
+    results.put((n_rows, min(timings), _peak_rss_bytes() - rss_before))
+
+
+def _peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def main(n_rows: int = 300_000) -> None:
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}"
+        # filled in a child too: ru_maxrss survives fork + exec, so the parent has to stay small
+        filler = context.Process(target=fill_cache, args=(db_url, n_rows))
+        filler.start()
+        filler.join()
+        print(f"{n_rows:,} cached rows, read into a frame, best of {REPEATS}")
+
+        for label, columnar in (('fetch_local (dicts)', False), ('fetch_columns (numpy)', True)):
+            results = context.Queue()
+            process = context.Process(target=run_path, args=(db_url, columnar, results))
+            process.start()
+            rows, seconds, rss_growth = results.get()
+            process.join()
+            print(f"    {label:<22} {rows / seconds:10,.0f} rows/s ({seconds * 1000:6.1f} ms), "
+                  f"peak RSS +{rss_growth / 1024 ** 2:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
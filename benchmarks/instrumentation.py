@@ -0,0 +1,93 @@
+""" Cost of the instrumentation hooks, disabled (the default) and recording into InMemoryMetrics,
+then one fetch -> cache -> session -> plot pass over the local stub server with the metrics it produced.
+
+    python benchmarks/instrumentation.py [CALLS]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+
+from api_client import http_client, coingecko
+from api_client.coingecko import _market_chart_url, _ohlc_url
+from cache import configure_engine
+from data_prep import OHLCSessionMaker
+from project_utils import CoinMetaData, InMemoryMetrics, set_metrics, get_metrics, timer, timed, prometheus_text
+from stub_coingecko import stub_coingecko
+from visualizations import HistPlotter, OHLCPlotter
+
+
+@timed('noop_seconds')
+def decorated():
+    pass
+
+
+def plain():
+    pass
+
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def with_timer():
+    with timer('noop_seconds', table='historical_data'):
+        pass
+
+
+def with_counter():
+    get_metrics().inc('noop_total', 1, table='historical_data')
+
+
+def hook_overhead(calls: int) -> None:
+    print(f"per call, over {calls:,} calls")
+    baseline = per_call_ns(plain, calls)
+    for label, metrics in (('disabled', None), ('InMemoryMetrics', InMemoryMetrics())):
+        set_metrics(metrics)
+        print(f"    {label:<16} @timed {per_call_ns(decorated, calls) - baseline:6.0f} ns, "
+              f"timer() {per_call_ns(with_timer, calls) - baseline:6.0f} ns, "
+              f"inc() {per_call_ns(with_counter, calls) - baseline:6.0f} ns")
+    set_metrics(None)
+
+
+def pipeline() -> None:
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+    metrics = InMemoryMetrics()
+    set_metrics(metrics)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, stub_coingecko(latency=0.05, throttle_every=2) as stub:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        coingecko._market_chart_url = lambda coin_meta: _market_chart_url(coin_meta, stub.url)
+        coingecko._ohlc_url = lambda coin_meta: _ohlc_url(coin_meta, stub.url)
+
+        coin_meta = CoinMetaData('bitcoin', 'usd')
+        for _ in range(2):
+            hist_df, ohlc_df = coingecko.get_historical_data(coin_meta), coingecko.get_ohlc_data(coin_meta)
+        OHLCSessionMaker(hist_df, ohlc_df).make_session()
+        HistPlotter(hist_df).plot_price()
+        OHLCPlotter(OHLCSessionMaker(hist_df, ohlc_df).make_session(), plot_size=(10, 5)).plot_candlestick(True)
+        plt.close('all')
+
+    print("\nmetrics of one pipeline pass (every 2nd request throttled):\n")
+    print(prometheus_text(metrics))
+    set_metrics(None)
+
+
+def main(calls: int = 1_000_000) -> None:
+    hook_overhead(calls)
+    pipeline()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,115 @@
+""" Milliseconds per frame of a chart following one coin's cache while its history grows (Agg backend):
+re-reading the cache and plotting a new figure on every upsert, against the live charts of
+HistPlotter.plot_live and OHLCPlotter.plot_candlestick_live, which only apply the upserted rows
+(poll draws the figure: draw_idle is synchronous on Agg).
+
+    python benchmarks/live_chart.py [MAX_ROWS]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from cache import configure_engine, CacheManager, get_connection
+from data_prep import OHLCSessionMaker
+from project_utils import CoinMetaData, make_time_series_frame
+from visualizations import HistPlotter, OHLCPlotter
+
+START_MS = 1_600_000_000_000
+STEP_MS = 300_000   # 5-minute rows
+UPDATES = 10
+PLOT_SIZE = (10, 6)
+
+
+class Feed:
+    """ Writes a random walk to both cache tables of one coin, a batch of rows per upsert. """
+
+    def __init__(self, coin_meta: CoinMetaData):
+        self.coin_meta = coin_meta
+        self.rows = 0
+        self._rng = np.random.default_rng(0)
+        self._price = 100.0
+
+    def write(self, n_rows: int) -> None:
+        timestamps = START_MS + np.arange(self.rows, self.rows + n_rows) * STEP_MS
+        prices = self._price * np.exp(np.cumsum(self._rng.normal(0, 0.002, n_rows)))
+        self._price = prices[-1]
+        self.rows += n_rows
+
+        with CacheManager(self.coin_meta, 'historical_data') as cache_manager:
+            cache_manager.upsert({'prices': np.c_[timestamps, prices].tolist(),
+                                  'market_caps': np.c_[timestamps, prices * 1e7].tolist(),
+                                  'total_volumes': np.c_[timestamps, prices * 1e4].tolist()})
+        with CacheManager(self.coin_meta, 'ohlc_data') as cache_manager:
+            cache_manager.upsert(np.c_[timestamps, prices, prices * 1.001, prices * 0.999, prices].tolist())
+
+    def frames(self):
+        with get_connection() as conn:
+            return [make_time_series_frame(CacheManager(self.coin_meta, table_name, conn=conn).fetch_columns(),
+                                           self.coin_meta)
+                    for table_name in ('historical_data', 'ohlc_data')]
+
+
+def replotted_line(feed: Feed) -> None:
+    hist_df, _ = feed.frames()
+    ax = HistPlotter(hist_df, PLOT_SIZE).plot_price()
+    ax.figure.canvas.draw()
+    plt.close(ax.figure)
+
+
+def replotted_candles(feed: Feed) -> None:
+    hist_df, ohlc_df = feed.frames()
+    fig, _ = OHLCPlotter(OHLCSessionMaker(hist_df, ohlc_df).make_session(), PLOT_SIZE).plot_candlestick(has_volume=True)
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def frame_ms(feed: Feed, draw_frame) -> float:
+    timings = []
+    for _ in range(UPDATES):
+        feed.write(1)
+        started = time.perf_counter()
+        draw_frame()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(max_rows: int = 100_000) -> None:
+    sizes = [n for n in (1_000, 10_000, 100_000, 1_000_000) if n <= max_rows]
+    print(f"5-minute rows, median of {UPDATES} upserts of one new row, frame time in ms")
+    print(f"    {'history':>9} {'replot line':>12} {'live line':>10} {'replot candles':>15} {'live candles':>13}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        for n_rows in sizes:
+            feed = Feed(CoinMetaData(f'coin-{n_rows}', 'usd'))
+            feed.write(n_rows)
+
+            replot_line = frame_ms(feed, lambda: replotted_line(feed))
+            replot_candles = frame_ms(feed, lambda: replotted_candles(feed))
+
+            hist_df, ohlc_df = feed.frames()
+            with HistPlotter(hist_df, PLOT_SIZE).plot_live(max_fps=10 ** 6) as line, \
+                    OHLCPlotter(OHLCSessionMaker(hist_df, ohlc_df).make_session(), PLOT_SIZE) \
+                    .plot_candlestick_live(has_volume=True, max_fps=10 ** 6) as candles:
+                live_line = frame_ms(feed, line.poll)
+                live_candles = frame_ms(feed, candles.poll)
+                plt.close(line.figure)
+                plt.close(candles.figure)
+
+            print(f"    {n_rows:>9,} {replot_line:>12.1f} {live_line:>10.1f} "
+                  f"{replot_candles:>15.1f} {live_candles:>13.1f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
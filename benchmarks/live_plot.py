@@ -0,0 +1,86 @@
+""" Frames per second of a COINS-coin price dashboard receiving one new row per update (Agg backend):
+a figure per coin through HistPlotter, rebuilding one small-multiples figure, and
+MultiSeriesPlotter.update with a full redraw and with blitting.
+
+    python benchmarks/live_plot.py [COINS]
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+
+from project_utils import CoinMetaData, make_time_series_frame, cached_ts_from_utc
+from visualizations import HistPlotter, MultiSeriesPlotter
+
+HOURS = 30 * 24
+UPDATES = 20
+
+
+def make_series(n_coins: int) -> pd.DataFrame:
+    """ Hourly prices with UPDATES rows more than the first frame shows, fed in one row at a time. """
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2024-01-01', periods=HOURS + UPDATES, freq='1h', tz='UTC', name='datetime')
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(index), n_coins)), axis=0))
+    columns = pd.MultiIndex.from_tuples([(f'coin-{i:03d}', 'usd') for i in range(n_coins)],
+                                        names=CoinMetaData._fields)
+    return pd.DataFrame(prices, index=index, columns=columns)
+
+
+def frame_seconds(draw_frame, series: pd.DataFrame) -> list[float]:
+    timings = []
+    for n in range(UPDATES):
+        window = series.iloc[:HOURS + n + 1]
+        started = time.perf_counter()
+        draw_frame(window)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def figure_per_coin(window: pd.DataFrame) -> None:
+    timestamps = [cached_ts_from_utc(dt) for dt in window.index]
+    for coin_id, currency in window.columns:
+        frame = make_time_series_frame({'timestamp': timestamps, 'price': window[coin_id, currency].to_numpy()},
+                                       CoinMetaData(coin_id, currency))
+        ax = HistPlotter(frame, plot_size=(3, 2)).plot_price()
+        ax.figure.canvas.draw()
+        plt.close(ax.figure)
+
+
+def rebuilt_grid(window: pd.DataFrame) -> None:
+    plotter = MultiSeriesPlotter(blit=False)
+    plotter.plot(window)
+    plotter.figure.canvas.draw()
+    plt.close(plotter.figure)
+
+
+def main(n_coins: int = 50) -> None:
+    series = make_series(n_coins)
+    print(f"{n_coins} coins, {HOURS} hourly rows, {UPDATES} updates of one new row each")
+
+    results = [('figure per coin (HistPlotter)', frame_seconds(figure_per_coin, series), None),
+               ('rebuilt small-multiples figure', frame_seconds(rebuilt_grid, series), None)]
+    for label, blit in (('update in place, full redraw', False), ('update in place, blitting', True)):
+        plotter = MultiSeriesPlotter(blit=blit)
+        plotter.plot(series.iloc[:HOURS])
+        blitted = []
+        timings = frame_seconds(lambda window: blitted.append(plotter.update(window)), series)
+        results.append((label, timings, sum(blitted)))
+        plt.close(plotter.figure)
+
+    for label, timings, blitted in results:
+        note = f"  ({blitted}/{UPDATES} blitted)" if blitted is not None else ''
+        print(f"    {label:<34} {len(timings) / sum(timings):7.2f} fps, "
+              f"median frame {statistics.median(timings) * 1000:7.1f} ms{note}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,112 @@
+""" Loading COINS cached series as one aligned panel and computing returns, rolling volatility,
+correlations and a market-cap-weighted index, against the per-coin loop (a frame per coin,
+set_dt_index_using_ts_column, resample and join).
+
+Writes COINS coins of 90 days of 5-minute historical data, each sampled at its own offset like CoinGecko does.
+
+    python benchmarks/panel_analytics.py [COINS]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+import pandas as pd
+
+from cache import CacheManager, configure_engine, get_connection
+from panel import load_panel, period_returns, rolling_volatility, correlation_matrix, market_cap_weighted_index
+from project_utils import CoinMetaData, make_time_series_frame, set_dt_index_using_ts_column
+
+DAYS = 90
+STEP_MS = 5 * 60 * 1000
+START = 1_700_000_000_000
+FREQ = '1h'
+WINDOW = 24
+REPEATS = 5
+
+
+def write_cache(coin_metas: list[CoinMetaData]) -> None:
+    rng = np.random.default_rng(0)
+    n_rows = DAYS * 86_400_000 // STEP_MS
+    for coin_meta in coin_metas:
+        timestamps = START + int(rng.integers(0, STEP_MS)) + np.arange(n_rows) * STEP_MS
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_rows)))
+        supply = rng.uniform(1e6, 1e8)
+        with CacheManager(coin_meta, 'historical_data') as cache:
+            cache.upsert({'prices': np.column_stack([timestamps, prices]).tolist(),
+                          'market_caps': np.column_stack([timestamps, prices * supply]).tolist(),
+                          'total_volumes': np.column_stack([timestamps, prices * supply / 50]).tolist()})
+
+
+def per_coin_loop(coin_metas: list[CoinMetaData]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    prices, market_caps = {}, {}
+    with get_connection() as conn:
+        for coin_meta in coin_metas:
+            frame = make_time_series_frame(
+                CacheManager(coin_meta, 'historical_data', conn=conn).fetch_columns(), coin_meta)
+            hourly = set_dt_index_using_ts_column(frame)[['price', 'market_cap']].resample(FREQ).last()
+            prices[tuple(coin_meta)] = hourly['price']
+            market_caps[tuple(coin_meta)] = hourly['market_cap']
+    return pd.DataFrame(prices), pd.DataFrame(market_caps)
+
+
+def per_coin_analytics(coin_metas: list[CoinMetaData]) -> tuple:
+    prices, market_caps = per_coin_loop(coin_metas)
+    returns = {column: prices[column].pct_change(fill_method=None) for column in prices}
+    volatility = {column: changes.rolling(WINDOW).std() for column, changes in returns.items()}
+    correlations = pd.DataFrame(returns).corr()
+
+    weights = market_caps.shift(1)
+    returns = pd.DataFrame(returns)
+    index_returns = (returns * weights).sum(axis=1) / weights.where(returns.notna()).sum(axis=1)
+    index = 100 * (1 + index_returns.fillna(0)).cumprod()
+    return returns, pd.DataFrame(volatility), correlations, index
+
+
+def panel_analytics(coin_metas: list[CoinMetaData]) -> tuple:
+    panel = load_panel(coin_metas, columns=['price', 'market_cap'], freq=FREQ)
+    prices = panel.frame('price')
+    returns = period_returns(prices)
+    return (returns, rolling_volatility(returns, WINDOW), correlation_matrix(returns),
+            market_cap_weighted_index(prices, panel.frame('market_cap')))
+
+
+def best_of(fn, *args) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(n_coins: int = 50) -> None:
+    coin_metas = [CoinMetaData(f'coin-{i:03d}', 'usd') for i in range(n_coins)]
+    print(f"{n_coins} coins x {DAYS} days of 5-minute rows, {FREQ} panel, best of {REPEATS}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        write_cache(coin_metas)
+
+        loop_results, panel_results = per_coin_analytics(coin_metas), panel_analytics(coin_metas)
+        for loop_result, panel_result in zip(loop_results, panel_results):
+            np.testing.assert_allclose(np.asarray(loop_result, dtype=float),
+                                       np.asarray(panel_result, dtype=float), rtol=1e-9, equal_nan=True)
+
+        loop_load, panel_load = best_of(per_coin_loop, coin_metas), best_of(load_panel, coin_metas, 'historical_data',
+                                                                           ['price', 'market_cap'], FREQ)
+        loop_total, panel_total = best_of(per_coin_analytics, coin_metas), best_of(panel_analytics, coin_metas)
+
+    print(f"    {'':<24} {'per-coin loop':>14} {'panel':>10} {'speed-up':>9}")
+    for label, loop_time, panel_time in (('load + align', loop_load, panel_load),
+                                         ('load + analytics', loop_total, panel_total)):
+        print(f"    {label:<24} {loop_time * 1000:11.1f} ms {panel_time * 1000:7.1f} ms "
+              f"{loop_time / panel_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,79 @@
+""" cache.parsers.normalize_data on NumPy columns against the per-row dict parsers it replaced,
+on CoinGecko-shaped payloads: a day of 5-minute data, 90 days hourly, a year of 5-minute data
+(also with a few null values, which take the slower NaN path), and OHLC candles. Best of REPEATS.
+
+Parsing market_chart payloads alone is on par with the dicts (three arrays against one pass);
+what the columns save is downstream, where upsert binds positional rows and reads skip per-row dicts.
+
+    python benchmarks/parsers.py [REPEATS]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+
+from cache.db_schema import historical_data, ohlc_data
+from cache.parsers import normalize_data
+
+START_MS = 1_600_000_000_000
+
+
+def market_chart(n_rows: int, step_ms: int, nulls: bool = False) -> dict:
+    rng = np.random.default_rng(0)
+    timestamps = (START_MS + np.arange(n_rows) * step_ms).tolist()
+    series = {name: [[ts, value] for ts, value in zip(timestamps, (rng.random(n_rows) * scale).tolist())]
+              for name, scale in (('prices', 1e4), ('market_caps', 1e12), ('total_volumes', 1e10))}
+    if nulls:
+        for row in series['total_volumes'][::1000]:
+            row[1] = None
+    return series
+
+
+def ohlc(n_rows: int, step_ms: int) -> list:
+    rng = np.random.default_rng(0)
+    return [[START_MS + i * step_ms, *values] for i, values in enumerate((rng.random((n_rows, 4)) * 1e4).tolist())]
+
+
+def legacy_parse_historical(data: dict) -> list[dict]:
+    """ The parser as it was: one dict per row. """
+    return [{'timestamp': ts, 'price': pr, 'market_cap': mc, 'total_volume': tv}
+            for (ts, pr), (_, mc), (_, tv) in zip(data['prices'], data['market_caps'], data['total_volumes'])]
+
+
+def legacy_parse_ohlc(data: list) -> list[dict]:
+    return [{'timestamp': ts, 'open': op, 'high': hi, 'low': lo, 'close': cl} for ts, op, hi, lo, cl in data]
+
+
+def best_of(repeats: int, run) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(repeats: int = 5) -> None:
+    payloads = [
+        ('1 day, 5-minutely', historical_data, market_chart(288, 300_000), legacy_parse_historical),
+        ('90 days, hourly', historical_data, market_chart(90 * 24, 3_600_000), legacy_parse_historical),
+        ('365 days, 5-minutely', historical_data, market_chart(365 * 288, 300_000), legacy_parse_historical),
+        ('365 days, 5-min, nulls', historical_data, market_chart(365 * 288, 300_000, nulls=True),
+         legacy_parse_historical),
+        ('OHLC 30 days, 30-min', ohlc_data, ohlc(30 * 48, 1_800_000), legacy_parse_ohlc),
+        ('OHLC 365 days, 5-min', ohlc_data, ohlc(365 * 288, 300_000), legacy_parse_ohlc),
+    ]
+    print(f"best of {repeats}")
+    for label, table, payload, legacy_parse in payloads:
+        n_rows = len(payload['prices']) if isinstance(payload, dict) else len(payload)
+        dicts = best_of(repeats, lambda: legacy_parse(payload))
+        columns = best_of(repeats, lambda: normalize_data(payload, table))
+        print(f"    {label:<24} {n_rows:7,d} rows: dicts {dicts * 1000:7.2f} ms, "
+              f"numpy {columns * 1000:7.2f} ms ({n_rows / columns:12,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
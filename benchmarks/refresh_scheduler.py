@@ -0,0 +1,62 @@
+""" Foreground read latency with lazy refreshes against reads of series a RefreshScheduler keeps warm,
+over the local stub server (benchmarks/stub_coingecko.py) with a simulated round trip.
+
+    python benchmarks/refresh_scheduler.py [COINS]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from api_client import http_client, RefreshScheduler
+from api_client.coingecko import _market_chart_url
+from cache import configure_engine
+from project_utils import CoinMetaData
+from stub_coingecko import stub_coingecko
+
+LATENCY = 0.1
+
+
+def foreground_reads(api_url: str, coin_metas: list[CoinMetaData]) -> list[float]:
+    timings = []
+    for coin_meta in coin_metas:
+        started = time.perf_counter()
+        http_client.get_time_series(_market_chart_url(coin_meta, api_url), coin_meta, None, 'historical_data',
+                                    columnar=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label: str, timings: list[float], stub_requests: int) -> None:
+    print(f"    {label:<28} median {statistics.median(timings) * 1000:7.1f} ms, "
+          f"max {max(timings) * 1000:7.1f} ms, {stub_requests} API calls")
+
+
+def main(n_coins: int = 20) -> None:
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+    coin_metas = [CoinMetaData(f'coin-{i}', 'usd') for i in range(n_coins)]
+    print(f"{n_coins} coins, {LATENCY * 1000:.0f} ms simulated round trip, cache already holds 30 days")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, stub_coingecko(latency=LATENCY) as stub:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        foreground_reads(stub.url, coin_metas)  # initial fill
+
+        before = stub.requests
+        report('lazy refresh', foreground_reads(stub.url, coin_metas), stub.requests - before)
+
+        with RefreshScheduler(calls_per_minute=10 ** 6, api_url=stub.url) as scheduler:
+            scheduler.watch(coin_metas, tables=['historical_data'])
+            while scheduler.stats().overdue:
+                time.sleep(0.01)
+
+            before = stub.requests
+            report('kept warm by the scheduler', foreground_reads(stub.url, coin_metas), stub.requests - before)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,81 @@
+""" Render time to PNG (Agg) against series length, for HistPlotter.plot_price and
+OHLCPlotter.plot_candlestick, with decimation (the default) and at full resolution (decimate=False).
+
+Full-resolution candles take minutes past MAX_FULL_CANDLES, so they're skipped there.
+
+    python benchmarks/render_decimation.py [MAX_ROWS]
+"""
+import io
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from project_utils import CoinMetaData, make_time_series_frame
+from visualizations import HistPlotter, OHLCPlotter
+
+COIN_META = CoinMetaData('bitcoin', 'usd')
+START_MS = 1_600_000_000_000
+STEP_MS = 300_000   # 5-minute rows
+PLOT_SIZE = (10, 5)
+MAX_FULL_CANDLES = 10_000
+
+# full-resolution candles are the point here, not something to be warned about
+warnings.filterwarnings('ignore', category=UserWarning, module='mplfinance')
+logging.getLogger('matplotlib.ticker').setLevel(logging.ERROR)
+
+
+def make_frames(n_rows: int):
+    rng = np.random.default_rng(0)
+    timestamps = START_MS + np.arange(n_rows, dtype=np.int64) * STEP_MS
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    volume = rng.uniform(1e6, 1e7, n_rows)
+    hist = make_time_series_frame({'timestamp': timestamps, 'price': close,
+                                   'market_cap': close * 1e7, 'total_volume': volume}, COIN_META)
+    ohlc = make_time_series_frame({'timestamp': timestamps, 'open': open_,
+                                   'high': np.maximum(open_, close) * 1.001, 'low': np.minimum(open_, close) * 0.999,
+                                   'close': close, 'total_volume': volume}, COIN_META)
+    return hist, ohlc
+
+
+def render_line(hist, decimate: bool) -> float:
+    started = time.perf_counter()
+    ax = HistPlotter(hist, PLOT_SIZE, decimate=decimate).plot_price()
+    ax.figure.savefig(io.BytesIO(), format='png')
+    elapsed = time.perf_counter() - started
+    plt.close(ax.figure)
+    return elapsed
+
+
+def render_candles(ohlc, decimate: bool) -> float:
+    started = time.perf_counter()
+    fig, _ = OHLCPlotter(ohlc, PLOT_SIZE, decimate=decimate).plot_candlestick(has_volume=True)
+    fig.savefig(io.BytesIO(), format='png')
+    elapsed = time.perf_counter() - started
+    plt.close(fig)
+    return elapsed
+
+
+def main(max_rows: int = 300_000) -> None:
+    sizes = [n for n in (1_000, 10_000, 100_000, 300_000, 1_000_000) if n <= max_rows]
+    print(f"render to PNG, {PLOT_SIZE[0]}x{PLOT_SIZE[1]} in, seconds")
+    print(f"    {'rows':>9} {'line full':>10} {'decimated':>10} {'candles full':>13} {'decimated':>10}")
+    for n_rows in sizes:
+        hist, ohlc = make_frames(n_rows)
+        full_candles = f"{render_candles(ohlc, False):13.2f}" if n_rows <= MAX_FULL_CANDLES else f"{'skipped':>13}"
+        print(f"    {n_rows:>9,} {render_line(hist, False):10.2f} {render_line(hist, True):10.2f} "
+              f"{full_candles} {render_candles(ohlc, True):10.2f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,54 @@
+""" Repeated /coins/list downloads over the local stub server (benchmarks/stub_coingecko.py, gzip on,
+simulated round trip): without the response cache, served fresh from it, and revalidated with a 304.
+
+    python benchmarks/response_cache.py [CALLS]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from api_client import http_client, response_cache_stats
+from cache import configure_engine
+from stub_coingecko import stub_coingecko
+
+LATENCY = 0.05
+
+
+def run(label: str, stub, url: str, calls: int, max_age: float | None) -> None:
+    bytes_before, requests_before = stub.bytes_sent, stub.requests
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        http_client.get(url, max_age=max_age)
+        timings.append(time.perf_counter() - started)
+    print(f"    {label:<30} median {statistics.median(timings) * 1000:7.1f} ms, "
+          f"{stub.requests - requests_before:3d} requests, {(stub.bytes_sent - bytes_before) / 1024:9,.1f} KiB sent")
+
+
+def main(calls: int = 20) -> None:
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+
+    with tempfile.TemporaryDirectory() as tmp_dir, stub_coingecko(latency=LATENCY, compress=True) as stub:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        url = f'{stub.url}/coins/list'
+        print(f"{calls} calls of /coins/list (15,000 coins), {LATENCY * 1000:.0f} ms simulated round trip")
+
+        run('no response cache', stub, url, calls, None)
+        run('fresh in the response cache', stub, url, calls, 3600)
+        run('revalidated (max_age=0, 304)', stub, url, calls, 0)
+
+        stats = response_cache_stats()
+        print(f"    {stats.hits} hits, {stats.revalidated} revalidated, {stats.misses} misses, "
+              f"{stats.bytes_saved / 1024 ** 2:,.1f} MiB of bodies saved; "
+              f"{stats.body_bytes / 1024:,.0f} KiB stored in {stats.stored_bytes / 1024:,.0f} KiB "
+              f"({stats.compression_ratio:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
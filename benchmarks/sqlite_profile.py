@@ -0,0 +1,150 @@
+""" Concurrent SQLite cache throughput with the tuning profile (cache.SQLiteProfile: WAL, busy_timeout,
+IMMEDIATE write transactions), with SQLite's own defaults (rollback journal, no busy timeout)
+and with a plain engine (rollback journal, pysqlite's 5 s timeout).
+
+WRITERS threads upsert batches of hourly rows for their own coin while READERS threads read whole series
+back with fetch_columns; rows/s written, reads/s and 'database is locked' failures are reported.
+Then, with the profile on, single-coin refreshes download over the local stub server
+(benchmarks/stub_coingecko.py) with a slow simulated round trip while a writer keeps upserting:
+the writer's worst wait shows whether refreshes hold the write lock across the download.
+
+    python benchmarks/sqlite_profile.py [BATCHES]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+from sqlalchemy.exc import OperationalError
+
+from api_client import http_client
+from cache import CacheManager, SQLiteProfile, configure_engine, get_connection
+from project_utils import CoinMetaData
+from stub_coingecko import stub_coingecko
+
+WRITERS = 4
+READERS = 4
+BATCH_ROWS = 500
+STEP_MS = 3_600_000
+START_MS = 1_500_000_000_000
+REFRESHES = 8
+LATENCY = 0.5
+# what SQLite does untuned: rollback journal, full fsyncs, and 'database is locked' on the first busy lock
+SQLITE_DEFAULTS = SQLiteProfile(journal_mode='DELETE', synchronous='FULL', mmap_size=0, cache_size=-2000,
+                                busy_timeout_ms=0)
+
+
+def raw_rows(first_row: int, n_rows: int) -> dict:
+    timestamps = START_MS + np.arange(first_row, first_row + n_rows) * STEP_MS
+    prices = 100 + np.sin(timestamps / 1e10)
+    return {'prices': np.c_[timestamps, prices].tolist(),
+            'market_caps': np.c_[timestamps, prices * 1e9].tolist(),
+            'total_volumes': np.c_[timestamps, prices * 1e6].tolist()}
+
+
+def contention(label: str, profile: SQLiteProfile | None, batches: int) -> None:
+    coin_metas = [CoinMetaData(f'coin-{i}', 'usd') for i in range(WRITERS)]
+    writing = threading.Event()
+    writing.set()
+    reads, written, failures = [0], [0], [0]
+    lock = threading.Lock()
+
+    def write(coin_meta):
+        for batch in range(batches):
+            try:
+                with CacheManager(coin_meta, 'historical_data') as cache:
+                    cache.upsert(raw_rows(batch * BATCH_ROWS, BATCH_ROWS))
+                with lock:
+                    written[0] += BATCH_ROWS
+            except OperationalError:
+                with lock:
+                    failures[0] += 1
+
+    def read(coin_meta):
+        while writing.is_set():
+            try:
+                with get_connection() as conn:
+                    CacheManager(coin_meta, 'historical_data', conn=conn).fetch_columns()
+                with lock:
+                    reads[0] += 1
+            except OperationalError:
+                with lock:
+                    failures[0] += 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}", profile)
+        readers = [threading.Thread(target=read, args=(coin_metas[i % WRITERS],)) for i in range(READERS)]
+        writers = [threading.Thread(target=write, args=(coin_meta,)) for coin_meta in coin_metas]
+        started = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in readers:
+            thread.join()
+
+    print(f"    {label:<15} {written[0] / elapsed:9,.0f} rows/s written, "
+          f"{reads[0] / elapsed:7,.1f} reads/s, {failures[0]} locked failures  ({elapsed:.2f} s)")
+
+
+def refresh_lock(stub) -> None:
+    writer_meta = CoinMetaData('writer', 'usd')
+    starting_dt = datetime.now(timezone.utc) - timedelta(days=1)
+    refreshing = threading.Event()
+    refreshing.set()
+    waits = []
+
+    def write():
+        batch = 0
+        while refreshing.is_set():
+            started = time.perf_counter()
+            with CacheManager(writer_meta, 'historical_data') as cache:
+                cache.upsert(raw_rows(batch * 10, 10))
+            waits.append(time.perf_counter() - started)
+            batch += 1
+            time.sleep(0.01)
+
+    def refresh(i):
+        coin_meta = CoinMetaData(f'refreshed-{i}', 'usd')
+        http_client.get_time_series(f'{stub.url}/coins/{coin_meta.coin_id}/market_chart', coin_meta,
+                                    starting_dt, 'historical_data')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_engine(f"sqlite:///{os.path.join(tmp_dir, 'cache.db')}")
+        writer = threading.Thread(target=write)
+        writer.start()
+        refreshers = [threading.Thread(target=refresh, args=(i,)) for i in range(REFRESHES)]
+        for thread in refreshers:
+            thread.start()
+        for thread in refreshers:
+            thread.join()
+        refreshing.clear()
+        writer.join()
+
+    print(f"    {REFRESHES} refreshes, {LATENCY * 1000:.0f} ms round trip: {len(waits)} upserts alongside, "
+          f"median {np.median(waits) * 1000:.1f} ms, worst {max(waits) * 1000:.1f} ms")
+
+
+def main(batches: int = 20) -> None:
+    print(f"{WRITERS} writers x {batches} batches of {BATCH_ROWS} rows, {READERS} readers")
+    contention('profile', SQLiteProfile(), batches)
+    contention('sqlite defaults', SQLITE_DEFAULTS, batches)
+    contention('plain engine', None, batches)
+
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+    print("\nwriter latency during single-coin refreshes (profile on)")
+    with stub_coingecko(latency=LATENCY) as stub:
+        refresh_lock(stub)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
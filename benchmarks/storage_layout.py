@@ -0,0 +1,113 @@
+""" Cache size and range-scan speed of the legacy layout (coin_id / currency_symbol in every row)
+against the compact series-keyed WITHOUT ROWID layout, measured across the migration.
+
+Writes COINS x 2 currencies of one year of 5-minute prices and 30-minute candles.
+
+    python benchmarks/storage_layout.py [COINS]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+
+from cache import configure_engine
+
+CURRENCIES = ('usd', 'eur')
+DAY_MS = 86_400_000
+YEAR_START = 1_700_000_000_000
+
+LEGACY_DDL = """
+CREATE TABLE historical_data (coin_id VARCHAR(50) NOT NULL, currency_symbol VARCHAR(5) NOT NULL,
+    timestamp INTEGER NOT NULL, total_volume INTEGER, market_cap INTEGER, price FLOAT,
+    PRIMARY KEY (coin_id, currency_symbol, timestamp));
+CREATE TABLE ohlc_data (coin_id VARCHAR(50) NOT NULL, currency_symbol VARCHAR(5) NOT NULL,
+    timestamp INTEGER NOT NULL, open FLOAT, high FLOAT, low FLOAT, close FLOAT,
+    PRIMARY KEY (coin_id, currency_symbol, timestamp));
+"""
+
+
+def coin_ids(n_coins: int) -> list[str]:
+    return [f'coin-number-{i:03d}' for i in range(n_coins)]
+
+
+def write_legacy_cache(path: str, n_coins: int) -> int:
+    rng = np.random.default_rng(0)
+    hist_ts = YEAR_START + np.arange(0, 365 * DAY_MS, 5 * 60_000)
+    ohlc_ts = YEAR_START + np.arange(0, 365 * DAY_MS, 30 * 60_000)
+
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_DDL)
+        for coin_id in coin_ids(n_coins):
+            for currency in CURRENCIES:
+                prices = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(hist_ts))))
+                conn.executemany("INSERT INTO historical_data VALUES (?, ?, ?, ?, ?, ?)", zip(
+                    [coin_id] * len(hist_ts), [currency] * len(hist_ts), hist_ts.tolist(),
+                    (prices * 1e6).round().tolist(), (prices * 1e9).round().tolist(), prices.round(2).tolist()))
+                candles = prices[::6].round(2).tolist()
+                conn.executemany("INSERT INTO ohlc_data VALUES (?, ?, ?, ?, ?, ?, ?)", zip(
+                    [coin_id] * len(ohlc_ts), [currency] * len(ohlc_ts), ohlc_ts.tolist(),
+                    candles, candles, candles, candles))
+        conn.commit()
+        conn.execute('VACUUM')
+        return conn.execute('SELECT COUNT(*) FROM historical_data').fetchone()[0] \
+            + conn.execute('SELECT COUNT(*) FROM ohlc_data').fetchone()[0]
+
+
+def btree_sizes(path: str) -> dict[str, int]:
+    """ Bytes per table / index b-tree (dbstat). A WITHOUT ROWID table is its own primary-key index. """
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat "
+                                 "WHERE name LIKE '%historical_data%' OR name LIKE '%ohlc_data%' "
+                                 "OR name LIKE '%series%' "
+                                 "GROUP BY name ORDER BY name"))
+
+
+def time_range_scans(path: str, n_coins: int, query: str, repeats: int = 300) -> float:
+    """ Mean seconds for a random 30-day window of one historical series. """
+    random.seed(0)
+    windows = [(random.choice(coin_ids(n_coins)), random.choice(CURRENCIES),
+                YEAR_START + random.randrange(0, 330) * DAY_MS) for _ in range(repeats)]
+
+    with sqlite3.connect(path) as conn:
+        started = time.perf_counter()
+        for coin_id, currency, start in windows:
+            conn.execute(query, (coin_id, currency, start, start + 30 * DAY_MS)).fetchall()
+        return (time.perf_counter() - started) / repeats
+
+
+def report(label: str, path: str, scan_s: float) -> None:
+    print(f"{label}: file {os.path.getsize(path) / 2**20:.1f} MiB, range scan {scan_s * 1000:.2f} ms")
+    for name, size in btree_sizes(path).items():
+        print(f"    {name:<36} {size / 2**20:8.1f} MiB")
+
+
+def main(n_coins: int = 20) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'cache.db')
+        rows = write_legacy_cache(path, n_coins)
+        print(f"{n_coins} coins x {len(CURRENCIES)} currencies, {rows:,} rows\n")
+
+        report('legacy', path, time_range_scans(path, n_coins,
+            "SELECT timestamp, total_volume, market_cap, price FROM historical_data "
+            "WHERE coin_id = ? AND currency_symbol = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp"))
+
+        started = time.perf_counter()
+        configure_engine(f'sqlite:///{path}').dispose()
+        print(f"\nmigration: {time.perf_counter() - started:.1f} s\n")
+
+        report('compact', path, time_range_scans(path, n_coins,
+            "SELECT timestamp, total_volume, market_cap, price FROM historical_data "
+            "WHERE series_id = (SELECT series_id FROM series "
+            "                   WHERE coin_id = ? AND currency_symbol = ? AND kind = 'historical_data') "
+            "AND timestamp BETWEEN ? AND ? ORDER BY timestamp"))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,170 @@
+""" A local stand-in for the CoinGecko endpoints the clients call, for benchmarks and manual checks.
+
+    with stub_coingecko(latency=0.05, throttle_every=10) as stub:
+        http_client.get(f'{stub.url}/coins/bitcoin/market_chart', {'vs_currency': 'usd', 'days': 1})
+
+Serves /coins/<id>/market_chart, /coins/<id>/market_chart/range and /coins/<id>/ohlc with
+5-minute prices / 30-minute candles ending now, and /coins/list and /simple/supported_vs_currencies.
+latency delays every answer (a stand-in for the network round trip) and throttle_every answers every
+n-th request with 429 + Retry-After. Every answer carries an ETag and If-None-Match gets 304 Not Modified;
+compress=True gzips bodies for clients that accept it.
+"""
+import functools
+import gzip
+import hashlib
+import json
+import multiprocessing
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+DAY_MS = 86_400_000
+
+
+class StubStats:
+    """ URL of a running stub and counters shared with its server process. """
+    def __init__(self):
+        self.url = ''
+        self._requests = multiprocessing.Value('i', 0)
+        self._throttled = multiprocessing.Value('i', 0)
+        self._bytes_sent = multiprocessing.Value('q', 0)
+
+    @property
+    def requests(self) -> int:
+        return self._requests.value
+
+    @property
+    def throttled(self) -> int:
+        return self._throttled.value
+
+    @property
+    def bytes_sent(self) -> int:
+        """ Body bytes as sent, after compression. """
+        return self._bytes_sent.value
+
+    def count(self, throttle_every: int) -> bool:
+        """ Counts a request, returns whether it gets a 429. """
+        with self._requests.get_lock():
+            self._requests.value += 1
+            throttled = bool(throttle_every) and self._requests.value % throttle_every == 0
+        if throttled:
+            with self._throttled.get_lock():
+                self._throttled.value += 1
+        return throttled
+
+
+@contextmanager
+def stub_coingecko(latency: float = 0.0, throttle_every: int = 0, retry_after: int = 1, compress: bool = False):
+    """ Runs the stub server on a free localhost port for the duration of the block.
+
+    The server lives in its own process, so it does not compete with the clients under test for the GIL. """
+    stats = StubStats()
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(stats, ready, latency, throttle_every, retry_after, compress),
+                                      daemon=True)
+    process.start()
+    try:
+        stats.url = f'http://127.0.0.1:{ready.get(timeout=10)}/api/v3'
+        yield stats
+    finally:
+        process.terminate()
+        process.join()
+
+
+def _serve(stats: StubStats, ready, latency: float, throttle_every: int, retry_after: int, compress: bool) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so the clients' connection pools are exercised
+        disable_nagle_algorithm = True  # headers and body go out in two writes
+
+        def do_GET(self):
+            time.sleep(latency)
+            if stats.count(throttle_every):
+                self._send(429, b'{"error": "Throttled"}', {'Retry-After': str(retry_after)})
+                return
+
+            minute = int(time.time() // 60)
+            encoded = _encoded_payload(self.path, minute)
+            if encoded is None:
+                self._send(404, b'{"error": "Not found"}')
+                return
+
+            etag = _etag(self.path, minute)
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', {'ETag': etag})
+            elif compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                self._send(200, _gzipped_payload(self.path, minute), {'ETag': etag, 'Content-Encoding': 'gzip'})
+            else:
+                self._send(200, encoded, {'ETag': etag})
+
+        def _send(self, status: int, encoded: bytes, headers: dict[str, str] = None):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+            with stats._bytes_sent.get_lock():
+                stats._bytes_sent.value += len(encoded)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128  # the default backlog of 5 drops connections under concurrency
+
+    server = Server(('127.0.0.1', 0), Handler)
+    ready.put(server.server_port)
+    server.serve_forever()
+
+
+@functools.lru_cache(maxsize=1024)
+def _encoded_payload(path: str, minute: int) -> bytes | None:
+    """ Bodies are rebuilt once a minute, so the stub is not the bottleneck of what it measures. """
+    split = urlsplit(path)
+    body = _payload(split.path, {key: values[0] for key, values in parse_qs(split.query).items()})
+    return json.dumps(body).encode() if body is not None else None
+
+
+@functools.lru_cache(maxsize=1024)
+def _gzipped_payload(path: str, minute: int) -> bytes:
+    return gzip.compress(_encoded_payload(path, minute), compresslevel=6)
+
+
+@functools.lru_cache(maxsize=1024)
+def _etag(path: str, minute: int) -> str:
+    return f'"{hashlib.md5(_encoded_payload(path, minute)).hexdigest()}"'
+
+
+def _payload(path: str, params: dict[str, str]):
+    parts = path.removeprefix('/api/v3/').split('/')
+    if parts == ['coins', 'list']:
+        return [{'id': f'coin-{i}', 'symbol': f'c{i}', 'name': f'Coin {i}'} for i in range(15_000)]
+    if parts == ['simple', 'supported_vs_currencies']:
+        return ['usd', 'eur', 'gbp', 'jpy', 'btc', 'eth', *[f'x{i:02d}' for i in range(50)]]
+    if len(parts) < 3 or parts[0] != 'coins':
+        return None
+
+    now_ms = int(time.time() * 1000)
+    if parts[2:] == ['market_chart', 'range']:
+        start_ms, end_ms = int(params['from']) * 1000, int(params['to']) * 1000
+    elif parts[2:] in (['market_chart'], ['ohlc']):
+        start_ms, end_ms = now_ms - int(float(params.get('days', 1)) * DAY_MS), now_ms
+    else:
+        return None
+
+    if parts[2] == 'ohlc':
+        step = 30 * 60_000
+        return [[ts, *[_price(ts)] * 4] for ts in range(end_ms - (end_ms - start_ms) // step * step, end_ms + 1, step)]
+
+    step = 5 * 60_000
+    timestamps = range(end_ms - (end_ms - start_ms) // step * step, end_ms + 1, step)
+    return {'prices': [[ts, _price(ts)] for ts in timestamps],
+            'market_caps': [[ts, _price(ts) * 1e9] for ts in timestamps],
+            'total_volumes': [[ts, _price(ts) * 1e6] for ts in timestamps]}
+
+
+def _price(ts: int) -> float:
+    return round(100 + (ts // 60_000) % 1000 / 10, 2)
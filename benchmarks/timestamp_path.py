@@ -0,0 +1,130 @@
+""" Timestamp handling along fetch -> session -> plot, before and after frames carry their datetime index.
+
+Counts timestamp -> datetime conversions (and the rows they convert), timestamp frame copies
+and the time spent per stage, for N hourly rows and N/4 candles.
+
+    python benchmarks/timestamp_path.py [N]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+import numpy as np
+import pandas as pd
+
+import project_utils.frames
+from data_prep import OHLCSessionMaker
+from project_utils import CoinMetaData
+from visualizations import HistPlotter, OHLCPlotter
+
+COIN_META = CoinMetaData('bitcoin', 'usd')
+
+
+class Counter:
+    def __init__(self):
+        self.conversions = self.rows_converted = self.copies = 0
+
+    def count(self, rows: int, copies: int = 1):
+        self.conversions += 1
+        self.rows_converted += rows
+        self.copies += copies
+
+
+def make_columns(n: int) -> tuple[dict, dict]:
+    rng = np.random.default_rng(0)
+    t0 = 1_600_000_000_000
+    hist = {'timestamp': t0 + np.arange(n, dtype=np.int64) * 3_600_000,
+            'price': rng.random(n), 'market_cap': rng.random(n), 'total_volume': rng.random(n)}
+    ohlc = {'timestamp': t0 + np.arange(n // 4, dtype=np.int64) * 4 * 3_600_000,
+            **{col: rng.random(n // 4) for col in ('open', 'high', 'low', 'close')}}
+    return hist, ohlc
+
+
+def legacy_path(hist_columns: dict, ohlc_columns: dict, counter: Counter) -> dict[str, float]:
+    """ The code as it was: plain frames, parsed again by every consumer. """
+    def set_dt_index(ts_frame):
+        if ts_frame.index.name == 'datetime':
+            return ts_frame
+        counter.count(len(ts_frame), copies=2)  # assign() and set_index() both copy the frame
+        return (ts_frame
+                .assign(timestamp=pd.to_datetime(ts_frame.timestamp, unit='ms').dt.floor('s'))
+                .set_index('timestamp')
+                .rename_axis('datetime'))
+
+    def make_frame(data):
+        df = pd.DataFrame(data)
+        df.attrs['coin_id'], df.attrs['currency'] = tuple(COIN_META)
+        return df
+
+    timings = {}
+    started = time.perf_counter()
+    hist_df, ohlc_df = make_frame(hist_columns), make_frame(ohlc_columns)
+    timings['fetch'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    merged = hist_df.merge(ohlc_df, on='timestamp', how='outer')
+    counter.copies += 1
+    session = (merged
+               .pipe(set_dt_index)
+               .resample('1D').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                    'total_volume': 'sum'})
+               .dropna())
+    session.attrs = hist_df.attrs
+    timings['session'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in ('price', 'market_cap', 'total_volume'):
+        set_dt_index(hist_df)
+    set_dt_index(session)
+    timings['plot setup'] = time.perf_counter() - started
+    return timings
+
+
+def current_path(hist_columns: dict, ohlc_columns: dict, counter: Counter) -> dict[str, float]:
+    original = project_utils.frames.utc_index_from_cached_ts
+
+    def counted(timestamps):
+        counter.count(len(timestamps), copies=0)
+        return original(timestamps)
+
+    project_utils.frames.utc_index_from_cached_ts = counted
+    try:
+        timings = {}
+        started = time.perf_counter()
+        hist_df = project_utils.frames.make_time_series_frame(hist_columns, COIN_META)
+        ohlc_df = project_utils.frames.make_time_series_frame(ohlc_columns, COIN_META)
+        timings['fetch'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        session = OHLCSessionMaker(hist_df, ohlc_df).make_session()
+        counter.copies += 1  # the index join, in place of the merge
+        timings['session'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        plotters = [HistPlotter(hist_df) for _ in ('price', 'market_cap', 'total_volume')]
+        plotters.append(OHLCPlotter(session))
+        timings['plot setup'] = time.perf_counter() - started
+
+        shared = all(np.shares_memory(plotter._time_series_frame.index.asi8, frame.index.asi8)
+                     for plotter, frame in zip(plotters, [hist_df] * 3 + [session]))
+        counter.copies += 0 if shared else len(plotters)
+        return timings
+    finally:
+        project_utils.frames.utc_index_from_cached_ts = original
+
+
+def main(n: int = 300_000) -> None:
+    hist_columns, ohlc_columns = make_columns(n)
+    print(f"{n:,} historical rows, {n // 4:,} OHLC rows\n")
+    print(f"{'path':<8} {'conversions':>11} {'rows converted':>15} {'ts frame copies':>16}   timings")
+    for name, path in (('legacy', legacy_path), ('current', current_path)):
+        counter = Counter()
+        timings = path(hist_columns, ohlc_columns, counter)
+        stages = ', '.join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in timings.items())
+        print(f"{name:<8} {counter.conversions:>11} {counter.rows_converted:>15,} {counter.copies:>16}   {stages}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -1,14 +1,67 @@
 from api_client.coingecko import (get_currencies,
                        get_coins,
                        get_sorted_by_mkt_cap,
+                       find_coins,
+                       resolve_coin,
                        get_historical_data,
-                       get_ohlc_data)
+                       get_ohlc_data,
+                       get_historical_data_batch,
+                       get_ohlc_data_batch)
+from api_client.http_client import (coalescing_stats,
+                       SingleFlightStats,
+                       Freshness,
+                       response_cache_stats,
+                       ResponseCacheStats)
+from api_client.refresh_scheduler import RefreshScheduler, WatchedSeries, RefreshResult, SchedulerStats
+from api_client.backfill import (backfill,
+                       plan_backfill,
+                       BackfillChunk,
+                       ChunkResult,
+                       BackfillResult,
+                       BackfillReport)
+from api_client.async_coingecko import (get_currencies_async,
+                       get_coins_async,
+                       get_sorted_by_mkt_cap_async,
+                       find_coins_async,
+                       resolve_coin_async,
+                       get_historical_data_async,
+                       get_ohlc_data_async,
+                       get_historical_data_batch_async,
+                       get_ohlc_data_batch_async)
 
 
 __all__ = [
     "get_currencies",
     "get_coins",
     "get_sorted_by_mkt_cap",
+    "find_coins",
+    "resolve_coin",
     "get_historical_data",
     "get_ohlc_data",
+    "get_historical_data_batch",
+    "get_ohlc_data_batch",
+    "get_currencies_async",
+    "get_coins_async",
+    "get_sorted_by_mkt_cap_async",
+    "find_coins_async",
+    "resolve_coin_async",
+    "get_historical_data_async",
+    "get_ohlc_data_async",
+    "get_historical_data_batch_async",
+    "get_ohlc_data_batch_async",
+    "coalescing_stats",
+    "SingleFlightStats",
+    "Freshness",
+    "response_cache_stats",
+    "ResponseCacheStats",
+    "RefreshScheduler",
+    "WatchedSeries",
+    "RefreshResult",
+    "SchedulerStats",
+    "backfill",
+    "plan_backfill",
+    "BackfillChunk",
+    "ChunkResult",
+    "BackfillResult",
+    "BackfillReport",
 ]
\ No newline at end of file
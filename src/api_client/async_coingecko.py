@@ -0,0 +1,158 @@
+""" Awaitable versions of the api_client.coingecko functions, over api_client.async_http_client.
+
+They take the same arguments, return the same frames and raise the same requests exceptions
+(HTTPError for 4xx / 5xx). Downloads run on the event loop and SQLite work runs in worker threads,
+so a service can await them without wrapping them in threads. """
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from api_client import async_http_client
+from api_client.catalog import (coin_index_async, currencies_catalog_async, markets_catalog_async,
+                                _resolve_in_index)
+from api_client.coingecko import (_currencies_series, _coins_frame, _markets_frame, _check_n,
+                                  _find_in_index, _is_ambiguous, _frame_key, _with_sync_report, _cache_hit_report,
+                                  _bucket_ms, _market_chart_url, _ohlc_url)
+from cache import frame_cache
+from config import (DEFAULT_CURRENCY, DEFAULT_COIN,
+                    COINS_CATALOG_TTL, CURRENCIES_CATALOG_TTL, MARKETS_CATALOG_TTL)
+from project_utils import make_time_series_frame, CoinMetaData
+
+
+async def get_currencies_async(ttl: float = CURRENCIES_CATALOG_TTL) -> pd.Series:
+    """ See coingecko.get_currencies. """
+    return _currencies_series(await currencies_catalog_async(ttl))
+
+
+async def get_coins_async(ttl: float = COINS_CATALOG_TTL) -> pd.DataFrame:
+    """ See coingecko.get_coins. """
+    return _coins_frame((await coin_index_async(ttl)).coins)
+
+
+async def get_sorted_by_mkt_cap_async(
+        n: int=10,
+        currency_symbol: str = DEFAULT_CURRENCY,
+        ttl: float = MARKETS_CATALOG_TTL,
+) -> pd.DataFrame:
+    """ See coingecko.get_sorted_by_mkt_cap. """
+    _check_n(n)
+
+    return _markets_frame(await markets_catalog_async(n, currency_symbol, ttl))
+
+
+async def find_coins_async(symbol: str = None, name_prefix: str = None) -> pd.DataFrame:
+    """ See coingecko.find_coins. """
+    return _find_in_index(await coin_index_async(), symbol, name_prefix)
+
+
+async def resolve_coin_async(query: str, currency_symbol: str = DEFAULT_CURRENCY) -> CoinMetaData:
+    """ See coingecko.resolve_coin. """
+    index = await coin_index_async()
+    ranked_ids = [coin['id'] for coin in await markets_catalog_async(250, currency_symbol)] \
+        if _is_ambiguous(index, query) else []
+    return _resolve_in_index(index, query, currency_symbol, ranked_ids)
+
+
+async def get_historical_data_async(
+        coin_meta: CoinMetaData = CoinMetaData(DEFAULT_COIN, DEFAULT_CURRENCY),
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+        max_staleness: timedelta | None = None,
+) -> pd.DataFrame:
+    """ See coingecko.get_historical_data. """
+    return await _get_time_series_frame(_market_chart_url(coin_meta), coin_meta, starting_dt or start,
+                                        'historical_data', columnar=columnar, columns=columns, delta=delta,
+                                        start=start, end=end, bucket_ms=_bucket_ms(bucket),
+                                        max_staleness=max_staleness)
+
+
+async def get_ohlc_data_async(
+        coin_meta: CoinMetaData = CoinMetaData(DEFAULT_COIN, DEFAULT_CURRENCY),
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+        max_staleness: timedelta | None = None,
+) -> pd.DataFrame:
+    """ See coingecko.get_ohlc_data. """
+    return await _get_time_series_frame(_ohlc_url(coin_meta), coin_meta, starting_dt or start,
+                                        'ohlc_data', columnar=columnar, columns=columns, delta=delta,
+                                        start=start, end=end, bucket_ms=_bucket_ms(bucket),
+                                        max_staleness=max_staleness)
+
+
+async def get_historical_data_batch_async(
+        coin_metas: list[CoinMetaData],
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+) -> dict[CoinMetaData, pd.DataFrame]:
+    """ See coingecko.get_historical_data_batch; concurrency is bounded by ASYNC_MAX_CONCURRENCY. """
+    urls = {coin_meta: _market_chart_url(coin_meta) for coin_meta in coin_metas}
+    return await _get_time_series_frames(urls, starting_dt or start, 'historical_data',
+                                         columnar=columnar, columns=columns, delta=delta,
+                                         start=start, end=end, bucket_ms=_bucket_ms(bucket))
+
+
+async def get_ohlc_data_batch_async(
+        coin_metas: list[CoinMetaData],
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+) -> dict[CoinMetaData, pd.DataFrame]:
+    """ See coingecko.get_ohlc_data_batch. """
+    urls = {coin_meta: _ohlc_url(coin_meta) for coin_meta in coin_metas}
+    return await _get_time_series_frames(urls, starting_dt or start, 'ohlc_data',
+                                         columnar=columnar, columns=columns, delta=delta,
+                                         start=start, end=end, bucket_ms=_bucket_ms(bucket))
+
+
+async def _get_time_series_frame(url: str,
+                                 coin_meta: CoinMetaData,
+                                 starting_dt: datetime | None,
+                                 table_name: str,
+                                 max_staleness: timedelta | None = None,
+                                 **read_options) -> pd.DataFrame:
+    key = _frame_key(table_name, coin_meta, starting_dt, read_options)
+
+    cached = frame_cache.get(key)
+    if cached is not None:
+        return _with_sync_report(cached, _cache_hit_report(cached))
+
+    data, sync_report = await async_http_client.get_time_series(url, coin_meta, starting_dt, table_name,
+                                                                max_staleness=max_staleness, **read_options)
+    frame = _with_sync_report(await asyncio.to_thread(make_time_series_frame, data, coin_meta), sync_report)
+    if not sync_report.revalidating:
+        frame_cache.put(key, frame)
+    return frame
+
+
+async def _get_time_series_frames(urls: dict[CoinMetaData, str],
+                                  starting_dt: datetime | None,
+                                  table_name: str,
+                                  **read_options) -> dict[CoinMetaData, pd.DataFrame]:
+    results = await async_http_client.get_time_series_batch(urls, starting_dt, table_name, **read_options)
+
+    return {coin_meta: _with_sync_report(make_time_series_frame(data, coin_meta), sync_report)
+            for coin_meta, (data, sync_report) in results.items()}
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import weakref
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+import httpx
+import requests
+from urllib3.exceptions import MaxRetryError
+
+from api_client.http_client import (JSON, SyncReport, _retry_policy, _rate_limiter, _in_flight,
+                                    _SyncRequest, _plan_sync, _apply_sync, _read_cached, _stamped, _endpoint,
+                                    _validators, _flight_key, _planned_starting_dt, _serve_while_revalidating)
+from cache import CacheManager, get_connection, response_cache
+from config import ASYNC_MAX_CONCURRENCY
+from project_utils import CoinMetaData, get_metrics, timer
+
+
+class _LoopState(NamedTuple):
+    client: httpx.AsyncClient
+    limiter: asyncio.Semaphore
+
+
+# connections and semaphores belong to one event loop, so each loop gets its own
+_loop_states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState] = weakref.WeakKeyDictionary()
+
+
+async def get(url: str,
+              params: dict[str, Any] = None,
+              *,
+              timeout: tuple[float, float] = (5, 30),
+              max_age: float | None = None) -> JSON:
+    return (await get_with_size(url, params, timeout=timeout, max_age=max_age))[0]
+
+
+async def get_with_size(url: str,
+                        params: dict[str, Any] = None,
+                        *,
+                        timeout: tuple[float, float] = (5, 30),
+                        max_age: float | None = None) -> tuple[JSON, int]:
+    """ asyncio counterpart of http_client.get_with_size, over a pooled httpx.AsyncClient.
+
+    Retries follow the sync client's PrintingRetry policy (status codes, back-off, Retry-After)
+    and calls draw from the same rate limiter. At most ASYNC_MAX_CONCURRENCY requests
+    are in flight per event loop. max_age uses the same response cache, read and written
+    in worker threads.
+
+    Failures raise the sync client's exception types, not httpx's: requests.HTTPError for 4xx / 5xx
+    (e.response holds the status, headers and body), requests.ConnectionError or requests.Timeout
+    once the retries run out. """
+    stored = await asyncio.to_thread(response_cache.get, url, params, max_age) if max_age is not None else None
+    if stored is not None and stored.fresh:
+        return json.loads(stored.body), 0
+
+    state = _loop_state()
+    connect_timeout, read_timeout = timeout
+    retry = _retry_policy.new()
+    metrics, endpoint = get_metrics(), _endpoint(url)
+
+    with timer('http_request_seconds', endpoint=endpoint):  # retries and back-off included, as in the sync client
+        while True:
+            metrics.inc('rate_limit_wait_seconds_total', await _rate_limiter.acquire_async())
+            try:
+                async with state.limiter:
+                    response = await state.client.get(url, params=params, headers=_validators(stored),
+                                                      timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+            except httpx.TransportError as e:
+                retry = _increment(retry, url, error=e)
+                await _sleep(retry, None, url)
+                continue
+
+            if retry.is_retry('GET', response.status_code, 'Retry-After' in response.headers):
+                retry = _increment(retry, url, response=response)
+                await _sleep(retry, response, url)
+                continue
+            break
+
+    metrics.inc('http_requests_total', endpoint=endpoint, status=str(response.status_code))
+    if response.status_code == 304 and stored is not None:
+        await asyncio.to_thread(response_cache.revalidated, url, params, stored)
+        return json.loads(stored.body), 0
+
+    _raise_for_status(response)
+    metrics.inc('http_bytes_total', response.num_bytes_downloaded, endpoint=endpoint)  # before decoding
+    if max_age is not None and 'no-store' not in response.headers.get('Cache-Control', ''):
+        await asyncio.to_thread(response_cache.put, url, params, response.content,
+                                response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.json(), len(response.content)
+
+
+async def get_time_series(url: str,
+                          coin_meta: CoinMetaData,
+                          starting_dt: datetime | None,
+                          table_name: str,
+                          *,
+                          delta: bool = False,
+                          max_staleness: timedelta | None = None,
+                          **read_options) -> tuple[dict | Any | None, SyncReport]:
+    """ asyncio counterpart of http_client.get_time_series.
+
+    SQLite work runs in worker threads (asyncio.to_thread), so the event loop never waits on the cache,
+    and the write lock is only taken after the download, as in get_time_series_batch.
+    Refreshes are coalesced with concurrent sync and async calls for the same series;
+    with max_staleness, the background refresh runs on the sync client's revalidation pool. """
+    if max_staleness is not None:
+        served = await asyncio.to_thread(_serve_while_revalidating, url, coin_meta, starting_dt, table_name,
+                                         delta, max_staleness, read_options)
+        if served is not None:
+            return served
+
+    key = _flight_key(url, coin_meta, table_name, starting_dt)
+    report = await _in_flight.do_async(key, lambda: _refresh(url, coin_meta, _planned_starting_dt(key, starting_dt),
+                                                             table_name, delta))
+    return await asyncio.to_thread(_read, coin_meta, table_name, report, read_options)
+
+
+async def get_time_series_batch(urls: dict[CoinMetaData, str],
+                                starting_dt: datetime | None,
+                                table_name: str,
+                                *,
+                                delta: bool = False,
+                                **read_options) -> dict[CoinMetaData, tuple[dict | Any | None, SyncReport]]:
+    """ get_time_series for many coins: downloads run concurrently on the event loop,
+    then all writes go through one transaction in a worker thread. """
+    requests_by_meta = await asyncio.to_thread(_plan_batch, urls, starting_dt, table_name, delta)
+
+    metas = [coin_meta for coin_meta, request in requests_by_meta.items() if request]
+    payloads = await asyncio.gather(*[get_with_size(requests_by_meta[coin_meta].url,
+                                                    requests_by_meta[coin_meta].params)
+                                      for coin_meta in metas])
+
+    return await asyncio.to_thread(_apply_batch, requests_by_meta, dict(zip(metas, payloads)),
+                                   table_name, read_options)
+
+
+async def aclose() -> None:
+    """ Closes the running loop's pooled connections, e.g. on service shutdown. """
+    state = _loop_states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.aclose()
+
+
+def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        state = _LoopState(
+            httpx.AsyncClient(limits=httpx.Limits(max_connections=ASYNC_MAX_CONCURRENCY,
+                                                  max_keepalive_connections=ASYNC_MAX_CONCURRENCY)),
+            asyncio.Semaphore(ASYNC_MAX_CONCURRENCY),
+        )
+        _loop_states[loop] = state
+    return state
+
+
+class _RetryResponse:
+    """ The parts of a urllib3 response that Retry looks at, taken from an httpx response. """
+    def __init__(self, response: httpx.Response):
+        self.status = response.status_code
+        self.headers = response.headers
+
+    @staticmethod
+    def get_redirect_location() -> bool:
+        return False
+
+
+def _increment(retry, url: str, response: httpx.Response | None = None, error: httpx.TransportError | None = None):
+    """ Retry.increment for httpx; once retries run out, raises the HTTP error or the transport error. """
+    try:
+        return retry.increment('GET', url, response=_RetryResponse(response) if response else None, error=error)
+    except MaxRetryError:
+        if error is not None:
+            failure = requests.Timeout if isinstance(error, httpx.TimeoutException) else requests.ConnectionError
+            raise failure(f"{error!r} after retries, GET {url}") from error
+        _raise_for_status(response)
+        raise
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    """ response.raise_for_status, raising requests.HTTPError like the sync client. """
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        failed = requests.Response()
+        failed.status_code, failed.reason, failed.url = response.status_code, response.reason_phrase, str(response.url)
+        failed.headers.update(response.headers)
+        failed._content = response.content
+        raise requests.HTTPError(str(e), response=failed) from e
+
+
+async def _sleep(retry, response: httpx.Response | None, url: str) -> None:
+    """ Same wait and message as PrintingRetry.sleep, awaited instead of blocking. """
+    retry_after = retry.get_retry_after(_RetryResponse(response)) if response is not None else None
+    backoff = retry.get_backoff_time()
+    sleep_time = retry_after if retry_after else backoff
+    get_metrics().inc('http_retries_total', reason=str(response.status_code) if response is not None else 'error')
+
+    if sleep_time:
+        reason = f"Retry-After={retry_after}s" if retry_after else f"back-off={sleep_time:.1f}s"
+        print(f"⚠️  Rate-limit/back-off triggered for {url} — {reason}")
+        get_metrics().inc('http_backoff_seconds_total', sleep_time)
+        await asyncio.sleep(sleep_time)
+
+
+async def _refresh(url: str,
+                   coin_meta: CoinMetaData,
+                   starting_dt: datetime | None,
+                   table_name: str,
+                   delta: bool) -> SyncReport:
+    request = (await asyncio.to_thread(_plan_batch, {coin_meta: url}, starting_dt, table_name, delta))[coin_meta]
+    if not request:
+        return SyncReport()
+
+    download = await get_with_size(request.url, request.params)
+    return await asyncio.to_thread(_apply_one, coin_meta, table_name, request, download)
+
+
+def _plan_batch(urls: dict[CoinMetaData, str],
+                starting_dt: datetime | None,
+                table_name: str,
+                delta: bool) -> dict:
+    with get_connection() as conn:
+        return {coin_meta: _plan_sync(url, coin_meta, starting_dt,
+                                      CacheManager(coin_meta, table_name, conn=conn), table_name, delta)
+                for coin_meta, url in urls.items()}
+
+
+def _apply_one(coin_meta: CoinMetaData,
+               table_name: str,
+               request: _SyncRequest,
+               download: tuple[JSON, int]) -> SyncReport:
+    with CacheManager(coin_meta, table_name) as cache:
+        return _apply_sync(cache, request, *download)
+
+
+def _read(coin_meta: CoinMetaData,
+          table_name: str,
+          report: SyncReport,
+          read_options: dict) -> tuple[dict | Any | None, SyncReport]:
+    with get_connection() as conn:
+        cache = CacheManager(coin_meta, table_name, conn=conn)
+        return _read_cached(cache, **read_options), _stamped(report, cache)
+
+
+def _apply_batch(requests_by_meta: dict,
+                 downloads: dict[CoinMetaData, tuple[JSON, int]],
+                 table_name: str,
+                 read_options: dict) -> dict[CoinMetaData, tuple[dict | Any | None, SyncReport]]:
+    with get_connection(immediate=True) as conn, conn.begin():
+        result = {}
+        for coin_meta, request in requests_by_meta.items():
+            cache = CacheManager(coin_meta, table_name, conn=conn)
+            report = _apply_sync(cache, request, *downloads[coin_meta]) \
+                if coin_meta in downloads else SyncReport()
+            result[coin_meta] = _read_cached(cache, **read_options), _stamped(report, cache)
+        return result
@@ -0,0 +1,295 @@
+import time
+from datetime import datetime
+from typing import Callable, Iterable, NamedTuple
+
+from api_client import http_client
+from api_client.coingecko import _market_chart_url, _ohlc_url
+from api_client.rate_limiter import RateLimiter
+from cache import CacheManager, BackfillProgress, count_raw_rows, get_connection
+from config import COINGECKO_API_URL, PRICE_PRECISION, BACKFILL_MAX_HISTORY_DAYS, BACKFILL_CALLS_PER_MINUTE
+from project_utils import CoinMetaData, cached_ts_from_utc, utc_from_cached_ts, days_for_free_api, get_metrics
+
+TABLES = ('historical_data', 'ohlc_data')
+_DAY_MS = 86_400_000
+# a resumed backfill leaves newer gaps shorter than this to delta refreshes,
+# instead of spending a request per series on the minutes since it stopped
+_MIN_TOP_UP_MS = 60 * 60_000
+
+
+class _Tier(NamedTuple):
+    max_age_days: float         # how far back from now the tier reaches
+    window_days: float | None   # longest span one request may cover, None: the whole tier
+    granularity: str            # row spacing CoinGecko answers such a request with
+
+
+# Newest first. /market_chart/range answers a range within the last day 5-minutely
+# and any other range of up to 90 days hourly (longer ranges only daily)
+_RANGE_TIERS = (_Tier(1, 1, '5min'),
+                _Tier(BACKFILL_MAX_HISTORY_DAYS, 90, 'hourly'))
+# /ohlc only takes a number of days counted back from now (see days_for_free_api), the candle size follows it
+_OHLC_TIERS = (_Tier(1, None, '30min'),
+               _Tier(30, None, '4h'),
+               _Tier(BACKFILL_MAX_HISTORY_DAYS, None, '4d'))
+_TIERS = {'historical_data': _RANGE_TIERS, 'ohlc_data': _OHLC_TIERS}
+
+
+class BackfillChunk(NamedTuple):
+    coin_meta: CoinMetaData
+    table_name: str
+    start_ts: int       # ms, inclusive
+    end_ts: int         # ms, exclusive
+    granularity: str
+
+
+class ChunkResult(NamedTuple):
+    chunk: BackfillChunk
+    rows_received: int
+    rows_upserted: int
+    bytes_received: int
+    seconds: float      # download and write, waiting on the budget excluded
+
+
+class BackfillResult(NamedTuple):
+    coin_meta: CoinMetaData
+    table_name: str
+    chunks: int
+    rows_received: int
+    rows_upserted: int
+    bytes_received: int
+    progress: BackfillProgress | None   # stored checkpoint once the run ended
+    error: Exception | None = None
+
+
+class BackfillReport(NamedTuple):
+    results: list[BackfillResult]
+    seconds: float
+
+    @property
+    def requests(self) -> int:
+        return sum(result.chunks for result in self.results)
+
+    @property
+    def rows_upserted(self) -> int:
+        return sum(result.rows_upserted for result in self.results)
+
+    @property
+    def rows_per_second(self) -> float:
+        """ Rows written per second of the whole run, waiting on the budget included. """
+        return self.rows_upserted / self.seconds if self.seconds else 0.0
+
+    @property
+    def failures(self) -> list[BackfillResult]:
+        return [result for result in self.results if result.error is not None]
+
+
+def backfill(
+        coin_metas: Iterable[CoinMetaData],
+        start: datetime,
+        end: datetime | None = None,
+        *,
+        tables: Iterable[str] = TABLES,
+        calls_per_minute: int = BACKFILL_CALLS_PER_MINUTE,
+        restart: bool = False,
+        api_url: str = COINGECKO_API_URL,
+        on_chunk: Callable[[ChunkResult], None] | None = None,
+) -> BackfillReport:
+    """ Fills the cache of every coin and table between start and end (UTC, default now)
+    at the finest granularity the free API serves for each period, one series after another.
+
+    get_historical_data asks for the whole span at once, so anything beyond 90 days comes back daily.
+    Here every series is swept from end back to start in requests CoinGecko answers finely:
+    /range over the last day (5-minutely), then /range windows of 90 days (hourly);
+    /ohlc with days=1 (30-minute candles), 30 (4-hour) and up to 365 (4-day). Rows outside a request's
+    window are dropped, so the periods don't overlap. History older than BACKFILL_MAX_HISTORY_DAYS
+    is not served by the free API and is skipped.
+
+    Requests draw calls_per_minute from a limiter of their own on top of the global one.
+    After every request the rows and the span covered so far (CacheManager.backfill_progress)
+    are committed together, so an interrupted backfill called again with the same start resumes
+    where it stopped, sweeping only what is newer than the covered span and then what is older.
+    restart=True ignores the stored progress. on_chunk is called after every request.
+
+    A series that fails (e.g. HTTPError after the retries) is reported in its BackfillResult
+    and the others go on. """
+    start_ts, end_ts = _time_range(start, end)
+    tables = _checked_tables(tables)
+    budget = RateLimiter(calls_per_minute)
+
+    started = time.monotonic()
+    results = [_backfill_series(coin_meta, table_name, start_ts, end_ts, restart, budget, api_url, on_chunk)
+               for coin_meta in coin_metas
+               for table_name in tables]
+    return BackfillReport(results, time.monotonic() - started)
+
+
+def plan_backfill(
+        coin_meta: CoinMetaData,
+        start: datetime,
+        end: datetime | None = None,
+        *,
+        tables: Iterable[str] = TABLES,
+        restart: bool = False,
+) -> list[BackfillChunk]:
+    """ The requests backfill would make for one coin right now, given its stored progress,
+    e.g. to estimate how long a backfill takes at a given calls_per_minute. """
+    start_ts, end_ts = _time_range(start, end)
+    now_ms = _now_ms()
+
+    planned = []
+    for table_name in _checked_tables(tables):
+        sweep = _Sweep(start_ts, end_ts, None if restart else _stored_progress(coin_meta, table_name))
+        while (chunk := sweep.next_chunk(coin_meta, table_name, now_ms)) is not None:
+            planned.append(chunk)
+            sweep.advance(chunk, 0)
+    return planned
+
+
+class _Sweep:
+    """ Walks one series from end back to start, newest chunk first, around the span covered earlier.
+
+    Chunks below the covered span extend it downwards and are checkpointed one by one.
+    Chunks newer than it (the time since the last run) only join it once they reach it;
+    until then an interruption means requesting them again. """
+    def __init__(self, start_ts: int, end_ts: int, progress: BackfillProgress | None):
+        if progress is not None and (progress.covered_to < start_ts or progress.covered_from > end_ts):
+            progress = None     # a separate span, this run's checkpoints replace it
+        elif progress is not None and end_ts - progress.covered_to < _MIN_TOP_UP_MS:
+            end_ts = min(end_ts, progress.covered_to)
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.cursor = end_ts
+        self.progress = progress
+        self._newer_rows = 0
+
+    def next_chunk(self, coin_meta: CoinMetaData, table_name: str, now_ms: int) -> BackfillChunk | None:
+        progress = self.progress
+        if progress is not None and progress.covered_from < self.cursor <= progress.covered_to:
+            self.cursor = progress.covered_from
+
+        floor = self.start_ts
+        if progress is not None and self.cursor > progress.covered_to:
+            floor = max(floor, progress.covered_to)
+        if self.cursor <= floor:
+            return None
+
+        tier = _tier_at(_TIERS[table_name], self.cursor - 1, now_ms)
+        if tier is None:
+            return None
+        tier_start, window_ms, granularity = tier
+        chunk_start = max(floor, tier_start, self.cursor - window_ms if window_ms else tier_start)
+        return BackfillChunk(coin_meta, table_name, chunk_start, self.cursor, granularity)
+
+    def advance(self, chunk: BackfillChunk, rows_upserted: int) -> BackfillProgress | None:
+        """ Moves past chunk; returns the checkpoint to store, or None while it doesn't change. """
+        self.cursor = chunk.start_ts
+        progress = self.progress
+        if progress is None:
+            self.progress = BackfillProgress(chunk.start_ts, self.end_ts, rows_upserted)
+            return self.progress
+
+        if chunk.start_ts >= progress.covered_to:
+            self._newer_rows += rows_upserted
+            if chunk.start_ts > progress.covered_to:
+                return None
+            self.progress = BackfillProgress(progress.covered_from, self.end_ts,
+                                             progress.rows_upserted + self._newer_rows)
+            return self.progress
+
+        self.progress = progress._replace(covered_from=chunk.start_ts,
+                                          rows_upserted=progress.rows_upserted + rows_upserted)
+        return self.progress
+
+
+def _backfill_series(coin_meta: CoinMetaData,
+                     table_name: str,
+                     start_ts: int,
+                     end_ts: int,
+                     restart: bool,
+                     budget: RateLimiter,
+                     api_url: str,
+                     on_chunk: Callable[[ChunkResult], None] | None) -> BackfillResult:
+    chunks = rows_received = rows_upserted = bytes_received = 0
+    sweep = None
+    try:
+        sweep = _Sweep(start_ts, end_ts, None if restart else _stored_progress(coin_meta, table_name))
+        while sweep.next_chunk(coin_meta, table_name, _now_ms()) is not None:
+            budget.acquire()
+            now_ms = _now_ms()  # the waits may have moved the tier boundaries
+            chunk = sweep.next_chunk(coin_meta, table_name, now_ms)
+            if chunk is None:
+                break
+            started = time.monotonic()
+
+            raw_data, size = http_client.get_with_size(*_chunk_request(chunk, api_url, now_ms))
+            with get_connection(immediate=True) as conn, conn.begin():
+                cache = CacheManager(coin_meta, table_name, conn=conn)
+                upserted = cache.upsert(raw_data, newer_than=chunk.start_ts - 1, older_than=chunk.end_ts)
+                checkpoint = sweep.advance(chunk, upserted)
+                if checkpoint is not None:
+                    cache.save_backfill_progress(checkpoint)
+
+            received = count_raw_rows(raw_data)
+            chunks, rows_received = chunks + 1, rows_received + received
+            rows_upserted, bytes_received = rows_upserted + upserted, bytes_received + size
+            get_metrics().inc('backfill_rows_upserted_total', upserted, table=table_name)
+            if on_chunk is not None:
+                on_chunk(ChunkResult(chunk, received, upserted, size, time.monotonic() - started))
+    except Exception as e:
+        print(f"⚠️  Backfill of {table_name} for {coin_meta.coin_id}/{coin_meta.currency} failed — {e}")
+        return BackfillResult(coin_meta, table_name, chunks, rows_received, rows_upserted, bytes_received,
+                              _stored_progress(coin_meta, table_name), e)
+
+    return BackfillResult(coin_meta, table_name, chunks, rows_received, rows_upserted, bytes_received,
+                          sweep.progress)
+
+
+def _chunk_request(chunk: BackfillChunk, api_url: str, now_ms: int) -> tuple[str, dict]:
+    params = {"vs_currency": chunk.coin_meta.currency,
+              "precision": PRICE_PRECISION}
+    if chunk.table_name == 'historical_data':
+        return (f"{_market_chart_url(chunk.coin_meta, api_url)}/range",
+                params | {"from": chunk.start_ts // 1000, "to": -(-chunk.end_ts // 1000)})
+
+    days = days_for_free_api(-(-(now_ms - chunk.start_ts) // _DAY_MS))
+    return _ohlc_url(chunk.coin_meta, api_url), params | {"days": days}
+
+
+def _tier_at(tiers: tuple[_Tier, ...], ts: int, now_ms: int) -> tuple[int, int | None, str] | None:
+    """ Oldest timestamp of the tier ts falls in, the longest span of one request in it (ms) and
+    its granularity; None if ts is older than every tier. """
+    for max_age_days, window_days, granularity in tiers:
+        tier_start = now_ms - round(max_age_days * _DAY_MS)
+        if ts >= tier_start:
+            return tier_start, round(window_days * _DAY_MS) if window_days else None, granularity
+    return None
+
+
+def _stored_progress(coin_meta: CoinMetaData, table_name: str) -> BackfillProgress | None:
+    with get_connection() as conn:
+        return CacheManager(coin_meta, table_name, conn=conn).backfill_progress()
+
+
+def _time_range(start: datetime, end: datetime | None) -> tuple[int, int]:
+    start_ts = cached_ts_from_utc(start)     # rejects naive datetimes
+    now_ts = _now_ms()
+    end_ts = min(cached_ts_from_utc(end), now_ts) if end is not None else now_ts
+    if start_ts >= end_ts:
+        raise ValueError("start must be before end (and before now)")
+
+    oldest_ts = now_ts - BACKFILL_MAX_HISTORY_DAYS * _DAY_MS
+    if start_ts < oldest_ts:
+        print(f"⚠️  The free API serves {BACKFILL_MAX_HISTORY_DAYS} days of history, backfilling from "
+              f"{utc_from_cached_ts(oldest_ts):%Y-%m-%d %H:%M} UTC instead of {start:%Y-%m-%d %H:%M} UTC")
+    return max(start_ts, oldest_ts), end_ts
+
+
+def _checked_tables(tables: Iterable[str]) -> tuple[str, ...]:
+    tables = tuple(tables)
+    for table_name in tables:
+        if table_name not in TABLES:
+            raise ValueError(f"Unknown table {table_name!r}, use one of: {', '.join(TABLES)}")
+    return tables
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
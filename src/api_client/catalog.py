@@ -0,0 +1,179 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+from api_client import async_http_client
+from api_client.http_client import get, JSON
+from cache import CatalogCache
+from config import (COINGECKO_API_URL, COINS_CATALOG_TTL, CURRENCIES_CATALOG_TTL, MARKETS_CATALOG_TTL,
+                    PRICE_PRECISION, RESPONSE_CACHE_MAX_AGE)
+from project_utils import CoinMetaData
+
+
+class CoinIndex:
+    """ In-memory lookups over the /coins/list catalog: by id, by symbol and by name prefix.
+
+    Symbols are not unique on CoinGecko, so symbol lookups return every matching coin. """
+    def __init__(self, coins: list[dict]):
+        self.coins = coins
+        self._by_id = {coin['id']: coin for coin in coins}
+
+        self._by_symbol: dict[str, list[dict]] = {}
+        for coin in coins:
+            self._by_symbol.setdefault(coin['symbol'].lower(), []).append(coin)
+
+        self._names = sorted((coin['name'].lower(), coin['id']) for coin in coins)
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    def by_id(self, coin_id: str) -> dict | None:
+        return self._by_id.get(coin_id)
+
+    def by_symbol(self, symbol: str) -> list[dict]:
+        return self._by_symbol.get(symbol.lower(), [])
+
+    def by_name_prefix(self, prefix: str, limit: int | None = None) -> list[dict]:
+        prefix = prefix.lower()
+        found = []
+        for name, coin_id in self._names[bisect_left(self._names, (prefix, '')):]:
+            if not name.startswith(prefix) or (limit is not None and len(found) >= limit):
+                break
+            found.append(self._by_id[coin_id])
+        return found
+
+
+_COINS_URL = f"{COINGECKO_API_URL}/coins/list"
+_CURRENCIES_URL = f"{COINGECKO_API_URL}/simple/supported_vs_currencies"
+_MARKETS_URL = f"{COINGECKO_API_URL}/coins/markets"
+
+_coins_cache = CatalogCache('coins', 'coins')
+_currencies_cache = CatalogCache('currencies', 'currencies')
+
+_coin_index: CoinIndex | None = None
+_coin_index_loaded_at: float = 0.0
+
+
+def coins_catalog(ttl: float = COINS_CATALOG_TTL) -> list[dict]:
+    return _load_catalog(_coins_cache, _COINS_URL, ttl, _coin_rows)
+
+
+def currencies_catalog(ttl: float = CURRENCIES_CATALOG_TTL) -> list[str]:
+    rows = _load_catalog(_currencies_cache, _CURRENCIES_URL, ttl, _currency_rows)
+    return [row['symbol'] for row in rows]
+
+
+def markets_catalog(n: int, currency_symbol: str, ttl: float = MARKETS_CATALOG_TTL) -> list[dict]:
+    """ Top n coins by market cap, served from the cache when it already holds at least n fresh rows. """
+    rows = _load_catalog(_markets_cache(currency_symbol), _MARKETS_URL, ttl, _market_rows,
+                         _markets_params(n, currency_symbol), min_rows=n)
+    return rows[:n]
+
+
+def coin_index(ttl: float = COINS_CATALOG_TTL) -> CoinIndex:
+    """ Shared CoinIndex; while it's younger than ttl, lookups never touch SQLite or the network. """
+    global _coin_index, _coin_index_loaded_at
+    if _coin_index is None or time.time() - _coin_index_loaded_at >= ttl:
+        _coin_index = CoinIndex(coins_catalog(ttl))
+        _coin_index_loaded_at = _coins_cache.fetched_at() or time.time()
+    return _coin_index
+
+
+async def coins_catalog_async(ttl: float = COINS_CATALOG_TTL) -> list[dict]:
+    return await _load_catalog_async(_coins_cache, _COINS_URL, ttl, _coin_rows)
+
+
+async def currencies_catalog_async(ttl: float = CURRENCIES_CATALOG_TTL) -> list[str]:
+    rows = await _load_catalog_async(_currencies_cache, _CURRENCIES_URL, ttl, _currency_rows)
+    return [row['symbol'] for row in rows]
+
+
+async def markets_catalog_async(n: int, currency_symbol: str, ttl: float = MARKETS_CATALOG_TTL) -> list[dict]:
+    rows = await _load_catalog_async(_markets_cache(currency_symbol), _MARKETS_URL, ttl, _market_rows,
+                                     _markets_params(n, currency_symbol), min_rows=n)
+    return rows[:n]
+
+
+async def coin_index_async(ttl: float = COINS_CATALOG_TTL) -> CoinIndex:
+    """ coin_index for coroutines, sharing the same in-memory index. """
+    global _coin_index, _coin_index_loaded_at
+    if _coin_index is None or time.time() - _coin_index_loaded_at >= ttl:
+        coins = await coins_catalog_async(ttl)
+        _coin_index = await asyncio.to_thread(CoinIndex, coins)
+        _coin_index_loaded_at = await asyncio.to_thread(_coins_cache.fetched_at) or time.time()
+    return _coin_index
+
+
+def resolve_coin(query: str, currency: str, ranked_ids: list[str] = ()) -> CoinMetaData:
+    """ Resolves a coin id, ticker symbol or exact name to CoinMetaData.
+    Ambiguous symbols/names go to the coin ranked highest in ranked_ids. """
+    return _resolve_in_index(coin_index(), query, currency, ranked_ids)
+
+
+def _resolve_in_index(index: CoinIndex, query: str, currency: str, ranked_ids: list[str]) -> CoinMetaData:
+    coin = index.by_id(query.lower())
+    if coin is None:
+        candidates = index.by_symbol(query) or \
+            [c for c in index.by_name_prefix(query) if c['name'].lower() == query.lower()]
+        if not candidates:
+            raise ValueError(f"Unknown coin {query!r}")
+
+        rank = {coin_id: i for i, coin_id in enumerate(ranked_ids)}
+        coin = min(candidates, key=lambda c: rank.get(c['id'], len(rank)))
+
+    return CoinMetaData(coin['id'], currency)
+
+
+def _load_catalog(
+        cache: CatalogCache,
+        url: str,
+        ttl: float,
+        to_rows: Callable[[JSON], list[dict]],
+        params: dict[str, Any] | None = None,
+        min_rows: int = 0,
+) -> list[dict]:
+    """ Serves a catalog endpoint from the cache while it's fresher than ttl,
+    otherwise downloads it and replaces the cached copy. The download goes through the response cache,
+    so an unchanged catalog is revalidated (304) instead of downloaded again. """
+    if not cache.is_fresh(ttl, min_rows):
+        data = get(url, params, max_age=RESPONSE_CACHE_MAX_AGE)
+        cache.replace(to_rows(data) if data else [])
+    return cache.load()
+
+
+async def _load_catalog_async(
+        cache: CatalogCache,
+        url: str,
+        ttl: float,
+        to_rows: Callable[[JSON], list[dict]],
+        params: dict[str, Any] | None = None,
+        min_rows: int = 0,
+) -> list[dict]:
+    """ _load_catalog for coroutines; the SQLite reads and writes run in worker threads. """
+    if not await asyncio.to_thread(cache.is_fresh, ttl, min_rows):
+        data = await async_http_client.get(url, params, max_age=RESPONSE_CACHE_MAX_AGE)
+        await asyncio.to_thread(cache.replace, to_rows(data) if data else [])
+    return await asyncio.to_thread(cache.load)
+
+
+def _coin_rows(data: JSON) -> list[dict]:
+    return [{k: coin[k] for k in ('id', 'symbol', 'name')} for coin in data]
+
+
+def _currency_rows(data: JSON) -> list[dict]:
+    return [{'symbol': symbol} for symbol in data]
+
+
+def _market_rows(data: JSON) -> list[dict]:
+    return [{**coin, 'rank': rank} for rank, coin in enumerate(data)]
+
+
+def _markets_cache(currency_symbol: str) -> CatalogCache:
+    return CatalogCache('markets', f'markets:{currency_symbol}', {'currency_symbol': currency_symbol})
+
+
+def _markets_params(n: int, currency_symbol: str) -> dict[str, Any]:
+    return {"vs_currency": currency_symbol,
+            "per_page": n,
+            "precision": PRICE_PRECISION}
\ No newline at end of file
@@ -1,57 +1,81 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pandas as pd
 
 from project_utils import make_time_series_frame, CoinMetaData
-from api_client.http_client import get_time_series, get
-from config import DEFAULT_CURRENCY, PRICE_PRECISION, DEFAULT_COIN
+from api_client.catalog import CoinIndex, coin_index, currencies_catalog, markets_catalog, resolve_coin as resolve
+from cache import frame_cache, FrameKey
+from api_client.http_client import get_time_series, get_time_series_batch, SyncReport, Freshness
+from config import (DEFAULT_CURRENCY, DEFAULT_COIN, BATCH_MAX_WORKERS, COINGECKO_API_URL,
+                    COINS_CATALOG_TTL, CURRENCIES_CATALOG_TTL, MARKETS_CATALOG_TTL)
 
 
-def get_currencies() -> pd.Series:
-    """ Returns Series with all available currencies, else if status code = 4xx or 5xx raises HTTPError. """
-    url = "https://api.coingecko.com/api/v3/simple/supported_vs_currencies"
-    data = get(url)
+def get_currencies(ttl: float = CURRENCIES_CATALOG_TTL) -> pd.Series:
+    """ Returns Series with all available currencies, else if status code = 4xx or 5xx raises HTTPError.
 
-    return pd.Series(data) if data else pd.Series()
+    The list is cached and only downloaded again once it's older than ttl seconds. """
+    return _currencies_series(currencies_catalog(ttl))
 
 
-def get_coins() -> pd.DataFrame:
+def get_coins(ttl: float = COINS_CATALOG_TTL) -> pd.DataFrame:
     """ Returns DataFrame with all available coin IDs, symbols and names.
 
     Frame columns:
         'id' | 'symbol' | 'name'
 
+     The list is cached and only downloaded again once it's older than ttl seconds.
      If status code = 4xx or 5xx raises HTTPError. """
-    url = "https://api.coingecko.com/api/v3/coins/list"
-    data = get(url)
-
-    return pd.DataFrame(data) if data else pd.DataFrame()
+    return _coins_frame(coin_index(ttl).coins)
 
 
-def get_sorted_by_mkt_cap(n: int=10, currency_symbol: str = DEFAULT_CURRENCY) -> pd.DataFrame:
+def get_sorted_by_mkt_cap(
+        n: int=10,
+        currency_symbol: str = DEFAULT_CURRENCY,
+        ttl: float = MARKETS_CATALOG_TTL,
+) -> pd.DataFrame:
     """ Returns DataFrame with n (max. 250) coins IDs, symbols, names, market capitalization and current prices,
      where coins have the biggest market capitalization.
 
      Frame columns:
         'id' | 'symbol' | 'name' | 'market_cap' | 'current_price'
 
+     The ranking is cached per currency and only downloaded again once it's older than ttl seconds.
      If status code = 4xx or 5xx raises HTTPError. """
-    if not isinstance(n, int):
-        raise TypeError("n must be an integer")
+    _check_n(n)
 
-    url = "https://api.coingecko.com/api/v3/coins/markets"
-    params = {"vs_currency": currency_symbol,
-              "per_page": n,
-              "precision": PRICE_PRECISION}
-    data = get(url, params)
+    return _markets_frame(markets_catalog(n, currency_symbol, ttl))
 
-    return pd.DataFrame(data)[['id', 'symbol', 'name', 'market_cap', 'current_price']] \
-        if data else pd.DataFrame()
+
+def find_coins(symbol: str = None, name_prefix: str = None) -> pd.DataFrame:
+    """ Returns DataFrame with cached coins matching symbol (case-insensitive)
+    and/or starting with name_prefix.
+
+    Frame columns:
+        'id' | 'symbol' | 'name' """
+    return _find_in_index(coin_index(), symbol, name_prefix)
+
+
+def resolve_coin(query: str, currency_symbol: str = DEFAULT_CURRENCY) -> CoinMetaData:
+    """ Returns CoinMetaData for a coin id, ticker symbol (e.g. 'btc') or exact coin name.
+
+    Symbols shared by several coins resolve to the one with the biggest market capitalization
+    among the cached ranking. Raises ValueError for unknown coins. """
+    ranked_ids = [coin['id'] for coin in markets_catalog(250, currency_symbol)] \
+        if _is_ambiguous(coin_index(), query) else []
+    return resolve(query, currency_symbol, ranked_ids)
 
 
 def get_historical_data(
         coin_meta: CoinMetaData = CoinMetaData(DEFAULT_COIN, DEFAULT_CURRENCY),
-        starting_dt: datetime = None
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+        max_staleness: timedelta | None = None,
 ) -> pd.DataFrame:
     """ Returns DataFrame with historical data from day mathing
     starting_dt, or if it's None, from range of DEFAULT_DAYS.
@@ -64,17 +88,40 @@ def get_historical_data(
     Frame columns:
         'timestamp' | 'price' | 'market_cap' | 'total_volume'
 
-     If status code = 4xx or 5xx raises HTTPError. """
+     columnar=True reads the cache straight into typed NumPy columns instead of per-row dicts,
+     columns limits the returned columns ('timestamp' is always kept).
+     delta=True refreshes only the rows newer than the cached high-water mark.
+     start / end limit the returned rows (UTC, inclusive); start also serves as starting_dt if that's None.
+     bucket (e.g. '1h', '4h', '1D') aggregates rows inside SQLite into fixed, epoch-aligned buckets
+     labelled by their start: first open, max high, min low, last close/price/market_cap, summed volume.
+     Frame attrs['sync_report'] holds the SyncReport of the refresh, attrs['freshness'] a Freshness
+     (newest cached row, its age, whether a refresh is still running).
+
+     max_staleness opts into stale-while-revalidate: if the newest cached row is at most that old,
+     the cached frame is returned without waiting on the network (or on retry back-off) and
+     the cache is refreshed on a background thread.
 
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_meta.coin_id}/market_chart"
-    data = get_time_series(url, coin_meta, starting_dt, 'historical_data')
+     Frames are kept in an in-process LRU (cache.frame_cache) for FRAME_CACHE_TTL seconds,
+     repeated calls within that time don't touch SQLite or the network, whatever their starting_dt.
 
-    return make_time_series_frame(data, coin_meta)
+     If status code = 4xx or 5xx raises HTTPError. """
+
+    return _get_time_series_frame(_market_chart_url(coin_meta), coin_meta, starting_dt or start, 'historical_data',
+                                  columnar=columnar, columns=columns, delta=delta,
+                                  start=start, end=end, bucket_ms=_bucket_ms(bucket), max_staleness=max_staleness)
 
 
 def get_ohlc_data(
         coin_meta: CoinMetaData = CoinMetaData(DEFAULT_COIN, DEFAULT_CURRENCY),
-        starting_dt: datetime=None
+        starting_dt: datetime=None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+        max_staleness: timedelta | None = None,
 ) -> pd.DataFrame:
     """ Returns a DataFrame with OHLC data from the day matching
     starting_dt, or if it's None, from the range of DEFAULT_DAYS
@@ -88,9 +135,150 @@ def get_ohlc_data(
     Frame columns:
         timestamp | open | high | low | close
 
+    columnar, columns, delta, start, end, bucket and max_staleness work as in get_historical_data.
+
     If status code = 4xx or 5xx raises HTTPError. """
 
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_meta.coin_id}/ohlc"
-    data = get_time_series(url, coin_meta, starting_dt, 'ohlc_data')
+    return _get_time_series_frame(_ohlc_url(coin_meta), coin_meta, starting_dt or start, 'ohlc_data',
+                                  columnar=columnar, columns=columns, delta=delta,
+                                  start=start, end=end, bucket_ms=_bucket_ms(bucket), max_staleness=max_staleness)
+
+
+def _get_time_series_frame(url: str,
+                           coin_meta: CoinMetaData,
+                           starting_dt: datetime | None,
+                           table_name: str,
+                           max_staleness: timedelta | None = None,
+                           **read_options) -> pd.DataFrame:
+    """ Serves the frame from the in-process frame cache (no refresh, empty SyncReport),
+    or refreshes the SQLite cache and builds it. Frames served while a refresh is still
+    running are not kept, the refresh would make them outdated right away. """
+    key = _frame_key(table_name, coin_meta, starting_dt, read_options)
+
+    cached = frame_cache.get(key)
+    if cached is not None:
+        return _with_sync_report(cached, _cache_hit_report(cached))
+
+    data, sync_report = get_time_series(url, coin_meta, starting_dt, table_name,
+                                        max_staleness=max_staleness, **read_options)
+    frame = _with_sync_report(make_time_series_frame(data, coin_meta), sync_report)
+    if not sync_report.revalidating:
+        frame_cache.put(key, frame)
+    return frame
+
+
+def _frame_key(table_name: str,
+               coin_meta: CoinMetaData,
+               starting_dt: datetime | None,
+               read_options: dict) -> FrameKey:
+    # starting_dt only steers the download, the frame holds whatever the cache has; callers usually
+    # derive it from now(), so keying on it would make every call a miss
+    options_key = tuple((name, tuple(value) if isinstance(value, list) else value)
+                        for name, value in sorted(read_options.items()))
+    return FrameKey(table_name, coin_meta, options_key)
+
+
+def get_historical_data_batch(
+        coin_metas: list[CoinMetaData],
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+        max_workers: int = BATCH_MAX_WORKERS,
+) -> dict[CoinMetaData, pd.DataFrame]:
+    """ get_historical_data for many coins, downloaded in parallel and cached in one batched write.
+    Use concat_time_series_frames to turn the result into one MultiIndex frame.
+
+     If status code = 4xx or 5xx raises HTTPError. """
+    urls = {coin_meta: _market_chart_url(coin_meta) for coin_meta in coin_metas}
+    results = get_time_series_batch(urls, starting_dt or start, 'historical_data',
+                                    columnar=columnar, columns=columns, delta=delta,
+                                    start=start, end=end, bucket_ms=_bucket_ms(bucket),
+                                    max_workers=max_workers)
+
+    return {coin_meta: _with_sync_report(make_time_series_frame(data, coin_meta), sync_report)
+            for coin_meta, (data, sync_report) in results.items()}
+
+
+def get_ohlc_data_batch(
+        coin_metas: list[CoinMetaData],
+        starting_dt: datetime = None,
+        *,
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        delta: bool = False,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: str | timedelta | None = None,
+        max_workers: int = BATCH_MAX_WORKERS,
+) -> dict[CoinMetaData, pd.DataFrame]:
+    """ get_ohlc_data for many coins, works as get_historical_data_batch.
+
+     If status code = 4xx or 5xx raises HTTPError. """
+    urls = {coin_meta: _ohlc_url(coin_meta) for coin_meta in coin_metas}
+    results = get_time_series_batch(urls, starting_dt or start, 'ohlc_data',
+                                    columnar=columnar, columns=columns, delta=delta,
+                                    start=start, end=end, bucket_ms=_bucket_ms(bucket),
+                                    max_workers=max_workers)
+
+    return {coin_meta: _with_sync_report(make_time_series_frame(data, coin_meta), sync_report)
+            for coin_meta, (data, sync_report) in results.items()}
+
+
+def _currencies_series(data: list[str]) -> pd.Series:
+    return pd.Series(data) if data else pd.Series()
+
+
+def _coins_frame(data: list[dict]) -> pd.DataFrame:
+    return pd.DataFrame(data) if data else pd.DataFrame()
+
+
+def _markets_frame(data: list[dict]) -> pd.DataFrame:
+    return pd.DataFrame(data)[['id', 'symbol', 'name', 'market_cap', 'current_price']] \
+        if data else pd.DataFrame()
+
+
+def _check_n(n: int) -> None:
+    if not isinstance(n, int):
+        raise TypeError("n must be an integer")
+
+
+def _find_in_index(index: CoinIndex, symbol: str | None, name_prefix: str | None) -> pd.DataFrame:
+    found = index.by_symbol(symbol) if symbol is not None else index.coins
+    if name_prefix is not None:
+        prefixed = {coin['id'] for coin in index.by_name_prefix(name_prefix)}
+        found = [coin for coin in found if coin['id'] in prefixed]
+
+    return pd.DataFrame(found, columns=['id', 'symbol', 'name'])
+
+
+def _is_ambiguous(index: CoinIndex, query: str) -> bool:
+    """ Symbols shared by several coins need the market-cap ranking to pick one. """
+    return len(index.by_symbol(query)) > 1
+
+
+def _bucket_ms(bucket: str | timedelta | None) -> int | None:
+    return None if bucket is None else int(pd.Timedelta(bucket).total_seconds() * 1000)
+
+
+def _market_chart_url(coin_meta: CoinMetaData, api_url: str = COINGECKO_API_URL) -> str:
+    return f"{api_url}/coins/{coin_meta.coin_id}/market_chart"
+
+
+def _ohlc_url(coin_meta: CoinMetaData, api_url: str = COINGECKO_API_URL) -> str:
+    return f"{api_url}/coins/{coin_meta.coin_id}/ohlc"
+
+
+def _with_sync_report(ts_frame: pd.DataFrame, sync_report: SyncReport) -> pd.DataFrame:
+    ts_frame.attrs['sync_report'] = sync_report
+    ts_frame.attrs['freshness'] = Freshness.of(sync_report)
+    return ts_frame
+
 
-    return make_time_series_frame(data, coin_meta)
\ No newline at end of file
+def _cache_hit_report(cached: pd.DataFrame) -> SyncReport:
+    """ Nothing was refreshed, but the newest cached row is still the one the frame was built with. """
+    return SyncReport(last_cached_ts=cached.attrs['sync_report'].last_cached_ts)
\ No newline at end of file
@@ -1,17 +1,63 @@
-from datetime import datetime
-from typing import Any, TypeAlias
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, TypeAlias, NamedTuple
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 
-from cache import CacheManager
-from config import PRICE_PRECISION
-from project_utils import CoinMetaData, days_to_call
+from api_client.rate_limiter import RateLimiter
+from api_client.single_flight import SingleFlight, SingleFlightStats
+from cache import (CacheManager, count_raw_rows, get_connection, response_cache, ResponseCacheStats,
+                   StoredResponse)
+from config import PRICE_PRECISION, FREE_API_CALLS_PER_MINUTE, BATCH_MAX_WORKERS, DEFAULT_DAYS
+from project_utils import (CoinMetaData, days_to_call, utc_from_cached_ts, days_since_dt, days_for_free_api,
+                           get_metrics, timer)
 
 JSON: TypeAlias = dict[str, Any] | list[Any] | str | int | float | bool | None
 
 
+class SyncReport(NamedTuple):
+    """ What a single cache refresh downloaded and how much of it was actually written.
+
+    last_cached_ts is the newest cached timestamp (ms) when the data was read back;
+    revalidating tells that the cache was served as is while the refresh runs in the background. """
+    rows_received: int = 0
+    rows_upserted: int = 0
+    bytes_received: int = 0
+    last_cached_ts: int | None = None
+    revalidating: bool = False
+
+    @property
+    def rows_saved(self) -> int:
+        return self.rows_received - self.rows_upserted
+
+    @property
+    def bytes_saved(self) -> int:
+        """ Share of the payload that belonged to rows already in the cache. """
+        if not self.rows_received:
+            return 0
+        return round(self.bytes_received * self.rows_saved / self.rows_received)
+
+
+class Freshness(NamedTuple):
+    """ How current a returned series is: its newest cached row, that row's age when the series
+    was returned, and whether a background refresh was still running. """
+    last_cached: datetime | None
+    age: timedelta | None
+    revalidating: bool = False
+
+    @classmethod
+    def of(cls, sync_report: SyncReport) -> 'Freshness':
+        if sync_report.last_cached_ts is None:
+            return cls(None, None, sync_report.revalidating)
+        last_cached = utc_from_cached_ts(sync_report.last_cached_ts)
+        return cls(last_cached, datetime.now(timezone.utc) - last_cached, sync_report.revalidating)
+
+
 class PrintingRetry(Retry):
     def sleep(self, response=None):
         retry_after = self.get_retry_after(response)
@@ -22,6 +68,8 @@ class PrintingRetry(Retry):
             url    = getattr(response, "url", "unknown") if response else "unknown"
             reason = f"Retry-After={retry_after}s" if retry_after else f"back-off={sleep_time:.1f}s"
             print(f"⚠️  Rate-limit/back-off triggered for {url} — {reason}")
+            get_metrics().inc('http_backoff_seconds_total', sleep_time)
+        get_metrics().inc('http_retries_total', reason=str(response.status) if response else 'error')
 
         super().sleep(response)
 
@@ -42,33 +90,308 @@ _adapter = HTTPAdapter(
 _session = requests.Session()
 _session.mount("https://", _adapter)
 
+_rate_limiter = RateLimiter(FREE_API_CALLS_PER_MINUTE)
+
+_in_flight = SingleFlight()
+
+# (url, coin, table) -> earliest starting_dt asked for since its last refresh was planned
+_wanted_since: dict[tuple[str, CoinMetaData, str], datetime | None] = {}
+_wanted_since_lock = threading.Lock()
+
+# stale-while-revalidate refreshes run here, off the caller's thread
+_revalidator = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='revalidate')
+
+# (table, coin) -> time.monotonic() until which a background refresh keeps the series current
+_fresh_until: dict[tuple[str, CoinMetaData], float] = {}
+
 
 def get(url: str,
         params: dict[str, Any] = None,
         *,
-        timeout: tuple[float, float] = (5, 30)) -> JSON:
-    response = _session.get(url, params=params, timeout=timeout)
+        timeout: tuple[float, float] = (5, 30),
+        max_age: float | None = None) -> JSON:
+    return get_with_size(url, params, timeout=timeout, max_age=max_age)[0]
+
+
+def get_with_size(url: str,
+                  params: dict[str, Any] = None,
+                  *,
+                  timeout: tuple[float, float] = (5, 30),
+                  max_age: float | None = None) -> tuple[JSON, int]:
+    """ Same as get, but also returns the size of the downloaded body in bytes (0 if none was downloaded).
+
+    With max_age (seconds) the response goes through the on-disk response cache (cache.response_cache):
+    a stored response at most max_age old is returned without a request, an older one is revalidated
+    with If-None-Match / If-Modified-Since and reused on 304 Not Modified, without downloading the body. """
+    stored = response_cache.get(url, params, max_age) if max_age is not None else None
+    if stored is not None and stored.fresh:
+        return json.loads(stored.body), 0
+
+    metrics, endpoint = get_metrics(), _endpoint(url)
+    metrics.inc('rate_limit_wait_seconds_total', _rate_limiter.acquire())
+    with timer('http_request_seconds', endpoint=endpoint):  # retries and back-off included
+        response = _session.get(url, params=params, timeout=timeout, headers=_validators(stored))
+    metrics.inc('http_requests_total', endpoint=endpoint, status=str(response.status_code))
+    if response.status_code == 304 and stored is not None:
+        response_cache.revalidated(url, params, stored)
+        return json.loads(stored.body), 0
+
     response.raise_for_status()
-    return response.json()
+    metrics.inc('http_bytes_total', _wire_size(response), endpoint=endpoint)
+    if max_age is not None and 'no-store' not in response.headers.get('Cache-Control', ''):
+        response_cache.put(url, params, response.content,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.json(), len(response.content)
 
 
 def get_time_series(url: str,
                     coin_meta: CoinMetaData,
                     starting_dt: datetime | None,
-                    table_name: str) -> dict | Any | None:
+                    table_name: str,
+                    *,
+                    delta: bool = False,
+                    max_staleness: timedelta | None = None,
+                    **read_options) -> tuple[dict | Any | None, SyncReport]:
+    """ Refreshes the cache if needed and returns the cached series with a SyncReport of the refresh.
+
+    With delta=True the refresh starts at the (table, coin, currency) high-water mark
+    stored in last_timestamps: historical data is requested through the /range endpoint
+    for exactly the missing window, and only rows newer than the mark are upserted.
+
+    read_options (columnar, columns, start, end, bucket_ms) select what is read back from the cache.
+
+    Concurrent calls for the same (url, coin, table) share one refresh: the first
+    downloads and upserts, the others wait for it and get its SyncReport (see coalescing_stats),
+    then each reads its own view of the cache. The refresh is planned with the earliest starting_dt
+    among the calls that joined before it started.
+
+    With max_staleness (stale-while-revalidate), a cache whose newest row is at most that old is
+    returned right away and the refresh runs on a background thread; the SyncReport is then empty
+    apart from last_cached_ts and revalidating=True. Older or empty caches are refreshed first, as usual. """
+    if max_staleness is not None:
+        served = _serve_while_revalidating(url, coin_meta, starting_dt, table_name, delta, max_staleness, read_options)
+        if served is not None:
+            return served
+
+    report = _coalesced_refresh(url, coin_meta, starting_dt, table_name, delta)
+
+    with get_connection() as conn:
+        cache = CacheManager(coin_meta, table_name, conn=conn)
+        return _read_cached(cache, **read_options), _stamped(report, cache)
+
+
+def get_time_series_batch(urls: dict[CoinMetaData, str],
+                          starting_dt: datetime | None,
+                          table_name: str,
+                          *,
+                          delta: bool = False,
+                          max_workers: int = BATCH_MAX_WORKERS,
+                          **read_options) -> dict[CoinMetaData, tuple[dict | Any | None, SyncReport]]:
+    """ get_time_series for many coins at once.
+
+    Cache state is read first, then downloads run in a thread pool over the shared
+    session (throttled by the global rate limiter), and finally all writes go through
+    one transaction on the calling thread, so workers never compete for the SQLite
+    write lock and the lock is not held while waiting on the network. """
+
+    with get_connection() as conn:
+        requests_by_meta = {
+            coin_meta: _plan_sync(url, coin_meta, starting_dt,
+                                  CacheManager(coin_meta, table_name, conn=conn), table_name, delta)
+            for coin_meta, url in urls.items()
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {coin_meta: pool.submit(get_with_size, request.url, request.params)
+                   for coin_meta, request in requests_by_meta.items() if request}
+        downloads = {coin_meta: future.result() for coin_meta, future in futures.items()}
+
+    with get_connection(immediate=True) as conn, conn.begin():
+        result = {}
+        for coin_meta in urls:
+            cache = CacheManager(coin_meta, table_name, conn=conn)
+            report = _apply_sync(cache, requests_by_meta[coin_meta], *downloads[coin_meta]) \
+                if coin_meta in downloads else SyncReport()
+            result[coin_meta] = _read_cached(cache, **read_options), _stamped(report, cache)
+        return result
+
+
+def coalescing_stats() -> SingleFlightStats:
+    """ How many get_time_series calls (sync and async) ran a refresh and how many joined one in flight. """
+    return _in_flight.stats()
+
+
+def response_cache_stats() -> ResponseCacheStats:
+    """ How many max_age calls the response cache answered, with or without a 304 round trip,
+    and how many body bytes that kept off the network. """
+    return response_cache.stats()
 
-    with (CacheManager(coin_meta, table_name) as cache):
+
+class _SyncRequest(NamedTuple):
+    url: str
+    params: dict[str, Any]
+    newer_than: int | None = None
+
+
+def _plan_sync(url: str,
+               coin_meta: CoinMetaData,
+               starting_dt: datetime | None,
+               cache: CacheManager,
+               table_name: str,
+               delta: bool,
+               force: bool = False) -> _SyncRequest | None:
+    """ Decides which request (if any) brings the cache up to date.
+
+    Series a RefreshScheduler keeps warm count as up to date until their next scheduled refresh,
+    unless force is set. """
+    if not force and time.monotonic() < _fresh_until.get((table_name, coin_meta), 0.0):
+        return None
+
+    params = {"vs_currency": coin_meta.currency,
+              "precision": PRICE_PRECISION}
+
+    mark = cache.high_water_mark() if delta else None
+    if mark is None:
         days = days_to_call(starting_dt,
                             cache.last_dt(),
                             is_ohlc = table_name=='ohlc_data')
-        if days != 0:
-            params = {"vs_currency": coin_meta.currency,
-                      "precision": PRICE_PRECISION,
-                      "days": days}
+        return _SyncRequest(url, params | {"days": days}) if days != 0 else None
+
+    if table_name == 'historical_data':
+        now_s = int(datetime.now(timezone.utc).timestamp())
+        return _SyncRequest(f"{url}/range", params | {"from": mark // 1000, "to": now_s}, mark)
+
+    # OHLC has no free /range endpoint, only the fixed day buckets
+    days = days_for_free_api(days_since_dt(utc_from_cached_ts(mark)))
+    return _SyncRequest(url, params | {"days": days}, mark)
+
+
+def _refresh(url: str,
+             coin_meta: CoinMetaData,
+             starting_dt: datetime | None,
+             table_name: str,
+             delta: bool,
+             force: bool = False) -> SyncReport:
+    """ Plans on a read connection and downloads outside any transaction; the write lock is only
+    taken for the upsert, so other writers don't wait on the network (or on retry back-off). """
+    with CacheManager(coin_meta, table_name, read_only=True) as cache:
+        request = _plan_sync(url, coin_meta, starting_dt, cache, table_name, delta, force)
+    if not request:
+        return SyncReport()
+
+    download = get_with_size(request.url, request.params)
+    with CacheManager(coin_meta, table_name) as cache:
+        return _apply_sync(cache, request, *download)
+
+
+def _coalesced_refresh(url: str,
+                       coin_meta: CoinMetaData,
+                       starting_dt: datetime | None,
+                       table_name: str,
+                       delta: bool,
+                       force: bool = False) -> SyncReport:
+    """ _refresh shared with every concurrent call for the same series (see get_time_series). """
+    key = _flight_key(url, coin_meta, table_name, starting_dt)
+    return _in_flight.do(key, lambda: _refresh(url, coin_meta, _planned_starting_dt(key, starting_dt),
+                                               table_name, delta, force))
+
+
+def _flight_key(url: str,
+                coin_meta: CoinMetaData,
+                table_name: str,
+                starting_dt: datetime | None) -> tuple[str, CoinMetaData, str]:
+    """ The single-flight key of a series refresh; records starting_dt for whichever call plans it. """
+    key = (url, coin_meta, table_name)
+    with _wanted_since_lock:
+        if key not in _wanted_since or _window_start(starting_dt) < _window_start(_wanted_since[key]):
+            _wanted_since[key] = starting_dt
+    return key
+
+
+def _planned_starting_dt(key: tuple[str, CoinMetaData, str], starting_dt: datetime | None) -> datetime | None:
+    """ The earliest starting_dt recorded for key, taken by the call that leads its refresh. """
+    with _wanted_since_lock:
+        wanted = _wanted_since.pop(key, starting_dt)
+    return wanted if _window_start(wanted) < _window_start(starting_dt) else starting_dt
+
+
+def _window_start(starting_dt: datetime | None) -> datetime:
+    """ Where a refresh for starting_dt begins on an empty cache; None means DEFAULT_DAYS back. """
+    return starting_dt or datetime.now(timezone.utc) - timedelta(days=DEFAULT_DAYS)
+
+
+def _serve_while_revalidating(url: str,
+                              coin_meta: CoinMetaData,
+                              starting_dt: datetime | None,
+                              table_name: str,
+                              delta: bool,
+                              max_staleness: timedelta,
+                              read_options: dict) -> tuple[dict | Any | None, SyncReport] | None:
+    """ The cached series if its newest row is at most max_staleness old, with a background refresh
+    started; None if the caller has to refresh first. """
+    with get_connection() as conn:
+        cache = CacheManager(coin_meta, table_name, conn=conn)
+        mark = cache.high_water_mark()
+        if mark is None or datetime.now(timezone.utc) - utc_from_cached_ts(mark) > max_staleness:
+            return None
+        _revalidate(url, coin_meta, starting_dt, table_name, delta)
+        return _read_cached(cache, **read_options), SyncReport(last_cached_ts=mark, revalidating=True)
+
+
+def _revalidate(url: str,
+                coin_meta: CoinMetaData,
+                starting_dt: datetime | None,
+                table_name: str,
+                delta: bool) -> None:
+    """ Starts a coalesced refresh on the background pool; failures are reported, not raised. """
+    def refresh():
+        try:
+            _coalesced_refresh(url, coin_meta, starting_dt, table_name, delta)
+        except Exception as e:
+            print(f"⚠️  Background refresh of {table_name} for "
+                  f"{coin_meta.coin_id}/{coin_meta.currency} failed — {e}")
+
+    _revalidator.submit(refresh)
+
+
+def _validators(stored: StoredResponse | None) -> dict[str, str]:
+    """ Conditional request headers that let the server answer 304 if the stored body is still current. """
+    if stored is None:
+        return {}
+    headers = {'If-None-Match': stored.etag} if stored.etag else {}
+    if stored.last_modified:
+        headers['If-Modified-Since'] = stored.last_modified
+    return headers
+
+
+def _wire_size(response: requests.Response) -> int:
+    """ Bytes received for the body over the network, before gzip / deflate decoding. """
+    return response.raw.tell() if response.raw is not None else len(response.content)
+
+
+def _endpoint(url: str) -> str:
+    """ Metrics label of a request: the last path segment (market_chart, range, ohlc, markets...). """
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+def _stamped(report: SyncReport, cache: CacheManager) -> SyncReport:
+    return report._replace(last_cached_ts=cache.high_water_mark())
+
+
+def _apply_sync(cache: CacheManager,
+                request: _SyncRequest,
+                raw_data: JSON,
+                size: int) -> SyncReport:
+    upserted = cache.upsert(raw_data, newer_than=request.newer_than)
+    return SyncReport(count_raw_rows(raw_data), upserted, size)
 
-            raw_data = get(url, params)
-            cache.upsert(raw_data)
 
-        return cache.fetch_local()
+def _read_cached(cache: CacheManager,
+                 columnar: bool = False,
+                 **fetch_options) -> dict | Any | None:
+    return cache.fetch_columns(**fetch_options) if columnar \
+        else cache.fetch_local(**fetch_options)
 
-__all__ = ["get", "get_time_series"]
\ No newline at end of file
+__all__ = ["get", "get_with_size", "get_time_series", "get_time_series_batch", "coalescing_stats",
+           "response_cache_stats", "ResponseCacheStats",
+           "SyncReport", "Freshness", "SingleFlightStats"]
\ No newline at end of file
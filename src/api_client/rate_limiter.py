@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """ Thread-safe sliding-window limiter: at most max_calls acquisitions in any `period` seconds.
+
+    Shared by every worker thread, so parallel fetches queue here instead of
+    all tripping 429 and PrintingRetry's back-off at once. The async client awaits
+    the same limiter through acquire_async, so both clients share one budget. """
+    def __init__(self, max_calls: int, period: float = 60.0):
+        if max_calls < 1:
+            raise ValueError("max_calls must be at least 1")
+        self.max_calls = max_calls
+        self.period = period
+        self._calls: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """ Blocks until a call is allowed, returns the number of seconds waited. """
+        waited = 0.0
+        while wait := self.try_acquire():
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    async def acquire_async(self) -> float:
+        """ acquire for coroutines: waits with asyncio.sleep, without blocking the event loop. """
+        waited = 0.0
+        while wait := self.try_acquire():
+            await asyncio.sleep(wait)
+            waited += wait
+        return waited
+
+    def try_acquire(self) -> float:
+        """ Takes a call slot and returns 0, or returns how long to wait before trying again. """
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+
+            if len(self._calls) < self.max_calls:
+                self._calls.append(now)
+                return 0.0
+
+            return self.period - (now - self._calls[0])
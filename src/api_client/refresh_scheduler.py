@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Iterable, NamedTuple
+
+from api_client import http_client
+from api_client.coingecko import get_sorted_by_mkt_cap, _market_chart_url, _ohlc_url
+from api_client.http_client import SyncReport
+from api_client.rate_limiter import RateLimiter
+from config import (COINGECKO_API_URL, DEFAULT_CURRENCY, REFRESH_TIERS, OHLC_MIN_REFRESH_INTERVAL,
+                    REFRESH_CALLS_PER_MINUTE)
+from project_utils import CoinMetaData
+
+TABLES = ('historical_data', 'ohlc_data')
+# a failed refresh is tried again after at most this many seconds
+_RETRY_AFTER_FAILURE = 60
+
+
+class WatchedSeries(NamedTuple):
+    coin_meta: CoinMetaData
+    table_name: str
+    interval: float     # seconds between refreshes
+    priority: int       # lower is refreshed first when several series are due
+
+
+class RefreshResult(NamedTuple):
+    series: WatchedSeries
+    report: SyncReport | None
+    error: Exception | None = None
+
+
+class SchedulerStats(NamedTuple):
+    watched: int
+    refreshes: int
+    failures: int
+    rows_upserted: int
+    overdue: int        # series past their refresh time, e.g. while the budget is spent
+
+
+class RefreshScheduler:
+    """ Keeps a watchlist of series warm in the SQLite cache from a background thread.
+
+    Every watched (coin, table) is refreshed through the same deduplicated path as get_time_series
+    (delta requests from the high-water mark) once per its tier's interval, most important series
+    first. Until its next refresh is due a series counts as up to date, so foreground reads of it
+    skip the network. The scheduler draws calls_per_minute from its own limiter on top of
+    the global one, which leaves the rest of the API budget to foreground calls.
+
+        with RefreshScheduler() as scheduler:
+            scheduler.watch_top(20)
+            ...
+    """
+    def __init__(self,
+                 calls_per_minute: int = REFRESH_CALLS_PER_MINUTE,
+                 api_url: str = COINGECKO_API_URL):
+        self.api_url = api_url
+        self._budget = RateLimiter(calls_per_minute)
+        self._watched: dict[tuple[CoinMetaData, str], WatchedSeries] = {}
+        self._due: dict[tuple[CoinMetaData, str], float] = {}
+        self._refreshes = self._failures = self._rows_upserted = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def watch(self,
+              coin_metas: Iterable[CoinMetaData],
+              tier: str = '5min',
+              tables: Iterable[str] = TABLES) -> None:
+        """ Adds coins to the watchlist; coins watched earlier keep their higher priority.
+        Watching a coin again changes its tier. New series are due right away. """
+        if tier not in REFRESH_TIERS:
+            raise ValueError(f"Unknown refresh tier {tier!r}, use one of: {', '.join(REFRESH_TIERS)}")
+        tables = tuple(tables)
+        for table_name in tables:
+            if table_name not in TABLES:
+                raise ValueError(f"Unknown table {table_name!r}, use one of: {', '.join(TABLES)}")
+
+        with self._lock:
+            for coin_meta in coin_metas:
+                for table_name in tables:
+                    key = (coin_meta, table_name)
+                    priority = self._watched[key].priority if key in self._watched else len(self._watched)
+                    self._watched[key] = WatchedSeries(coin_meta, table_name,
+                                                       _interval(table_name, tier), priority)
+                    self._due.setdefault(key, 0.0)
+        self._wake.set()
+
+    def watch_top(self, n: int = 10, currency_symbol: str = DEFAULT_CURRENCY, tier: str = '5min') -> None:
+        """ Watches the n biggest coins by market capitalization, in rank order. """
+        ranking = get_sorted_by_mkt_cap(n, currency_symbol)
+        self.watch([CoinMetaData(coin_id, currency_symbol) for coin_id in ranking.get('id', [])], tier)
+
+    def unwatch(self, coin_metas: Iterable[CoinMetaData]) -> None:
+        with self._lock:
+            for coin_meta in coin_metas:
+                for table_name in TABLES:
+                    self._watched.pop((coin_meta, table_name), None)
+                    self._due.pop((coin_meta, table_name), None)
+                    http_client._fresh_until.pop((table_name, coin_meta), None)
+
+    def watchlist(self) -> list[WatchedSeries]:
+        with self._lock:
+            return sorted(self._watched.values(), key=lambda series: series.priority)
+
+    def run_pending(self) -> list[RefreshResult]:
+        """ Refreshes every due series in priority order, as far as the budget allows.
+        The background thread calls this in a loop; it can also be driven by hand. """
+        now = time.monotonic()
+        with self._lock:
+            due = sorted((series for key, series in self._watched.items() if self._due[key] <= now),
+                         key=lambda series: series.priority)
+
+        results = []
+        for series in due:
+            if self._stopping.is_set() or self._budget.try_acquire():
+                break
+            results.append(self._refresh(series))
+        return results
+
+    def start(self) -> 'RefreshScheduler':
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='coingecko-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """ Stops after the refresh in progress, if any. """
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> SchedulerStats:
+        now = time.monotonic()
+        with self._lock:
+            return SchedulerStats(len(self._watched), self._refreshes, self._failures, self._rows_upserted,
+                                  sum(due <= now for due in self._due.values()))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self.run_pending()
+            self._wake.wait(self._seconds_to_next())
+            self._wake.clear()
+
+    def _seconds_to_next(self) -> float:
+        with self._lock:
+            next_due = min(self._due.values(), default=None)
+        if next_due is None:
+            return _RETRY_AFTER_FAILURE
+        return max(next_due - time.monotonic(), self._budget.period / self._budget.max_calls)
+
+    def _refresh(self, series: WatchedSeries) -> RefreshResult:
+        coin_meta, table_name = series.coin_meta, series.table_name
+        url = _market_chart_url(coin_meta, self.api_url) if table_name == 'historical_data' \
+            else _ohlc_url(coin_meta, self.api_url)
+        started = time.monotonic()
+
+        try:
+            report = http_client._coalesced_refresh(url, coin_meta, None, table_name, delta=True, force=True)
+        except Exception as e:
+            print(f"⚠️  Background refresh of {table_name} for "
+                  f"{coin_meta.coin_id}/{coin_meta.currency} failed — {e}")
+            with self._lock:
+                self._failures += 1
+                if (coin_meta, table_name) in self._due:
+                    self._due[coin_meta, table_name] = started + min(series.interval, _RETRY_AFTER_FAILURE)
+            return RefreshResult(series, None, e)
+
+        with self._lock:
+            self._refreshes += 1
+            self._rows_upserted += report.rows_upserted
+            if (coin_meta, table_name) in self._due:  # not unwatched meanwhile
+                self._due[coin_meta, table_name] = started + series.interval
+                http_client._fresh_until[table_name, coin_meta] = started + series.interval
+        return RefreshResult(series, report)
+
+
+def _interval(table_name: str, tier: str) -> float:
+    interval = REFRESH_TIERS[tier]
+    return max(interval, OHLC_MIN_REFRESH_INTERVAL) if table_name == 'ohlc_data' else interval
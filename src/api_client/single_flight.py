@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple
+
+
+class SingleFlightStats(NamedTuple):
+    calls: int
+    executions: int
+    coalesced: int
+
+    @property
+    def coalesced_rate(self) -> float:
+        return self.coalesced / self.calls if self.calls else 0.0
+
+
+class SingleFlight:
+    """ Thread-safe call deduplication: while a call for a key runs, later calls for the same key
+    wait for it and get its result (or its exception) instead of running again.
+
+    Threads (do) and coroutines (do_async) share the same flights, so a coroutine can wait
+    on a refresh a worker thread started and vice versa. Nothing is cached: once a call
+    finishes, the next one for its key runs again. """
+    def __init__(self):
+        self._flights: dict[Hashable, Future] = {}
+        self._calls = self._executions = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        flight, leads = self._join(key)
+        if not leads:
+            return flight.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result=result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """ do for coroutines: fn is called (and awaited) only by the leading caller. """
+        flight, leads = self._join(key)
+        if not leads:
+            return await asyncio.wrap_future(flight)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result=result)
+        return result
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return SingleFlightStats(self._calls, self._executions, self._calls - self._executions)
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        """ Returns the key's flight and whether the caller has to run it. """
+        with self._lock:
+            self._calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+
+            flight = self._flights[key] = Future()
+            self._executions += 1
+            return flight, True
+
+    def _land(self, key: Hashable, flight: Future, result: Any = None, error: BaseException | None = None) -> None:
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(result)
@@ -1,5 +1,36 @@
-from cache.cache_manager import CacheManager
+from cache.cache_manager import CacheManager, BackfillProgress
+from cache.catalog_cache import CatalogCache
+from cache.response_cache import response_cache, ResponseCache, ResponseCacheStats, StoredResponse
+from cache.multi_series import fetch_many_columns
+from cache.frame_cache import frame_cache, FrameCache, FrameKey, FrameCacheStats
+from cache.parsers import count_raw_rows
+from cache.notifications import subscribe_upserts, UpsertEvent
+from cache.session_pyramid import SessionPyramid
+from cache.snapshots import export_series, export_cache, load_series
+from cache.db_manager import get_connection, configure_engine, engine_settings, SQLiteProfile
 
 __all__ = [
     "CacheManager",
+    "BackfillProgress",
+    "CatalogCache",
+    "response_cache",
+    "ResponseCache",
+    "ResponseCacheStats",
+    "StoredResponse",
+    "frame_cache",
+    "FrameCache",
+    "FrameKey",
+    "FrameCacheStats",
+    "count_raw_rows",
+    "subscribe_upserts",
+    "UpsertEvent",
+    "fetch_many_columns",
+    "SessionPyramid",
+    "export_series",
+    "export_cache",
+    "load_series",
+    "get_connection",
+    "configure_engine",
+    "engine_settings",
+    "SQLiteProfile",
 ]
\ No newline at end of file
@@ -1,31 +1,83 @@
+import time
 from datetime import datetime
+from itertools import repeat
+from typing import NamedTuple
 
-from sqlalchemy import select, func, Column
+import numpy as np
+from sqlalchemy import select, func, Column, Connection
+from sqlalchemy.dialects.sqlite import insert
 
 from cache.db_manager import get_connection, get_table_or_throw
-from cache.parsers import normalize_data
-from project_utils import utc_from_cached_ts, CoinMetaData
+from cache.db_schema import last_timestamps, backfill_progress
+from cache.frame_cache import frame_cache
+from cache.notifications import has_upsert_listeners, make_upsert_event, publish_upsert, UpsertEvent
+from cache.parsers import normalize_data, Columns
+from cache.series import series_id_query, get_series_id
+from cache.session_pyramid import SessionPyramid
+from project_utils import utc_from_cached_ts, cached_ts_from_utc, CoinMetaData, get_metrics, timer
+
+
+# How each cached column is aggregated into a bucket, as in OHLCSessionMaker._resample_data
+BUCKET_AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'price': 'last',
+    'market_cap': 'last',
+    'total_volume': 'sum',
+}
+
+
+class BackfillProgress(NamedTuple):
+    """ Span of a series a bulk backfill has requested, [covered_from, covered_to) in ms,
+    and the rows it wrote so far. """
+    covered_from: int
+    covered_to: int
+    rows_upserted: int = 0
 
 
 class CacheManager:
     def __init__(
             self,
             coin_meta: CoinMetaData,
-            table_name: str
+            table_name: str,
+            conn: Connection | None = None,
+            read_only: bool = False,
     ):
+        """ If conn is given, the manager works inside the caller's connection and transaction
+        and can be used without entering the context.
+
+        Otherwise entering the context opens a transaction that takes the SQLite write lock up front
+        (BEGIN IMMEDIATE), so read-then-write sequences can't fail on a lock upgrade;
+        read_only=True opens a plain (deferred) transaction instead, which never blocks writers. """
         self._table = get_table_or_throw(table_name)
         self._coin_meta = coin_meta
+        self._conn = conn
+        self._owns_conn = conn is None
+        self._read_only = read_only
+        self._has_written = False
+        self._pending_events: list[UpsertEvent] = []
 
     def __enter__(self):
-        self._conn = get_connection()
+        if not self._owns_conn:
+            return self
+        self._conn = get_connection(immediate=not self._read_only)
         self._tran = self._conn.begin()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self._owns_conn:
+            return
         if exc_type:
             self._tran.rollback()
         else:
             self._tran.commit()
+            if self._has_written:
+                frame_cache.invalidate(self._table.name, self._coin_meta)
+            for event in self._pending_events:
+                publish_upsert(event)
+        self._pending_events.clear()
         self._conn.close()
 
     def last_dt(self) -> datetime | None:
@@ -34,38 +86,242 @@ class CacheManager:
         last_ts = self._conn.execute(self._filter_using_coin_meta(q)).scalar()
         return utc_from_cached_ts(last_ts) if last_ts else None
 
-    def fetch_local(self) -> list[dict]:
-        q_result = self._get_cursor_with_table_data()
+    def first_dt(self) -> datetime | None:
+        q = (select(func.min(self._table.c.timestamp))
+             .select_from(self._table))
+        first_ts = self._conn.execute(self._filter_using_coin_meta(q)).scalar()
+        return utc_from_cached_ts(first_ts) if first_ts else None
+
+    def high_water_mark(self) -> int | None:
+        """ Returns the newest cached timestamp (ms) recorded in last_timestamps.
+        Falls back to the data table for caches written before the mark was kept. """
+        q = (select(last_timestamps.c.timestamp)
+             .where(last_timestamps.c.table_name == self._table.name)
+             .where(last_timestamps.c.coin_id == self._coin_meta.coin_id)
+             .where(last_timestamps.c.currency_symbol == self._coin_meta.currency))
+        mark = self._conn.execute(q).scalar()
+        if mark is not None:
+            return mark
+
+        q = (select(func.max(self._table.c.timestamp))
+             .select_from(self._table))
+        return self._conn.execute(self._filter_using_coin_meta(q)).scalar()
+
+    def backfill_progress(self) -> BackfillProgress | None:
+        q = (select(backfill_progress.c.covered_from, backfill_progress.c.covered_to,
+                    backfill_progress.c.rows_upserted)
+             .where(backfill_progress.c.table_name == self._table.name)
+             .where(backfill_progress.c.coin_id == self._coin_meta.coin_id)
+             .where(backfill_progress.c.currency_symbol == self._coin_meta.currency))
+        row = self._conn.execute(q).first()
+        return BackfillProgress(*row) if row is not None else None
+
+    def save_backfill_progress(self, progress: BackfillProgress | None) -> None:
+        """ Stores (or with None, forgets) the backfill checkpoint; written in the same transaction
+        as the rows it covers, so the two can't disagree after an interruption. """
+        key = {'table_name': self._table.name,
+               'coin_id': self._coin_meta.coin_id,
+               'currency_symbol': self._coin_meta.currency}
+        if progress is None:
+            self._conn.execute(backfill_progress.delete()
+                               .where(*[backfill_progress.c[col] == value for col, value in key.items()]))
+            return
+
+        stmt = insert(backfill_progress).values(**key, **progress._asdict(), updated_at=int(time.time()))
+        self._conn.execute(stmt.on_conflict_do_update(
+            index_elements=[c.name for c in backfill_progress.primary_key],
+            set_={col: stmt.excluded[col] for col in (*BackfillProgress._fields, 'updated_at')},
+        ))
+
+    def fetch_local(
+            self,
+            start: datetime | None = None,
+            end: datetime | None = None,
+            columns: list[str] | None = None,
+            bucket_ms: int | None = None,
+    ) -> list[dict]:
+        """ Returns cached rows between start and end (inclusive) in timestamp order.
+
+        With bucket_ms, rows are aggregated inside SQLite into buckets of that many milliseconds
+        (bucket start as timestamp; first/max/min/last/sum per BUCKET_AGGREGATIONS). """
+        with timer('cache_read_seconds', table=self._table.name):
+            q_result = self._get_cursor_with_table_data(start, end, columns, bucket_ms)
+
+            cols = q_result.keys()
+            rows = q_result.fetchall()
+            get_metrics().inc('cache_rows_read_total', len(rows), table=self._table.name)
+            return [{col: val for col, val in zip(cols, row)} for row in rows]
+
+    def fetch_columns(
+            self,
+            start: datetime | None = None,
+            end: datetime | None = None,
+            columns: list[str] | None = None,
+            bucket_ms: int | None = None,
+    ) -> dict[str, np.ndarray]:
+        """ Columnar variant of fetch_local: returns one typed NumPy array per column,
+        built in bulk from the cursor rows, without any per-row dicts.
+
+        'timestamp' is returned as int64, every other column as float64 (NULL -> NaN). """
+        with timer('cache_read_seconds', table=self._table.name):
+            q_result = self._get_cursor_with_table_data(start, end, columns, bucket_ms)
 
-        cols = q_result.keys()
-        rows = q_result.fetchall()
-        return [{col: val for col, val in zip(cols, row)} for row in rows]
+            cols = list(q_result.keys())
+            rows = q_result.cursor.fetchall()  # plain DBAPI tuples, skips Row construction
+            q_result.close()
+            get_metrics().inc('cache_rows_read_total', len(rows), table=self._table.name)
+            if not rows:
+                return {col: np.empty(0, dtype=self._column_dtype(col)) for col in cols}
 
-    def upsert(self, raw_data: dict | list):
+            matrix = np.array(rows, dtype=np.float64)
+            return {col: matrix[:, i].astype(self._column_dtype(col), copy=False)
+                    for i, col in enumerate(cols)}
+
+    def upsert(self, raw_data: dict | list, newer_than: int | None = None, older_than: int | None = None) -> int:
+        """ Writes raw CoinGecko data to the cache, advances the high-water mark and
+        marks the session pyramid stale over the rows' time range (get_cached_session updates it).
+        If newer_than is given, rows with timestamp <= newer_than are skipped,
+        if older_than is given, rows with timestamp >= older_than.
+        The written rows are passed on to subscribe_upserts listeners.
+        Returns the number of rows written. """
+        with timer('cache_upsert_seconds', table=self._table.name):
+            upserted = self._upsert(raw_data, newer_than, older_than)
+        get_metrics().inc('cache_rows_upserted_total', upserted, table=self._table.name)
+        return upserted
+
+    def _upsert(self, raw_data: dict | list, newer_than: int | None, older_than: int | None) -> int:
         normalized_data = normalize_data(raw_data, self._table)
-        data_to_upsert = self._prepare_for_upsert(normalized_data)
+        if newer_than is not None or older_than is not None:
+            timestamps = normalized_data['timestamp']
+            is_kept = np.ones(len(timestamps), dtype=bool)
+            if newer_than is not None:
+                is_kept &= timestamps > newer_than
+            if older_than is not None:
+                is_kept &= timestamps < older_than
+            normalized_data = {col: values[is_kept] for col, values in normalized_data.items()}
+
+        timestamps = normalized_data['timestamp']
+        if not len(timestamps):
+            return 0
 
+        series_id = get_series_id(self._conn, self._coin_meta, self._table.name, create=True)
         stmt = self._table.insert().prefix_with('OR REPLACE') # SQLite only!
-        self._conn.execute(stmt, data_to_upsert)
+        self._conn.exec_driver_sql(str(stmt.compile(dialect=self._conn.dialect)),
+                                   self._prepare_for_upsert(normalized_data, series_id))
+
+        self._set_high_water_mark(int(timestamps.max()))
+        SessionPyramid(self._coin_meta, self._conn).mark_stale(int(timestamps.min()), int(timestamps.max()))
+        self._has_written = True
+        if not self._owns_conn:  # the caller commits, nothing tells us when; drop cached frames now
+            frame_cache.invalidate(self._table.name, self._coin_meta)
+        if has_upsert_listeners():
+            event = make_upsert_event(self._table.name, self._coin_meta, normalized_data)
+            if self._owns_conn:
+                self._pending_events.append(event)
+            else:
+                publish_upsert(event)
+        return len(timestamps)
+
+    def _set_high_water_mark(self, timestamp: int) -> None:
+        stmt = insert(last_timestamps).values(
+            table_name=self._table.name,
+            coin_id=self._coin_meta.coin_id,
+            currency_symbol=self._coin_meta.currency,
+            timestamp=timestamp,
+        )
+        self._conn.execute(stmt.on_conflict_do_update(
+            index_elements=[c.name for c in last_timestamps.primary_key],
+            set_={'timestamp': func.max(last_timestamps.c.timestamp, stmt.excluded.timestamp)},
+        ))
+
+    def _get_cursor_with_table_data(
+            self,
+            start: datetime | None = None,
+            end: datetime | None = None,
+            columns: list[str] | None = None,
+            bucket_ms: int | None = None,
+    ):
+        data_columns = self._get_table_data_columns(columns)
+        if bucket_ms is not None:
+            return self._conn.execute(self._bucketed_query(data_columns, start, end, bucket_ms))
 
-    def _get_cursor_with_table_data(self):
         column_query = (select
-                            (*self._get_table_data_columns())
+                            (*data_columns)
                         .select_from(self._table))
-        filtering_query = self._filter_using_coin_meta(column_query)
-        return self._conn.execute(filtering_query)
+        filtering_query = self._filter_using_time_range(
+            self._filter_using_coin_meta(column_query), start, end)
+        return self._conn.execute(filtering_query.order_by(self._table.c.timestamp))
+
+    def _bucketed_query(
+            self,
+            data_columns: list[Column],
+            start: datetime | None,
+            end: datetime | None,
+            bucket_ms: int,
+    ) -> select:
+        """ first/last come from window functions over each bucket (in primary-key order),
+        then one GROUP BY collapses every bucket to a single row. """
+        if bucket_ms <= 0:
+            raise ValueError("bucket_ms must be positive")
 
-    def _get_table_data_columns(self) -> list[Column]:
-        return [col for col in self._table.c if col.name not in [
-                                'coin_id',
-                                'currency_symbol']]
+        ts = self._table.c.timestamp
+        bucket = ts - ts % bucket_ms
+        window = {'partition_by': bucket, 'order_by': ts, 'rows': (None, None)}
+
+        value_columns = [col for col in data_columns if col.name != 'timestamp']
+        windowed = {
+            'first': lambda col: func.first_value(col).over(**window),
+            'last': lambda col: func.last_value(col).over(**window),
+        }
+        per_row = (select(bucket.label('timestamp'),
+                          *[windowed.get(BUCKET_AGGREGATIONS[col.name], lambda c: c)(col).label(col.name)
+                            for col in value_columns])
+                   .select_from(self._table))
+        per_row = self._filter_using_time_range(self._filter_using_coin_meta(per_row), start, end).subquery()
+
+        collapse = {'first': func.max, 'last': func.max, 'max': func.max, 'min': func.min, 'sum': func.sum}
+        return (select(per_row.c.timestamp,
+                       *[collapse[BUCKET_AGGREGATIONS[col.name]](per_row.c[col.name]).label(col.name)
+                         for col in value_columns])
+                .group_by(per_row.c.timestamp)
+                .order_by(per_row.c.timestamp))
+
+    def _get_table_data_columns(self, columns: list[str] | None = None) -> list[Column]:
+        data_columns = [col for col in self._table.c if col.name != 'series_id']
+        if columns is None:
+            return data_columns
+
+        unknown = set(columns) - {col.name for col in data_columns}
+        if unknown:
+            raise ValueError(f"Unknown columns for table {self._table.name!r}: {', '.join(sorted(unknown))}")
+
+        return [col for col in data_columns if col.name == 'timestamp' or col.name in columns]
 
     def _filter_using_coin_meta(self, stmt: select) -> select:
-        return (stmt
-                .where(self._table.c.coin_id == self._coin_meta.coin_id)
-                .where(self._table.c.currency_symbol == self._coin_meta.currency))
-
-    def _prepare_for_upsert(self, normalized_data: list[dict]) -> list[dict]:
-        return [{'coin_id': self._coin_meta.coin_id,
-          'currency_symbol': self._coin_meta.currency,
-          **row} for row in normalized_data]
+        series_id = series_id_query(self._coin_meta, self._table.name).scalar_subquery()
+        return stmt.where(self._table.c.series_id == series_id)
+
+    def _filter_using_time_range(
+            self,
+            stmt: select,
+            start: datetime | None,
+            end: datetime | None,
+    ) -> select:
+        if start is not None:
+            stmt = stmt.where(self._table.c.timestamp >= cached_ts_from_utc(start))
+        if end is not None:
+            stmt = stmt.where(self._table.c.timestamp <= cached_ts_from_utc(end))
+        return stmt
+
+    def _prepare_for_upsert(self, normalized_data: Columns, series_id: int) -> list[tuple]:
+        """ Positional rows in table column order, bound straight through executemany. """
+        n = len(normalized_data['timestamp'])
+        constants = {'series_id': series_id}
+        columns = [repeat(constants[col.name], n) if col.name in constants
+                   else normalized_data[col.name].tolist()
+                   for col in self._table.c]
+        return list(zip(*columns))
+
+    @staticmethod
+    def _column_dtype(column_name: str) -> np.dtype:
+        return np.dtype(np.int64) if column_name == 'timestamp' else np.dtype(np.float64)
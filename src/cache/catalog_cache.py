@@ -0,0 +1,71 @@
+import time
+
+from sqlalchemy import select, delete, Table
+from sqlalchemy.dialects.sqlite import insert
+
+from cache.db_manager import get_connection, get_table_or_throw
+from cache.db_schema import catalog_refreshes
+
+
+class CatalogCache:
+    """ Persists a whole catalog endpoint (coins list, currencies, market ranking) in a cache table.
+
+    A catalog is identified by catalog_key (e.g. 'markets:usd'); `scope` holds the column values
+    that select that catalog's rows when several catalogs share one table. """
+    def __init__(
+            self,
+            table_name: str,
+            catalog_key: str,
+            scope: dict[str, str] | None = None,
+    ):
+        self._table: Table = get_table_or_throw(table_name)
+        self._catalog_key = catalog_key
+        self._scope = scope or {}
+
+    def fetched_at(self) -> float | None:
+        """ Unix time of the last refresh, or None if never stored. """
+        with get_connection() as conn:
+            fetched_at = conn.execute(self._refresh_query()).scalar()
+        return fetched_at
+
+    def is_fresh(self, ttl: float, min_rows: int = 0) -> bool:
+        with get_connection() as conn:
+            row = conn.execute(select(catalog_refreshes.c.fetched_at, catalog_refreshes.c.row_count)
+                               .where(catalog_refreshes.c.catalog_key == self._catalog_key)).first()
+        return row is not None \
+            and time.time() - row.fetched_at < ttl \
+            and row.row_count >= min_rows
+
+    def load(self) -> list[dict]:
+        q = select(*[col for col in self._table.c if col.name not in self._scope])
+        for col_name, value in self._scope.items():
+            q = q.where(self._table.c[col_name] == value)
+        if 'rank' in self._table.c:
+            q = q.order_by(self._table.c.rank)
+
+        with get_connection() as conn:
+            return [dict(row._mapping) for row in conn.execute(q)]
+
+    def replace(self, rows: list[dict]) -> None:
+        """ Swaps the stored catalog for `rows` and stamps the refresh time. """
+        table_columns = [col.name for col in self._table.c]
+        values = [{**{col: row.get(col) for col in table_columns}, **self._scope} for row in rows]
+
+        with get_connection(immediate=True) as conn, conn.begin():
+            stmt = delete(self._table)
+            for col_name, value in self._scope.items():
+                stmt = stmt.where(self._table.c[col_name] == value)
+            conn.execute(stmt)
+
+            if values:
+                conn.execute(self._table.insert().prefix_with('OR REPLACE'), values)
+
+            refresh = insert(catalog_refreshes).values(
+                catalog_key=self._catalog_key, fetched_at=int(time.time()), row_count=len(values))
+            conn.execute(refresh.on_conflict_do_update(
+                index_elements=[catalog_refreshes.c.catalog_key],
+                set_={'fetched_at': refresh.excluded.fetched_at, 'row_count': refresh.excluded.row_count}))
+
+    def _refresh_query(self):
+        return (select(catalog_refreshes.c.fetched_at)
+                .where(catalog_refreshes.c.catalog_key == self._catalog_key))
@@ -1,20 +1,82 @@
-from sqlalchemy import create_engine, Engine, Connection, Table
+import os
+from typing import NamedTuple
+
+from sqlalchemy import create_engine, event, Engine, Connection, Table
+from sqlalchemy.pool import QueuePool
 
 from .db_schema import metadata
+from .migrations import migrate_to_compact_schema
+
+DEFAULT_DB_URL = "sqlite:///cache.db"
+
+
+class SQLiteProfile(NamedTuple):
+    """ Connection tuning applied to every new SQLite connection.
+
+    WAL lets readers run alongside one writer (also across processes), synchronous=NORMAL
+    only fsyncs at checkpoints in WAL mode, and busy_timeout makes a second writer wait
+    for the lock instead of failing with 'database is locked'. Write transactions begin
+    IMMEDIATE so they queue on that timeout instead of failing on a read-to-write upgrade. """
+    journal_mode: str = 'WAL'
+    synchronous: str = 'NORMAL'
+    mmap_size: int = 256 * 1024 * 1024     # bytes
+    cache_size: int = -64 * 1024           # negative = KiB, i.e. 64 MiB
+    busy_timeout_ms: int = 30_000
+    pool_size: int = 8
+    max_overflow: int = 8
+
+
+DEFAULT_PROFILE = SQLiteProfile()
 
 _engine: Engine | None = None
+_engine_settings: tuple[str, SQLiteProfile | None] = (DEFAULT_DB_URL, DEFAULT_PROFILE)
 
 
-def get_engine(db_url="sqlite:///cache.db") -> Engine:
+def get_engine(db_url=DEFAULT_DB_URL) -> Engine:
     global _engine
     if _engine is None:
+        configure_engine(db_url)
+    return _engine
+
+
+def configure_engine(db_url: str = DEFAULT_DB_URL,
+                     profile: SQLiteProfile | None = DEFAULT_PROFILE) -> Engine:
+    """ (Re)creates the shared engine. profile=None gives a plain SQLAlchemy engine without tuning.
+    Caches still in the old per-row coin_id / currency_symbol layout are migrated first. """
+    global _engine, _engine_settings
+    if _engine is not None:
+        _engine.dispose()
+    _engine_settings = (db_url, profile)
+
+    if profile is None:
         _engine = create_engine(db_url)
-        metadata.create_all(_engine)
+    else:
+        _engine = create_engine(
+            db_url,
+            poolclass=QueuePool,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_pre_ping=False,
+            connect_args={"check_same_thread": False,
+                          "timeout": profile.busy_timeout_ms / 1000},
+        )
+        _apply_profile(_engine, profile)
+
+    migrate_to_compact_schema(_engine)
+    metadata.create_all(_engine)
     return _engine
 
 
-def get_connection() -> Connection:
-    return get_engine().connect()
+def engine_settings() -> tuple[str, SQLiteProfile | None]:
+    """ db_url and profile of the shared engine (the defaults until configure_engine is called),
+    for processes that have to open the same cache, e.g. spawned workers. """
+    return _engine_settings
+
+
+def get_connection(immediate: bool = False) -> Connection:
+    """ immediate=True makes the connection's transactions take the write lock up front. """
+    conn = get_engine().connect()
+    return conn.execution_options(sqlite_begin_mode='IMMEDIATE') if immediate else conn
 
 
 def get_table_or_throw(table_name: str) -> Table:
@@ -22,3 +84,31 @@ def get_table_or_throw(table_name: str) -> Table:
     if table is None:
         raise ValueError(f"Table {table_name} does not exist in metadata.")
     return table
+
+
+def _apply_profile(engine: Engine, profile: SQLiteProfile) -> None:
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_conn, _):
+        # let SQLAlchemy's "begin" event below issue BEGIN, instead of pysqlite's implicit one
+        dbapi_conn.isolation_level = None
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f"PRAGMA journal_mode={profile.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={profile.synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={profile.mmap_size}")
+        cursor.execute(f"PRAGMA cache_size={profile.cache_size}")
+        cursor.execute(f"PRAGMA busy_timeout={profile.busy_timeout_ms}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def begin(conn):
+        mode = conn.get_execution_options().get('sqlite_begin_mode', 'DEFERRED')
+        conn.exec_driver_sql(f"BEGIN {mode}")
+
+
+def _dispose_after_fork() -> None:
+    # pooled connections must not be shared with a forked child; drop them without closing the parent's
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
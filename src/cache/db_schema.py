@@ -1,26 +1,97 @@
-from sqlalchemy import Table, Column, Integer, Float, String, MetaData
+from sqlalchemy import Table, Column, Integer, Float, String, LargeBinary, MetaData, UniqueConstraint
 
 metadata = MetaData()
 
+# (coin, currency, kind) interned to a small id, so data rows don't repeat the strings
+series = Table('series', metadata,
+               Column('series_id', Integer, primary_key=True),
+               Column('coin_id', String(50), nullable=False),
+               Column('currency_symbol', String(5), nullable=False),
+               Column('kind', String(30), nullable=False),     # name of the data table
+               UniqueConstraint('coin_id', 'currency_symbol', 'kind'))
+
 historical_data = Table('historical_data', metadata,
-                        Column('coin_id', String(50), primary_key=True),
-                        Column('currency_symbol', String(5), primary_key=True),
+                        Column('series_id', Integer, primary_key=True),
                         Column('timestamp', Integer, primary_key=True),
                         Column('total_volume', Integer),
                         Column('market_cap', Integer),
-                        Column('price', Float))
+                        Column('price', Float),
+                        sqlite_with_rowid=False)
 
 ohlc_data = Table('ohlc_data', metadata,
-                  Column('coin_id', String(50), primary_key=True),
-                  Column('currency_symbol', String(5), primary_key=True),
+                  Column('series_id', Integer, primary_key=True),
                   Column('timestamp', Integer, primary_key=True),
                   Column('open', Float),
                   Column('high', Float),
                   Column('low', Float),
-                  Column('close', Float))
+                  Column('close', Float),
+                  sqlite_with_rowid=False)
 
 last_timestamps = Table('last_timestamps', metadata,
                         Column('table_name', String(30), primary_key=True),
                         Column('coin_id', String(50), primary_key=True),
                         Column('currency_symbol', String(5), primary_key=True),
-                        Column('timestamp', Integer))
\ No newline at end of file
+                        Column('timestamp', Integer))
+
+# Span a bulk backfill (api_client.backfill) has requested per series, [covered_from, covered_to) in ms;
+# kept apart from last_timestamps, which delta refreshes advance on every write
+backfill_progress = Table('backfill_progress', metadata,
+                          Column('table_name', String(30), primary_key=True),
+                          Column('coin_id', String(50), primary_key=True),
+                          Column('currency_symbol', String(5), primary_key=True),
+                          Column('covered_from', Integer),
+                          Column('covered_to', Integer),
+                          Column('rows_upserted', Integer),
+                          Column('updated_at', Integer))
+
+coins = Table('coins', metadata,
+              Column('id', String(100), primary_key=True),
+              Column('symbol', String(50)),
+              Column('name', String(200)))
+
+currencies = Table('currencies', metadata,
+                   Column('symbol', String(10), primary_key=True))
+
+markets = Table('markets', metadata,
+                Column('currency_symbol', String(5), primary_key=True),
+                Column('rank', Integer, primary_key=True),
+                Column('id', String(100)),
+                Column('symbol', String(50)),
+                Column('name', String(200)),
+                Column('market_cap', Float),
+                Column('current_price', Float))
+
+catalog_refreshes = Table('catalog_refreshes', metadata,
+                          Column('catalog_key', String(50), primary_key=True),
+                          Column('fetched_at', Integer),
+                          Column('row_count', Integer))
+
+# GET responses kept by cache.response_cache, keyed by URL and sorted query params
+http_responses = Table('http_responses', metadata,
+                       Column('request_key', String, primary_key=True),
+                       Column('etag', String(200)),
+                       Column('last_modified', String(50)),
+                       Column('fetched_at', Float),     # unix time of the download or last revalidation
+                       Column('last_used', Float),
+                       Column('body_size', Integer),
+                       Column('stored_size', Integer),
+                       Column('body', LargeBinary))    # zlib-compressed
+
+ohlc_sessions = Table('ohlc_sessions', metadata,
+                      Column('coin_id', String(50), primary_key=True),
+                      Column('currency_symbol', String(5), primary_key=True),
+                      Column('freq_ms', Integer, primary_key=True),
+                      Column('timestamp', Integer, primary_key=True),
+                      Column('open', Float),
+                      Column('high', Float),
+                      Column('low', Float),
+                      Column('close', Float),
+                      Column('total_volume', Float))
+
+# Series whose pyramid was built from their whole raw history; later upserts only refresh their own range
+session_pyramids = Table('session_pyramids', metadata,
+                         Column('coin_id', String(50), primary_key=True),
+                         Column('currency_symbol', String(5), primary_key=True),
+                         Column('built_at', Integer),
+                         Column('stale_from', Integer),   # raw rows written since the last update, ms
+                         Column('stale_to', Integer))
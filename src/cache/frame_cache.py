@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple
+
+import pandas as pd
+
+from config import FRAME_CACHE_MAX_BYTES, FRAME_CACHE_TTL
+from project_utils import CoinMetaData, get_metrics
+
+
+class FrameKey(NamedTuple):
+    table_name: str
+    coin_meta: CoinMetaData
+    read_options: Hashable = ()   # range, columns, bucket... anything that changes the frame
+
+
+class FrameCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    entries: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class FrameCache:
+    """ Thread-safe, byte-bounded LRU of ready-built time-series frames.
+
+    Entries expire after ttl seconds and are dropped as soon as CacheManager writes rows
+    for their (table, coin) pair. A reader that started before such a write can still store
+    the older frame afterwards; ttl bounds how long that can be served. max_bytes=0 disables caching. """
+    def __init__(self, max_bytes: int = FRAME_CACHE_MAX_BYTES, ttl: float = FRAME_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[FrameKey, tuple[pd.DataFrame, int, float]] = OrderedDict()
+        self._keys_by_series: dict[tuple[str, CoinMetaData], set[FrameKey]] = {}
+        self._size_bytes = 0
+        self._hits = self._misses = self._evictions = self._invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: FrameKey) -> pd.DataFrame | None:
+        """ Returns a shallow copy of the cached frame, so callers can add columns or attrs freely. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[2] >= self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                get_metrics().inc('frame_cache_misses_total', table=key.table_name)
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            get_metrics().inc('frame_cache_hits_total', table=key.table_name)
+            return _shallow_copy(entry[0])
+
+    def put(self, key: FrameKey, frame: pd.DataFrame) -> None:
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (_shallow_copy(frame), size, time.monotonic())
+            self._keys_by_series.setdefault(key[:2], set()).add(key)
+            self._size_bytes += size
+
+            while self._size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def get_or_build(self, key: FrameKey, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        frame = self.get(key)
+        if frame is None:
+            frame = build()
+            self.put(key, frame)
+        return frame
+
+    def invalidate(self, table_name: str, coin_meta: CoinMetaData) -> None:
+        with self._lock:
+            keys = self._keys_by_series.pop((table_name, coin_meta), set())
+            for key in keys & self._entries.keys():
+                self._remove(key)
+                self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_series.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> FrameCacheStats:
+        with self._lock:
+            return FrameCacheStats(self._hits, self._misses, self._evictions, self._invalidations,
+                                   len(self._entries), self._size_bytes)
+
+    def _remove(self, key: FrameKey) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size_bytes -= size
+        series_keys = self._keys_by_series.get(key[:2])
+        if series_keys is not None:
+            series_keys.discard(key)
+
+
+def _shallow_copy(frame: pd.DataFrame) -> pd.DataFrame:
+    copy = frame.copy(deep=False)
+    copy.attrs = dict(frame.attrs)
+    return copy
+
+
+frame_cache = FrameCache()
@@ -0,0 +1,56 @@
+from sqlalchemy import Engine, inspect
+
+from cache.db_schema import metadata, series, historical_data, ohlc_data
+
+_COMPACT_TABLES = (historical_data, ohlc_data)
+
+
+def needs_compact_migration(engine: Engine) -> bool:
+    """ True for caches whose data tables still key every row by coin_id / currency_symbol. """
+    inspector = inspect(engine)
+    return any(table.name in inspector.get_table_names()
+               and 'coin_id' in {col['name'] for col in inspector.get_columns(table.name)}
+               for table in _COMPACT_TABLES)
+
+
+def migrate_to_compact_schema(engine: Engine, vacuum: bool = True) -> bool:
+    """ Moves historical_data and ohlc_data rows from the (coin_id, currency_symbol, timestamp) layout
+    to the series-keyed WITHOUT ROWID tables, in one transaction. vacuum=True gives the freed pages
+    back to the filesystem afterwards. Returns False if the cache already uses the compact layout. """
+    if not needs_compact_migration(engine):
+        return False
+
+    with engine.connect() as conn, conn.begin():
+        legacy_names = {}
+        for table in _COMPACT_TABLES:
+            if table.name in inspect(conn).get_table_names():
+                legacy_names[table.name] = f'{table.name}_legacy'
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} RENAME TO {legacy_names[table.name]}')
+
+        metadata.create_all(conn, tables=[series, *_COMPACT_TABLES])
+
+        for table in _COMPACT_TABLES:
+            legacy = legacy_names.get(table.name)
+            if legacy is None:
+                continue
+            data_columns = [col.name for col in table.c if col.name not in ('series_id', 'timestamp')]
+            conn.exec_driver_sql(
+                f"INSERT OR IGNORE INTO series (coin_id, currency_symbol, kind) "
+                f"SELECT DISTINCT coin_id, currency_symbol, '{table.name}' FROM {legacy}")
+            # inserted in key order, so the WITHOUT ROWID b-tree is filled sequentially
+            conn.exec_driver_sql(
+                f"INSERT INTO {table.name} (series_id, timestamp, {', '.join(data_columns)}) "
+                f"SELECT s.series_id, l.timestamp, {', '.join(f'l.{col}' for col in data_columns)} "
+                f"FROM {legacy} l JOIN series s "
+                f"ON s.coin_id = l.coin_id AND s.currency_symbol = l.currency_symbol AND s.kind = '{table.name}' "
+                f"ORDER BY s.series_id, l.timestamp")
+            conn.exec_driver_sql(f'DROP TABLE {legacy}')
+
+    if vacuum:
+        # VACUUM can't run inside a transaction, which SQLAlchemy connections always open
+        raw_conn = engine.raw_connection()
+        try:
+            raw_conn.driver_connection.execute('VACUUM')
+        finally:
+            raw_conn.close()
+    return True
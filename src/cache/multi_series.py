@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select, func, Column, Connection, Table
+
+from cache.cache_manager import BUCKET_AGGREGATIONS
+from cache.db_manager import get_table_or_throw
+from cache.db_schema import series
+from project_utils import cached_ts_from_utc, CoinMetaData, get_metrics, timer
+
+_AGGREGATES = {'max': func.max, 'min': func.min, 'sum': func.sum}
+
+
+def fetch_many_columns(
+        conn: Connection,
+        coin_metas: list[CoinMetaData],
+        table_name: str,
+        columns: list[str] | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket_ms: int | None = None,
+) -> dict[str, np.ndarray]:
+    """ CacheManager.fetch_columns for many series at once: rows of every coin between
+    start and end (inclusive), ordered by series and timestamp, in one set of typed NumPy columns.
+
+    The extra 'series' column (int64) holds each row's position in coin_metas;
+    coins that were never cached simply have no rows.
+
+    With bucket_ms, rows are aggregated into epoch-aligned buckets as in CacheManager
+    (BUCKET_AGGREGATIONS), one series per query: SQLite sorts each series' buckets on its own,
+    which is much cheaper than one GROUP BY over every series. """
+    table = get_table_or_throw(table_name)
+    value_columns = [col for col in table.c if col.name not in ('series_id', 'timestamp')]
+    if columns is not None:
+        unknown = set(columns) - {col.name for col in value_columns} - {'timestamp'}
+        if unknown:
+            raise ValueError(f"Unknown columns for table {table_name!r}: {', '.join(sorted(unknown))}")
+        value_columns = [col for col in value_columns if col.name in columns]
+    if bucket_ms is not None and bucket_ms <= 0:
+        raise ValueError("bucket_ms must be positive")
+    names = ['series', 'timestamp', *(col.name for col in value_columns)]
+
+    with timer('cache_read_seconds', table=table_name):
+        positions = _series_positions(conn, coin_metas, table_name)
+        if bucket_ms is None:
+            q = _time_range(select(table.c.series_id, table.c.timestamp, *value_columns)
+                            .where(table.c.series_id.in_(list(positions))), table, start, end)
+            chunks = [_fetch_matrix(conn, q.order_by(table.c.series_id, table.c.timestamp))]
+        else:
+            aggregations = {col.name: BUCKET_AGGREGATIONS[col.name] for col in value_columns}
+            chunks = [_fetch_bucketed(conn, table, series_id, value_columns, aggregations, start, end, bucket_ms)
+                      for series_id in sorted(positions)]
+        get_metrics().inc('cache_rows_read_total', sum(len(chunk) for chunk in chunks), table=table_name)
+
+    chunks = [chunk for chunk in chunks if len(chunk)]
+    if not chunks:
+        return {name: np.empty(0, dtype=np.int64 if name in ('series', 'timestamp') else np.float64)
+                for name in names}
+
+    matrix = np.concatenate(chunks)
+    position_of = np.full(max(positions) + 1, -1, dtype=np.int64)
+    position_of[list(positions)] = list(positions.values())
+
+    data = {'series': position_of[matrix[:, 0].astype(np.int64)],
+            'timestamp': matrix[:, 1].astype(np.int64)}
+    data.update((name, matrix[:, i]) for i, name in enumerate(names[2:], start=2))
+    return data
+
+
+def _series_positions(conn: Connection, coin_metas: list[CoinMetaData], table_name: str) -> dict[int, int]:
+    """ Maps the series id of every cached coin to its position in coin_metas. """
+    wanted = {(coin_meta.coin_id, coin_meta.currency): i for i, coin_meta in enumerate(coin_metas)}
+    q = (select(series.c.series_id, series.c.coin_id, series.c.currency_symbol)
+         .where(series.c.kind == table_name)
+         .where(series.c.coin_id.in_({coin_id for coin_id, _ in wanted})))
+    return {series_id: wanted[coin_id, currency]
+            for series_id, coin_id, currency in conn.execute(q)
+            if (coin_id, currency) in wanted}
+
+
+def _fetch_bucketed(
+        conn: Connection,
+        table: Table,
+        series_id: int,
+        value_columns: list[Column],
+        aggregations: dict[str, str],
+        start: datetime | None,
+        end: datetime | None,
+        bucket_ms: int,
+) -> np.ndarray:
+    """ Rows of (series_id, bucket start, *values). first/last columns rely on SQLite taking bare columns
+    from the row holding the group's min() / max(), which spares the window functions of
+    CacheManager._bucketed_query. That only holds while the query has a single min() or max(),
+    so first columns and max/min aggregates each take a pass of their own; every pass sees the same groups. """
+    ts = table.c.timestamp
+    bucket = (ts - ts % bucket_ms).label('timestamp')
+    at = {how: [i for i, col in enumerate(value_columns) if aggregations[col.name] == how]
+          for how in ('first', 'last', 'max', 'min', 'sum')}
+    passes = [
+        (func.max(ts), at['last'] + at['sum']),
+        (func.min(ts), at['first']),
+        (None, at['max'] + at['min']),
+    ]
+
+    result = None
+    for extreme, indexes in passes:
+        if not indexes and result is not None:
+            continue
+        kept = [_AGGREGATES[aggregations[value_columns[i].name]](value_columns[i])
+                if aggregations[value_columns[i].name] in _AGGREGATES else value_columns[i] for i in indexes]
+        q = (select(bucket, *([extreme] if extreme is not None else []), *kept)
+             .where(table.c.series_id == series_id)
+             .group_by(bucket)
+             .order_by(bucket))
+        rows = _fetch_matrix(conn, _time_range(q, table, start, end))
+        if result is None:
+            result = np.full((len(rows), 2 + len(value_columns)), float(series_id))
+            result[:, 1] = rows[:, 0]
+        result[:, [2 + i for i in indexes]] = rows[:, rows.shape[1] - len(indexes):]
+    return result
+
+
+def _time_range(q, table: Table, start: datetime | None, end: datetime | None):
+    if start is not None:
+        q = q.where(table.c.timestamp >= cached_ts_from_utc(start))
+    if end is not None:
+        q = q.where(table.c.timestamp <= cached_ts_from_utc(end))
+    return q
+
+
+def _fetch_matrix(conn: Connection, q) -> np.ndarray:
+    q_result = conn.execute(q)
+    rows = q_result.cursor.fetchall()  # plain DBAPI tuples, as CacheManager.fetch_columns
+    n_columns = len(q_result.keys())
+    q_result.close()
+    return np.array(rows, dtype=np.float64).reshape(len(rows), n_columns)
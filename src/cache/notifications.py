@@ -0,0 +1,76 @@
+import threading
+from itertools import count
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from cache.parsers import Columns
+from project_utils import CoinMetaData
+
+
+class UpsertEvent(NamedTuple):
+    table_name: str
+    coin_meta: CoinMetaData
+    rows: Columns       # the rows written, one array per table column, in timestamp order
+
+
+UpsertListener = Callable[[UpsertEvent], None]
+
+_listeners: dict[int, tuple[str | None, CoinMetaData | None, UpsertListener]] = {}
+_snapshot: tuple = ()   # copy of _listeners.values() read without the lock on every upsert
+_ids = count()
+_lock = threading.Lock()
+
+
+def subscribe_upserts(
+        listener: UpsertListener,
+        table_name: str | None = None,
+        coin_meta: CoinMetaData | None = None,
+) -> Callable[[], None]:
+    """ Calls listener with an UpsertEvent for every CacheManager.upsert of the given table and coin
+    (None matches any) in this process, and returns a function that unsubscribes it.
+
+    Events carry the written rows, so listeners don't have to read them back. For managers that own
+    their transaction, events follow the commit; for managers working in the caller's transaction,
+    they follow the write right away, as frame cache invalidation does.
+
+    Listeners run on the writing thread, which may hold the SQLite write lock:
+    they should only hand the rows over (e.g. to a queue) and return. """
+    global _snapshot
+    with _lock:
+        listener_id = next(_ids)
+        _listeners[listener_id] = (table_name, coin_meta, listener)
+        _snapshot = tuple(_listeners.values())
+
+    def unsubscribe() -> None:
+        global _snapshot
+        with _lock:
+            if _listeners.pop(listener_id, None) is not None:
+                _snapshot = tuple(_listeners.values())
+
+    return unsubscribe
+
+
+def has_upsert_listeners() -> bool:
+    """ Lets writers skip building events nobody listens to. """
+    return bool(_snapshot)
+
+
+def make_upsert_event(table_name: str, coin_meta: CoinMetaData, rows: Columns) -> UpsertEvent:
+    timestamps = rows['timestamp']
+    if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+        order = np.argsort(timestamps, kind='stable')
+        rows = {col: values[order] for col, values in rows.items()}
+    return UpsertEvent(table_name, coin_meta, rows)
+
+
+def publish_upsert(event: UpsertEvent) -> None:
+    """ Hands the event to every matching listener; a failing listener doesn't stop the others or the write. """
+    for table_name, coin_meta, listener in _snapshot:
+        if table_name not in (None, event.table_name) or coin_meta not in (None, event.coin_meta):
+            continue
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"⚠️  Upsert listener for {event.table_name} of "
+                  f"{event.coin_meta.coin_id}/{event.coin_meta.currency} failed — {e}")
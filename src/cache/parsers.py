@@ -1,56 +1,67 @@
+from itertools import chain
+
+import numpy as np
 from sqlalchemy import Table
 
 from cache.db_schema import historical_data, ohlc_data
+from project_utils import timer
+
+Columns = dict[str, np.ndarray]
+
+
+def normalize_data(raw_data: dict | list, table: Table) -> Columns:
+    """ Parses a raw CoinGecko payload into one NumPy array per table column
+    ('timestamp' as int64, values as float64 with null -> NaN). """
+    with timer('normalize_seconds', table=table.name):
+        if table is historical_data:
+            return _parse_historical(raw_data)
+        elif table is ohlc_data:
+            return _parse_ohlc(raw_data)
+        else:
+            raise RuntimeError(f"No parser for table {table.name!r}")
+
+
+def count_raw_rows(raw_data: dict | list) -> int:
+    """ Number of rows in a raw CoinGecko time-series payload, without parsing it. """
+    if not raw_data:
+        return 0
+    return len(raw_data.get('prices', [])) if isinstance(raw_data, dict) else len(raw_data)
+
 
+def _parse_historical(data: dict) -> Columns:
+    columns = ('timestamp', 'price', 'market_cap', 'total_volume')
+    if not data or not data.get('prices'):
+        return _empty(columns)
 
-def normalize_data(raw_data: dict | list, table: Table) -> list[dict]:
-    if table is historical_data:
-        return _parse_historical(raw_data)
-    elif table is ohlc_data:
-        return _parse_ohlc(raw_data)
-    else:
-        raise RuntimeError(f"No parser for table {table.name!r}")
-
-
-def _parse_historical(data: dict) -> list[dict]:
-    if not data or 'prices' not in data:
-        return []
-    else:
-        return [
-            {
-                'timestamp': ts,
-                'price': pr,
-                'market_cap': mc,
-                'total_volume': tv
-            } for
-                (ts, pr),
-                (_, mc),
-                (_, tv)
-            in zip(
-                data['prices'],
-                data['market_caps'],
-                data['total_volumes']
-            )
-        ]
-
-
-def _parse_ohlc(data: list) -> list[dict]:
+    # the three series share timestamps; like zip, keep only the rows present in all of them
+    n = min(len(data['prices']), len(data['market_caps']), len(data['total_volumes']))
+    prices = _as_matrix(data['prices'], 2)[:n]
+    return {
+        'timestamp': prices[:, 0].astype(np.int64),
+        'price': prices[:, 1],
+        'market_cap': _as_matrix(data['market_caps'], 2)[:n, 1],
+        'total_volume': _as_matrix(data['total_volumes'], 2)[:n, 1],
+    }
+
+
+def _parse_ohlc(data: list) -> Columns:
+    columns = ('timestamp', 'open', 'high', 'low', 'close')
     if not data:
-        return []
-    else:
-        return [
-            {
-                'timestamp': ts,
-                'open': op,
-                'high': hi,
-                'low': lo,
-                'close': cl
-            }
-            for
-                ts,
-                op,
-                hi,
-                lo,
-                cl
-            in data
-        ]
+        return _empty(columns)
+
+    matrix = _as_matrix(data, len(columns))
+    parsed = {col: matrix[:, i] for i, col in enumerate(columns)}
+    parsed['timestamp'] = parsed['timestamp'].astype(np.int64)
+    return parsed
+
+
+def _as_matrix(rows: list, width: int) -> np.ndarray:
+    try:
+        flat = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * width)
+    except TypeError:  # null values, slower path that maps them to NaN
+        flat = np.asarray(rows, dtype=np.float64)
+    return flat.reshape(-1, width)
+
+
+def _empty(columns: tuple[str, ...]) -> Columns:
+    return {col: np.empty(0, dtype=np.int64 if col == 'timestamp' else np.float64) for col in columns}
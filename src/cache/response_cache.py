@@ -0,0 +1,174 @@
+import threading
+import time
+import zlib
+from typing import Any, NamedTuple
+from urllib.parse import urlencode
+
+from sqlalchemy import select, update, delete, func, bindparam
+from sqlalchemy.dialects.sqlite import insert
+
+from cache.db_manager import get_connection
+from cache.db_schema import http_responses
+from config import RESPONSE_CACHE_MAX_BYTES
+from project_utils import get_metrics
+
+
+class StoredResponse(NamedTuple):
+    body: bytes                 # decompressed
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float           # unix time of the download or last revalidation
+    fresh: bool                 # no older than the max_age it was looked up with
+
+
+class ResponseCacheStats(NamedTuple):
+    hits: int           # served without a request
+    revalidated: int    # 304 Not Modified, served without downloading the body
+    misses: int         # downloaded in full
+    evictions: int
+    bytes_saved: int    # body bytes not downloaded thanks to the cache
+    entries: int
+    body_bytes: int     # stored bodies, uncompressed
+    stored_bytes: int   # stored bodies, compressed
+
+    @property
+    def hit_rate(self) -> float:
+        """ Share of requests answered without downloading a body. """
+        lookups = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / lookups if lookups else 0.0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.body_bytes / self.stored_bytes if self.stored_bytes else 0.0
+
+
+class ResponseCache:
+    """ Byte-bounded LRU of GET response bodies in the SQLite cache, so every process sharing
+    the cache file shares it too.
+
+    Bodies are stored zlib-compressed with their ETag / Last-Modified validators, keyed by URL and
+    sorted query params. http_client.get(..., max_age=...) serves them while fresh and revalidates
+    them once stale. Least recently used responses are evicted beyond max_bytes (compressed);
+    max_bytes=0 disables storing. Counters are kept per process.
+
+    Hits are read-only: their last-use times are kept in memory and written with the next
+    put or revalidation, which are the only times eviction looks at them. """
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, compression_level: int = 6):
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._hits = self._revalidated = self._misses = self._evictions = self._bytes_saved = 0
+        self._last_used: dict[str, float] = {}   # request_key -> last hit not written yet
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: dict[str, Any] | None, max_age: float) -> StoredResponse | None:
+        """ Returns the stored response, fresh or not (stale ones still carry the validators
+        to revalidate with). Fresh ones count as hits. """
+        key = request_key(url, params)
+        with get_connection() as conn:
+            row = conn.execute(select(http_responses.c.body, http_responses.c.etag,
+                                      http_responses.c.last_modified, http_responses.c.fetched_at)
+                               .where(http_responses.c.request_key == key)).first()
+        if row is None:
+            return None
+
+        now = time.time()
+        stored = StoredResponse(zlib.decompress(row.body), row.etag, row.last_modified, row.fetched_at,
+                                now - row.fetched_at <= max_age)
+        if stored.fresh:
+            with self._lock:
+                self._last_used[key] = now
+            self._count('hit', len(stored.body))
+        return stored
+
+    def revalidated(self, url: str, params: dict[str, Any] | None, stored: StoredResponse) -> None:
+        """ The server answered 304 Not Modified: the stored body is fresh again. """
+        now = time.time()
+        with get_connection(immediate=True) as conn, conn.begin():
+            self._write_last_used(conn)
+            conn.execute(update(http_responses)
+                         .where(http_responses.c.request_key == request_key(url, params))
+                         .values(last_used=now, fetched_at=now))
+        self._count('revalidated', len(stored.body))
+
+    def put(self,
+            url: str,
+            params: dict[str, Any] | None,
+            body: bytes,
+            etag: str | None = None,
+            last_modified: str | None = None) -> None:
+        """ Stores a downloaded body, then evicts least recently used responses beyond max_bytes. """
+        self._count('miss')
+        compressed = zlib.compress(body, self.compression_level)
+        if len(compressed) > self.max_bytes:
+            return
+
+        now = time.time()
+        stmt = insert(http_responses).values(request_key=request_key(url, params), etag=etag,
+                                             last_modified=last_modified, fetched_at=now, last_used=now,
+                                             body_size=len(body), stored_size=len(compressed), body=compressed)
+        with get_connection(immediate=True) as conn, conn.begin():
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[http_responses.c.request_key],
+                set_={col: stmt.excluded[col] for col in
+                      ('etag', 'last_modified', 'fetched_at', 'last_used', 'body_size', 'stored_size', 'body')},
+            ))
+            self._write_last_used(conn)
+            self._evict(conn)
+
+    def clear(self) -> None:
+        with get_connection(immediate=True) as conn, conn.begin():
+            conn.execute(delete(http_responses))
+        with self._lock:
+            self._last_used.clear()
+
+    def stats(self) -> ResponseCacheStats:
+        with get_connection() as conn:
+            entries, body_bytes, stored_bytes = conn.execute(
+                select(func.count(), func.coalesce(func.sum(http_responses.c.body_size), 0),
+                       func.coalesce(func.sum(http_responses.c.stored_size), 0))).one()
+        with self._lock:
+            return ResponseCacheStats(self._hits, self._revalidated, self._misses, self._evictions,
+                                      self._bytes_saved, entries, body_bytes, stored_bytes)
+
+    def _evict(self, conn) -> None:
+        rows = conn.execute(select(http_responses.c.request_key, http_responses.c.stored_size)
+                            .order_by(http_responses.c.last_used.desc())).all()
+        kept_bytes, evicted = 0, []
+        for key, size in rows:
+            kept_bytes += size
+            if kept_bytes > self.max_bytes:
+                evicted.append(key)
+        if evicted:
+            conn.execute(delete(http_responses).where(http_responses.c.request_key.in_(evicted)))
+            with self._lock:
+                self._evictions += len(evicted)
+
+    def _write_last_used(self, conn) -> None:
+        """ Writes the last-use times of hits since the previous write, inside the caller's transaction. """
+        with self._lock:
+            last_used, self._last_used = self._last_used, {}
+        if last_used:
+            conn.execute(update(http_responses)
+                         .where(http_responses.c.request_key == bindparam('key'))
+                         .values(last_used=bindparam('used_at')),
+                         [{'key': key, 'used_at': used_at} for key, used_at in last_used.items()])
+
+    def _count(self, result: str, bytes_saved: int = 0) -> None:
+        with self._lock:
+            if result == 'hit':
+                self._hits += 1
+            elif result == 'revalidated':
+                self._revalidated += 1
+            else:
+                self._misses += 1
+            self._bytes_saved += bytes_saved
+        get_metrics().inc('http_cache_total', result=result)
+        if bytes_saved:
+            get_metrics().inc('http_cache_bytes_saved_total', bytes_saved)
+
+
+def request_key(url: str, params: dict[str, Any] | None) -> str:
+    return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+
+response_cache = ResponseCache()
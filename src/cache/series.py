@@ -0,0 +1,24 @@
+from sqlalchemy import select, Connection, Select
+from sqlalchemy.dialects.sqlite import insert
+
+from cache.db_schema import series
+from project_utils import CoinMetaData
+
+
+def series_id_query(coin_meta: CoinMetaData, kind: str) -> Select:
+    """ Selects the id of the (coin, currency, kind) series; use .scalar_subquery() to filter data tables. """
+    return (select(series.c.series_id)
+            .where(series.c.coin_id == coin_meta.coin_id)
+            .where(series.c.currency_symbol == coin_meta.currency)
+            .where(series.c.kind == kind))
+
+
+def get_series_id(conn: Connection, coin_meta: CoinMetaData, kind: str, create: bool = False) -> int | None:
+    """ Returns the series id, registering the series first if create=True (else None for unknown ones). """
+    series_id = conn.execute(series_id_query(coin_meta, kind)).scalar()
+    if series_id is None and create:
+        conn.execute(insert(series)
+                     .values(coin_id=coin_meta.coin_id, currency_symbol=coin_meta.currency, kind=kind)
+                     .on_conflict_do_nothing())
+        series_id = conn.execute(series_id_query(coin_meta, kind)).scalar()
+    return series_id
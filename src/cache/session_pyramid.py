@@ -0,0 +1,217 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, delete, update, func, Connection
+from sqlalchemy.dialects.sqlite import insert
+
+from cache.db_schema import historical_data, ohlc_data, ohlc_sessions, session_pyramids
+from cache.parsers import Columns
+from cache.series import series_id_query
+from config import SESSION_PYRAMID_FREQS
+from project_utils import cached_ts_from_utc, CoinMetaData
+
+SESSION_COLUMNS = ['open', 'high', 'low', 'close', 'total_volume']
+
+# as in OHLCSessionMaker._resample_data
+_AGGREGATIONS = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'total_volume': 'sum'}
+
+# buckets are counted from 1970-01-05, a Monday, so weekly bars run Monday to Sunday;
+# it's a whole number of days, so hourly and daily buckets are the same as from the epoch
+_ORIGIN_MS = 4 * 86_400_000
+
+
+class SessionPyramid:
+    def __init__(
+            self,
+            coin_meta: CoinMetaData,
+            conn: Connection,
+            freqs: tuple[str, ...] = SESSION_PYRAMID_FREQS,
+    ):
+        """ Session bars (OHLCSessionMaker.make_session shape) kept pre-aggregated in ohlc_sessions
+        for every level in freqs. Buckets are fixed-size and UTC-aligned, like the cache's
+        bucket_ms reads, except that weekly ones start on Mondays.
+
+        The finest level is aggregated from historical_data and ohlc_data, every coarser one from
+        the level below it. Buckets without OHLC rows are stored too (open/high/low/close NULL),
+        so their volume still adds up in coarser levels; reads skip them, as make_session's dropna does.
+
+        Writes only mark the time range they touched as stale (mark_stale), update recomputes it,
+        so upserts don't pay for aggregations nobody may read. """
+        self._coin_meta = coin_meta
+        self._conn = conn
+        self._levels = [_freq_ms(freq) for freq in freqs]
+        self._freqs = dict(zip(freqs, self._levels))
+
+        for finer, coarser in zip(self._levels, self._levels[1:]):
+            if coarser % finer:
+                raise ValueError(f"Pyramid levels must divide each other, got {freqs}")
+
+    def fetch_columns(
+            self,
+            freq: str,
+            start: datetime | None = None,
+            end: datetime | None = None,
+    ) -> Columns:
+        """ Returns stored bars of one level between start and end (inclusive), one NumPy array
+        per column ('timestamp' as int64, the rest as float64). A single range scan on the primary key. """
+        if freq not in self._freqs:
+            raise ValueError(f"Unsupported session frequency {freq!r}, use one of: {', '.join(self._freqs)}")
+
+        q = (select(ohlc_sessions.c.timestamp, *[ohlc_sessions.c[col] for col in SESSION_COLUMNS])
+             .where(ohlc_sessions.c.open.is_not(None)))
+        q = self._filter_level(q, self._freqs[freq],
+                               cached_ts_from_utc(start) if start is not None else None,
+                               cached_ts_from_utc(end) if end is not None else None)
+
+        rows = self._fetch_tuples(q.order_by(ohlc_sessions.c.timestamp))
+        matrix = np.array(rows, dtype=np.float64).reshape(-1, len(SESSION_COLUMNS) + 1)
+        columns = {col: matrix[:, i + 1] for i, col in enumerate(SESSION_COLUMNS)}
+        return {'timestamp': matrix[:, 0].astype(np.int64), **columns}
+
+    def is_built(self) -> bool:
+        """ Whether the pyramid was built from the coin's whole raw history (see rebuild). Bars alone
+        don't tell: a cache written before the pyramid existed has no bars, or some for a few rows. """
+        return self._state() is not None
+
+    def is_current(self) -> bool:
+        """ Whether the pyramid is built and no raw rows were written since its last update. """
+        state = self._state()
+        return state is not None and state.stale_from is None
+
+    def mark_stale(self, first_ts: int, last_ts: int) -> None:
+        """ Records that raw rows between first_ts and last_ts (ms) were written. A single UPDATE;
+        a pyramid that was never built has nothing to mark, update builds it whole. """
+        stale_from, stale_to = session_pyramids.c.stale_from, session_pyramids.c.stale_to
+        self._conn.execute(self._filter_state(update(session_pyramids)).values(
+            stale_from=func.min(func.coalesce(stale_from, first_ts), first_ts),
+            stale_to=func.max(func.coalesce(stale_to, last_ts), last_ts),
+        ))
+
+    def update(self) -> None:
+        """ Brings the pyramid up to date: builds it if it never was, otherwise recomputes
+        the stale range. Takes writes, run it under the write lock. """
+        state = self._state()
+        if state is None:
+            self.rebuild()
+        elif state.stale_from is not None:
+            self.refresh(state.stale_from, state.stale_to)
+            self._conn.execute(self._filter_state(update(session_pyramids)).values(stale_from=None, stale_to=None))
+
+    def refresh(self, first_ts: int, last_ts: int) -> None:
+        """ Recomputes every bucket, on every level, that holds raw rows between first_ts and last_ts (ms).
+        Runs inside the caller's connection and transaction. """
+        bars = self._bars_from_raw(first_ts, last_ts)
+        self._replace_level(self._levels[0], bars, first_ts, last_ts)
+
+        for finer, coarser in zip(self._levels, self._levels[1:]):
+            lo, hi = _bucket_range(first_ts, last_ts, coarser)
+            bars = _roll_up(self._fetch_level(finer, lo, hi), coarser)
+            self._replace_level(coarser, bars, first_ts, last_ts)
+
+    def rebuild(self) -> None:
+        """ Builds the pyramid from the whole raw history, e.g. for caches written before it existed,
+        and records it as built. """
+        bounds = [self._conn.execute(self._filter_raw(select(func.min(table.c.timestamp),
+                                                             func.max(table.c.timestamp)), table)).first()
+                  for table in (historical_data, ohlc_data)]
+        bounds = [bound for bound in bounds if bound[0] is not None]
+        if not bounds:
+            return
+
+        self.refresh(min(bound[0] for bound in bounds), max(bound[1] for bound in bounds))
+        stmt = insert(session_pyramids).values(coin_id=self._coin_meta.coin_id,
+                                               currency_symbol=self._coin_meta.currency,
+                                               built_at=int(time.time()))
+        self._conn.execute(stmt.on_conflict_do_update(
+            index_elements=[c.name for c in session_pyramids.primary_key],
+            set_={'built_at': stmt.excluded.built_at, 'stale_from': None, 'stale_to': None},
+        ))
+
+    def _state(self):
+        q = self._filter_state(select(session_pyramids.c.built_at, session_pyramids.c.stale_from,
+                                      session_pyramids.c.stale_to))
+        return self._conn.execute(q).first()
+
+    def _filter_state(self, stmt):
+        return (stmt
+                .where(session_pyramids.c.coin_id == self._coin_meta.coin_id)
+                .where(session_pyramids.c.currency_symbol == self._coin_meta.currency))
+
+    def _bars_from_raw(self, first_ts: int, last_ts: int) -> pd.DataFrame:
+        lo, hi = _bucket_range(first_ts, last_ts, self._levels[0])
+        hist = self._fetch_raw(historical_data, ['total_volume'], lo, hi)
+        ohlc = self._fetch_raw(ohlc_data, ['open', 'high', 'low', 'close'], lo, hi)
+        return _roll_up(pd.concat([hist, ohlc]).sort_values('timestamp', kind='stable'), self._levels[0])
+
+    def _fetch_raw(self, table, columns: list[str], lo: int, hi: int) -> pd.DataFrame:
+        q = (select(table.c.timestamp, *[table.c[col] for col in columns])
+             .where(table.c.timestamp.between(lo, hi)))
+        rows = self._fetch_tuples(self._filter_raw(q, table))
+        return pd.DataFrame(rows, columns=['timestamp', *columns], dtype=np.float64)
+
+    def _fetch_level(self, freq_ms: int, lo: int, hi: int) -> pd.DataFrame:
+        q = select(ohlc_sessions.c.timestamp, *[ohlc_sessions.c[col] for col in SESSION_COLUMNS])
+        rows = self._fetch_tuples(self._filter_level(q, freq_ms, lo, hi).order_by(ohlc_sessions.c.timestamp))
+        return pd.DataFrame(rows, columns=['timestamp', *SESSION_COLUMNS], dtype=np.float64)
+
+    def _replace_level(self, freq_ms: int, bars: pd.DataFrame, first_ts: int, last_ts: int) -> None:
+        lo, hi = _bucket_range(first_ts, last_ts, freq_ms)
+        self._conn.execute(self._filter_level(delete(ohlc_sessions), freq_ms, lo, hi))
+        if bars.empty:
+            return
+
+        # positional rows in table column order; SQLite stores the NaN of missing prices as NULL
+        constants = (self._coin_meta.coin_id, self._coin_meta.currency, freq_ms)
+        rows = [(*constants, ts, *values)
+                for ts, values in zip(bars.index.tolist(), bars[SESSION_COLUMNS].to_numpy().tolist())]
+        stmt = ohlc_sessions.insert().prefix_with('OR REPLACE')
+        self._conn.exec_driver_sql(str(stmt.compile(dialect=self._conn.dialect)), rows)
+
+    def _fetch_tuples(self, q) -> list[tuple]:
+        q_result = self._conn.execute(q)
+        rows = q_result.cursor.fetchall()  # plain DBAPI tuples, skips Row construction
+        q_result.close()
+        return rows
+
+    def _filter_raw(self, stmt, table):
+        return stmt.where(table.c.series_id == series_id_query(self._coin_meta, table.name).scalar_subquery())
+
+    def _filter_level(self, stmt, freq_ms: int, lo: int | None = None, hi: int | None = None):
+        stmt = (stmt
+                .where(ohlc_sessions.c.coin_id == self._coin_meta.coin_id)
+                .where(ohlc_sessions.c.currency_symbol == self._coin_meta.currency)
+                .where(ohlc_sessions.c.freq_ms == freq_ms))
+        if lo is not None:
+            stmt = stmt.where(ohlc_sessions.c.timestamp >= lo)
+        if hi is not None:
+            stmt = stmt.where(ohlc_sessions.c.timestamp <= hi)
+        return stmt
+
+
+def _roll_up(rows: pd.DataFrame, bucket_ms: int) -> pd.DataFrame:
+    """ Aggregates rows (in timestamp order) into bars indexed by bucket start. first/last skip missing
+    values and a bucket without volume gets 0, as a resample of the merged frame would. """
+    columns = [col for col in SESSION_COLUMNS if col in rows.columns]
+    timestamps = rows['timestamp'].to_numpy(dtype=np.int64)
+    bars = (rows[columns]
+            .groupby(_bucket_start(timestamps, bucket_ms))
+            .agg({col: _AGGREGATIONS[col] for col in columns}))
+    return bars.reindex(columns=SESSION_COLUMNS).fillna({'total_volume': 0})
+
+
+def _bucket_range(first_ts: int, last_ts: int, bucket_ms: int) -> tuple[int, int]:
+    """ First and last millisecond of the buckets covering first_ts..last_ts. """
+    return _bucket_start(first_ts, bucket_ms), _bucket_start(last_ts, bucket_ms) + bucket_ms - 1
+
+
+def _bucket_start(ts, bucket_ms: int):
+    return ts - (ts - _ORIGIN_MS) % bucket_ms
+
+
+def _freq_ms(freq: str) -> int:
+    freq_ms = int(pd.Timedelta(freq).total_seconds() * 1000)
+    if freq_ms <= 0:
+        raise ValueError(f"Session frequency must be a positive, fixed-size duration, got {freq!r}")
+    return freq_ms
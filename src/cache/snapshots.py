@@ -0,0 +1,146 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from cache.cache_manager import CacheManager
+from cache.db_manager import get_connection
+from cache.db_schema import series
+from project_utils import make_time_series_frame, cached_ts_from_utc, CoinMetaData
+
+SNAPSHOT_FORMATS = {'arrow': '.arrow', 'parquet': '.parquet'}
+SERIES_KINDS = ('historical_data', 'ohlc_data')
+
+
+def export_series(
+        coin_meta: CoinMetaData,
+        kind: str,
+        root: str | Path,
+        fmt: str = 'arrow',
+) -> list[Path]:
+    """ Writes one cached series to root/<kind>/coin_id=<id>/currency=<symbol>/year=<YYYY>/part-0.<fmt>
+    and returns the written files. Existing files of the series are replaced year by year.
+
+    'arrow' (Arrow IPC, uncompressed) can be memory-mapped by load_series without copying,
+    'parquet' is compressed and suited for sharing the data. Requires pyarrow. """
+    pa = _require_pyarrow()
+    extension = _extension(fmt)
+
+    with get_connection() as conn:
+        data = CacheManager(coin_meta, kind, conn=conn).fetch_columns()
+
+    years = data['timestamp'].view('datetime64[ms]').astype('datetime64[Y]').astype(np.int64) + 1970
+    written = []
+    for year in np.unique(years):
+        in_year = years == year
+        table = pa.table({col: values[in_year] for col, values in data.items()})
+        path = _series_dir(root, coin_meta, kind) / f'year={year}' / f'part-0{extension}'
+        _write_table(table, path, fmt)
+        for other in SNAPSHOT_FORMATS.values():  # a year is only ever kept in one format
+            if other != extension:
+                path.with_suffix(other).unlink(missing_ok=True)
+        written.append(path)
+    return written
+
+
+def export_cache(root: str | Path, fmt: str = 'arrow') -> list[Path]:
+    """ export_series for every series in the cache. """
+    with get_connection() as conn:
+        rows = conn.execute(select(series.c.coin_id, series.c.currency_symbol, series.c.kind)
+                            .where(series.c.kind.in_(SERIES_KINDS))
+                            .order_by(series.c.series_id)).fetchall()
+
+    return [path for coin_id, currency, kind in rows
+            for path in export_series(CoinMetaData(coin_id, currency), kind, root, fmt)]
+
+
+def load_series(
+        root: str | Path,
+        coin_meta: CoinMetaData,
+        kind: str = 'historical_data',
+        start: datetime | None = None,
+        end: datetime | None = None,
+) -> pd.DataFrame:
+    """ Loads an exported series as make_time_series_frame would build it (same columns, attrs
+    and datetime index), so plotters and session makers take it unchanged.
+
+    Only the year partitions overlapping start / end (UTC, inclusive) are opened. Arrow files are
+    memory-mapped and a single partition becomes a frame without copying its columns; several
+    partitions are concatenated once. Requires pyarrow. """
+    pa = _require_pyarrow()
+    import pyarrow.compute as pc
+
+    paths = [path for path in sorted(_series_dir(root, coin_meta, kind).glob('year=*/part-0.*'))
+             if path.suffix in SNAPSHOT_FORMATS.values() and _year_in_range(path, start, end)]
+    if not paths:
+        return make_time_series_frame({}, coin_meta)
+
+    table = pa.concat_tables([_read_table(path) for path in paths])
+    mask = _time_range_mask(table, start, end)
+    if mask is not None and not pc.all(mask).as_py():  # filtering copies, skip it when every row is in range
+        table = table.filter(mask)
+    if table.num_rows and any(column.num_chunks > 1 for column in table.columns):
+        table = table.combine_chunks()
+
+    return make_time_series_frame(table.to_pandas(split_blocks=True), coin_meta)
+
+
+def _write_table(table, path: Path, fmt: str) -> None:
+    pa = _require_pyarrow()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_path)
+    else:
+        with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)  # readers never see a half-written file
+
+
+def _read_table(path: Path):
+    pa = _require_pyarrow()
+    if path.suffix == SNAPSHOT_FORMATS['parquet']:
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+
+
+def _time_range_mask(table, start: datetime | None, end: datetime | None):
+    import pyarrow.compute as pc
+
+    mask = pc.greater_equal(table['timestamp'], cached_ts_from_utc(start)) if start is not None else None
+    if end is not None:
+        before_end = pc.less_equal(table['timestamp'], cached_ts_from_utc(end))
+        mask = before_end if mask is None else pc.and_(mask, before_end)
+    return mask
+
+
+def _year_in_range(path: Path, start: datetime | None, end: datetime | None) -> bool:
+    year = int(path.parent.name.removeprefix('year='))
+    return (start is None or year >= start.year) and (end is None or year <= end.year)
+
+
+def _series_dir(root: str | Path, coin_meta: CoinMetaData, kind: str) -> Path:
+    if kind not in SERIES_KINDS:
+        raise ValueError(f"Unknown series kind {kind!r}, use one of: {', '.join(SERIES_KINDS)}")
+    return Path(root) / kind / f'coin_id={coin_meta.coin_id}' / f'currency={coin_meta.currency}'
+
+
+def _extension(fmt: str) -> str:
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown snapshot format {fmt!r}, use one of: {', '.join(SNAPSHOT_FORMATS)}")
+    return SNAPSHOT_FORMATS[fmt]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Cache snapshots need pyarrow: pip install pyarrow") from e
+    return pyarrow
@@ -2,4 +2,44 @@ PRICE_PRECISION = 2
 DEFAULT_COIN = "bitcoin"
 DEFAULT_CURRENCY = "usd"
 
-DEFAULT_DAYS = 30
\ No newline at end of file
+DEFAULT_DAYS = 30
+
+COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+
+# CoinGecko free (demo) tier: 30 calls per minute
+FREE_API_CALLS_PER_MINUTE = 30
+BATCH_MAX_WORKERS = 8
+# Requests in flight at once per event loop in the async client; httpx's pool gets slower
+# per request as it grows, past ~20 connections more concurrency lowers throughput
+ASYNC_MAX_CONCURRENCY = 20
+# How long cached catalog endpoints stay fresh, in seconds
+COINS_CATALOG_TTL = 24 * 60 * 60
+CURRENCIES_CATALOG_TTL = 24 * 60 * 60
+MARKETS_CATALOG_TTL = 5 * 60
+# Background refresh (RefreshScheduler): seconds between refreshes of a watched series per tier,
+# after CoinGecko's 5-minute / hourly / daily granularity, and its share of the per-minute budget
+REFRESH_TIERS = {'5min': 5 * 60, 'hourly': 60 * 60, 'daily': 24 * 60 * 60}
+# OHLC candles are 30 minutes at the finest, refreshing them more often brings nothing new
+OHLC_MIN_REFRESH_INTERVAL = 30 * 60
+REFRESH_CALLS_PER_MINUTE = 20
+
+# In-process cache of ready-built frames in front of SQLite
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+FRAME_CACHE_TTL = 60
+
+# On-disk cache of GET responses (cache.response_cache): zlib-compressed bodies are evicted least recently
+# used first beyond MAX_BYTES; responses younger than MAX_AGE seconds are served without a request,
+# older ones are revalidated with If-None-Match / If-Modified-Since
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_MAX_AGE = 60
+
+# Session bars kept pre-aggregated in the cache, finest first; each must divide the next one
+SESSION_PYRAMID_FREQS = ('1h', '4h', '1D', '7D')
+
+# Live charts redraw at most this often, however many rows arrive in between
+LIVE_CHART_MAX_FPS = 4
+
+# Bulk backfill (api_client.backfill): how far back the free tier serves history,
+# and the backfill's share of the per-minute budget
+BACKFILL_MAX_HISTORY_DAYS = 365
+BACKFILL_CALLS_PER_MINUTE = 20
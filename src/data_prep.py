@@ -1,6 +1,14 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, NamedTuple
+
+import numpy as np
 import pandas as pd
 
-from project_utils import set_dt_index_using_ts_column, CoinMetaData
+from cache import CacheManager, SessionPyramid, get_connection
+from project_utils import (set_dt_index_using_ts_column, make_time_series_frame, utc_from_cached_ts,
+                           utc_index_from_cached_ts, CoinMetaData, timed)
+
+_SESSION_COLUMNS = ['open', 'high', 'low', 'close', 'total_volume']
 
 class OHLCSessionMaker:
     def __init__(
@@ -15,11 +23,13 @@ class OHLCSessionMaker:
         self.ohlc_df = ohlc_df
         self.freq = freq
 
+    @timed('session_make_seconds')
     def make_session(self) -> pd.DataFrame:
+        # cache frames already carry their datetime index, so this is a join of two sorted indexes
+        hist_df, ohlc_df = (df.pipe(set_dt_index_using_ts_column) for df in (self.hist_df, self.ohlc_df))
         sessions = (
-            self.hist_df
-                    .merge(self.ohlc_df, on='timestamp', how='outer')
-                    .pipe(set_dt_index_using_ts_column)
+            hist_df[['total_volume']]
+                    .join(ohlc_df[['open', 'high', 'low', 'close']], how='outer')
                     .pipe(self._resample_data)
                     .dropna()
         )
@@ -60,4 +70,203 @@ class OHLCSessionMaker:
             ohlc_df: pd.DataFrame,
     ) -> None:
         if hist_df.empty or ohlc_df.empty:
-            raise ValueError("Empty dataframes not supported")
\ No newline at end of file
+            raise ValueError("Empty dataframes not supported")
+
+
+class SessionUpdate(NamedTuple):
+    finalized: pd.DataFrame     # bars that won't change anymore, emitted once
+    open: pd.DataFrame          # bars still receiving rows, emitted again with every update
+
+
+class StreamingSessionMaker:
+    _tables = {'historical_data': ['total_volume'],
+               'ohlc_data': ['open', 'high', 'low', 'close']}
+
+    def __init__(
+            self,
+            coin_meta: CoinMetaData,
+            freq: str | timedelta = '1D',
+    ):
+        """ Incremental counterpart of OHLCSessionMaker. Only the aggregates of still-open buckets
+        are kept, and each update folds in just the rows newer than those already seen,
+        so the history is never merged or resampled again.
+
+        Buckets have a fixed size and are epoch-aligned, like the cache's bucket_ms reads.
+        A bucket is finalized once both the historical and the OHLC rows have moved past its end. """
+        self.coin_meta = coin_meta
+        self.freq = freq
+        self._bucket_ms = int(pd.Timedelta(freq).total_seconds() * 1000)
+        if self._bucket_ms <= 0:
+            raise ValueError("freq must be a positive, fixed-size duration")
+
+        self._pending = pd.DataFrame(columns=_SESSION_COLUMNS, dtype=np.float64)
+        self._last_ts: dict[str, int | None] = dict.fromkeys(self._tables)
+
+    def update(
+            self,
+            hist_df: pd.DataFrame,
+            ohlc_df: pd.DataFrame,
+    ) -> SessionUpdate:
+        """ Folds new rows (frames with a timestamp column, in timestamp order) into the session.
+        Rows not newer than the ones already seen for the same table are skipped,
+        so overlapping reads are safe. """
+        hist = self._take_new_rows(hist_df, 'historical_data')
+        ohlc = self._take_new_rows(ohlc_df, 'ohlc_data')
+        self._pending = self._merge_bars(self._pending, self._aggregate(hist, ohlc))
+        return self._split_finalized()
+
+    def update_from_cache(self) -> SessionUpdate:
+        """ update with the rows cached since the last one seen for each table. """
+        with get_connection() as conn:
+            hist_df, ohlc_df = (
+                make_time_series_frame(
+                    CacheManager(self.coin_meta, table_name, conn=conn).fetch_columns(
+                        start=utc_from_cached_ts(last_ts + 1) if last_ts is not None else None),
+                    self.coin_meta)
+                for table_name, last_ts in self._last_ts.items())
+        return self.update(hist_df, ohlc_df)
+
+    def flush(self) -> pd.DataFrame:
+        """ Finalizes and returns the still-open bars, e.g. once a stream has ended. """
+        bars, self._pending = self._pending, self._pending.iloc[0:0]
+        return self._to_session(bars)
+
+    def stream(self, chunks: Iterable[tuple[pd.DataFrame, pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+        """ Yields the finalized bars of every (hist_df, ohlc_df) chunk, then the still-open ones
+        once chunks run out. Only the open buckets are held in memory between chunks. """
+        for hist_df, ohlc_df in chunks:
+            finalized = self.update(hist_df, ohlc_df).finalized
+            if not finalized.empty:
+                yield finalized
+
+        remaining = self.flush()
+        if not remaining.empty:
+            yield remaining
+
+    def _take_new_rows(self, ts_frame: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        columns = ['timestamp', *self._tables[table_name]]
+        if ts_frame.empty:
+            return pd.DataFrame(columns=columns, dtype=np.float64)
+
+        if 'timestamp' not in ts_frame.columns:
+            raise ValueError('ts_frame must have timestamp column')
+        if CoinMetaData.from_ts_frame(ts_frame) != self.coin_meta:
+            raise ValueError(f'{table_name} frame must belong to {self.coin_meta}')
+
+        rows = ts_frame[columns]
+        last_ts = self._last_ts[table_name]
+        if last_ts is not None:
+            rows = rows[rows['timestamp'].to_numpy() > last_ts]
+        if not rows.empty:
+            self._last_ts[table_name] = int(rows['timestamp'].max())
+        return rows
+
+    def _aggregate(self, hist: pd.DataFrame, ohlc: pd.DataFrame) -> pd.DataFrame:
+        """ Same aggregation as OHLCSessionMaker._resample_data, over the new rows only.
+        Buckets without historical rows get a zero volume, as a resample sum would. """
+        volume = hist['total_volume'].groupby(self._buckets(hist)).sum()
+        prices = ohlc.drop(columns='timestamp').groupby(self._buckets(ohlc)).agg({
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+        })
+        bars = pd.concat([prices, volume], axis=1).sort_index().astype(np.float64)
+        return bars.assign(total_volume=bars['total_volume'].fillna(0))[_SESSION_COLUMNS]
+
+    def _buckets(self, rows: pd.DataFrame) -> np.ndarray:
+        timestamps = rows['timestamp'].to_numpy(dtype=np.int64)
+        return timestamps - timestamps % self._bucket_ms
+
+    @staticmethod
+    def _merge_bars(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        """ new only holds rows later than those behind old, so old keeps the first open
+        and new brings the last close. """
+        if old.empty or new.empty:
+            return new if old.empty else old
+
+        index = old.index.union(new.index)
+        old, new = old.reindex(index), new.reindex(index)
+        return pd.DataFrame({
+            'open': old['open'].combine_first(new['open']),
+            'high': np.fmax(old['high'], new['high']),
+            'low': np.fmin(old['low'], new['low']),
+            'close': new['close'].combine_first(old['close']),
+            'total_volume': old['total_volume'].fillna(0) + new['total_volume'].fillna(0),
+        }, index=index)
+
+    def _split_finalized(self) -> SessionUpdate:
+        if any(last_ts is None for last_ts in self._last_ts.values()):
+            return SessionUpdate(self._to_session(self._pending.iloc[0:0]), self._to_session(self._pending))
+
+        watermark = min(self._last_ts.values())
+        is_closed = self._pending.index.to_numpy() + self._bucket_ms <= watermark
+        finalized, self._pending = self._pending[is_closed], self._pending[~is_closed]
+        return SessionUpdate(self._to_session(finalized), self._to_session(self._pending))
+
+    def _to_session(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """ Shapes bars like OHLCSessionMaker.make_session output. """
+        sessions = (bars
+                    .set_axis(utc_index_from_cached_ts(bars.index))
+                    .dropna())
+        sessions.attrs = dict(zip(CoinMetaData._fields, self.coin_meta))
+        return sessions
+
+
+def get_cached_session(
+        coin_meta: CoinMetaData,
+        freq: str = '1D',
+        start: datetime | None = None,
+        end: datetime | None = None,
+) -> pd.DataFrame:
+    """ Returns session bars (as OHLCSessionMaker.make_session) between start and end (UTC, inclusive)
+    straight from the pre-aggregated pyramid in the cache, for any freq in config.SESSION_PYRAMID_FREQS.
+
+    Bars are fixed-size buckets counted from midnight UTC, as make_session's for freqs of a day or less.
+    Weekly ('7D') bars run Monday to Sunday, like resample('W-MON', closed='left', label='left'),
+    while make_session('7D') starts its 7-day bins on the first day of the data.
+
+    Upserts only mark the pyramid stale; the first read after them brings it up to date
+    (or builds it, for a coin cached before it existed). """
+    with get_connection() as conn:
+        is_current = SessionPyramid(coin_meta, conn).is_current()
+    if not is_current:
+        with get_connection(immediate=True) as conn, conn.begin():
+            SessionPyramid(coin_meta, conn).update()
+
+    with get_connection() as conn:
+        data = SessionPyramid(coin_meta, conn).fetch_columns(freq, start, end)
+
+    return make_time_series_frame(data, coin_meta).drop(columns='timestamp')
+
+
+def iter_cached_chunks(
+        coin_meta: CoinMetaData,
+        chunk: timedelta = timedelta(days=90),
+        start: datetime | None = None,
+        end: datetime | None = None,
+) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+    """ Yields (hist_df, ohlc_df) frames of cached rows, one chunk-long window at a time,
+    so multi-year histories can be fed to StreamingSessionMaker.stream with bounded memory.
+
+    Windows share their boundary (both ends are inclusive); the session maker skips the repeated rows.
+    start / end (UTC) default to the oldest and newest cached rows of either table. """
+    with get_connection() as conn:
+        caches = [CacheManager(coin_meta, table_name, conn=conn) for table_name in StreamingSessionMaker._tables]
+        first_dts = [dt for dt in (cache.first_dt() for cache in caches) if dt]
+        last_dts = [dt for dt in (cache.last_dt() for cache in caches) if dt]
+    if not first_dts:
+        return
+
+    window_start = (start or min(first_dts)).replace(microsecond=0)
+    end = end or max(last_dts)
+    while window_start <= end:
+        window_end = min(window_start + chunk, end)
+        with get_connection() as conn:
+            frames = tuple(
+                make_time_series_frame(
+                    CacheManager(coin_meta, table_name, conn=conn).fetch_columns(window_start, window_end),
+                    coin_meta)
+                for table_name in StreamingSessionMaker._tables)
+        yield frames
+        window_start += chunk
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from cache import fetch_many_columns, get_connection
+from project_utils import utc_index_from_cached_ts, CoinMetaData, timed
+
+
+class Panel(NamedTuple):
+    """ Many cached series aligned on one datetime index: values[column] is a 2-D array
+    with a row per timestamp and a column per coin (in coin_metas order), NaN where a coin has no data. """
+    index: pd.DatetimeIndex
+    coin_metas: list[CoinMetaData]
+    values: dict[str, np.ndarray]
+
+    def frame(self, column: str) -> pd.DataFrame:
+        """ Wide frame of one column, columns indexed by (coin_id, currency). """
+        return pd.DataFrame(self.values[column], index=self.index, columns=self._coin_columns())
+
+    def to_frame(self) -> pd.DataFrame:
+        """ Wide frame of every column, columns indexed by (column, coin_id, currency). """
+        return pd.concat({column: self.frame(column) for column in self.values}, axis=1,
+                         names=['column', *CoinMetaData._fields])
+
+    def to_long(self) -> pd.DataFrame:
+        """ Same layout as concat_time_series_frames: rows indexed by (coin_id, currency, datetime).
+        Rows a coin has no data for are left out. """
+        n_rows, n_coins = len(self.index), len(self.coin_metas)
+        rows = pd.MultiIndex.from_arrays(
+            [np.repeat([coin_meta.coin_id for coin_meta in self.coin_metas], n_rows),
+             np.repeat([coin_meta.currency for coin_meta in self.coin_metas], n_rows),
+             np.tile(self.index, n_coins)],
+            names=[*CoinMetaData._fields, 'datetime'])
+        long = pd.DataFrame({column: values.T.ravel() for column, values in self.values.items()}, index=rows)
+        return long.dropna(how='all')
+
+    def _coin_columns(self) -> pd.MultiIndex:
+        return pd.MultiIndex.from_tuples([tuple(coin_meta) for coin_meta in self.coin_metas],
+                                         names=CoinMetaData._fields)
+
+
+@timed('panel_load_seconds')
+def load_panel(
+        coin_metas: list[CoinMetaData],
+        table_name: str = 'historical_data',
+        columns: list[str] | None = None,
+        freq: str | timedelta | None = '1h',
+        start: datetime | None = None,
+        end: datetime | None = None,
+) -> Panel:
+    """ Loads many series from the cache over one connection and aligns them on a shared datetime index.
+
+    CoinGecko samples every coin at slightly different moments, so rows are aggregated inside SQLite
+    into fixed, epoch-aligned freq buckets first (as the cache's bucket_ms reads, see BUCKET_AGGREGATIONS)
+    and the index is the union of the buckets of all coins. freq=None keeps the raw timestamps,
+    which only line up for daily data.
+
+    Only cached rows are read; refresh the coins first, e.g. with get_historical_data_batch. """
+    if not coin_metas:
+        raise ValueError("coin_metas must not be empty")
+    if len(set(coin_metas)) != len(coin_metas):
+        raise ValueError("coin_metas must not repeat a coin")
+    bucket_ms = None if freq is None else int(pd.Timedelta(freq).total_seconds() * 1000)
+    if bucket_ms is not None and bucket_ms <= 0:
+        raise ValueError("freq must be a positive, fixed-size duration")
+
+    with get_connection() as conn:
+        data = fetch_many_columns(conn, coin_metas, table_name, columns, start, end, bucket_ms)
+
+    timestamps, positions = data.pop('timestamp'), data.pop('series')
+    grid = np.unique(timestamps)
+    rows = np.searchsorted(grid, timestamps)
+
+    values = {}
+    for column, column_values in data.items():
+        values[column] = np.full((len(grid), len(coin_metas)), np.nan)
+        values[column][rows, positions] = column_values
+
+    return Panel(utc_index_from_cached_ts(grid), list(coin_metas), values)
+
+
+def period_returns(prices: pd.DataFrame, log: bool = False) -> pd.DataFrame:
+    """ Returns from one row to the next for every column at once (NaN after a gap). """
+    values = prices.to_numpy(dtype=np.float64)
+    changes = np.full_like(values, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes[1:] = np.log(values[1:] / values[:-1]) if log else values[1:] / values[:-1] - 1
+    return pd.DataFrame(changes, index=prices.index, columns=prices.columns)
+
+
+def rolling_volatility(
+        returns: pd.DataFrame,
+        window: int,
+        periods_per_year: float | None = None,
+) -> pd.DataFrame:
+    """ Rolling standard deviation of returns over window rows, annualized if periods_per_year is given
+    (e.g. 24 * 365 for hourly returns). Windows with a missing return are NaN. """
+    if window < 2:
+        raise ValueError("window must be at least 2")
+    volatility = returns.rolling(window, min_periods=window).std()
+    return volatility * np.sqrt(periods_per_year) if periods_per_year else volatility
+
+
+def correlation_matrix(returns: pd.DataFrame, min_periods: int = 2) -> pd.DataFrame:
+    """ Pairwise Pearson correlation of the columns, each pair over the rows both have. """
+    return returns.corr(min_periods=min_periods)
+
+
+def market_cap_weighted_index(
+        prices: pd.DataFrame,
+        market_caps: pd.DataFrame,
+        base: float = 100.0,
+) -> pd.Series:
+    """ Index starting at base whose return in every period is the average of the coins' returns,
+    weighted by their market caps at the start of the period.
+    Coins missing a price or market cap sit out that period. """
+    if prices.shape != market_caps.shape:
+        raise ValueError("prices and market_caps must have the same shape")
+
+    changes = period_returns(prices).to_numpy()
+    weights = np.full_like(changes, np.nan)
+    weights[1:] = market_caps.to_numpy(dtype=np.float64)[:-1]
+
+    valid = np.isfinite(changes) & np.isfinite(weights) & (weights > 0)
+    weighted = np.where(valid, weights * changes, 0.0).sum(axis=1)
+    total = np.where(valid, weights, 0.0).sum(axis=1)
+    index_returns = np.divide(weighted, total, out=np.zeros_like(total), where=total > 0)
+
+    return pd.Series(base * np.cumprod(1 + index_returns), index=prices.index, name='mcap_weighted_index')
+
@@ -4,23 +4,52 @@ from project_utils.time import (
     days_for_free_api,
     utc_n_min_ago,
     utc_from_cached_ts,
+    utc_index_from_cached_ts,
+    cached_ts_from_utc,
     days_to_call,
 )
 
 from project_utils.frames import (
     make_time_series_frame,
+    concat_time_series_frames,
     set_dt_index_using_ts_column,
     CoinMetaData,
 )
 
+from project_utils.metrics import (
+    Metrics,
+    InMemoryMetrics,
+    MetricsSnapshot,
+    HistogramSnapshot,
+    get_metrics,
+    set_metrics,
+    timer,
+    timed,
+    prometheus_text,
+    log_metrics,
+)
+
 __all__ = [
     "dt_or_default",
     "days_since_dt",
     "days_for_free_api",
     "utc_n_min_ago",
     "utc_from_cached_ts",
+    "utc_index_from_cached_ts",
+    "cached_ts_from_utc",
     "days_to_call",
     "make_time_series_frame",
+    "concat_time_series_frames",
     "set_dt_index_using_ts_column",
     "CoinMetaData",
+    "Metrics",
+    "InMemoryMetrics",
+    "MetricsSnapshot",
+    "HistogramSnapshot",
+    "get_metrics",
+    "set_metrics",
+    "timer",
+    "timed",
+    "prometheus_text",
+    "log_metrics",
 ]
\ No newline at end of file
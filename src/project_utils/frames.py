@@ -2,6 +2,8 @@ from typing import NamedTuple, Self
 
 import pandas as pd
 
+from project_utils.time import utc_index_from_cached_ts
+
 
 class CoinMetaData(NamedTuple):
     coin_id: str
@@ -14,11 +16,23 @@ class CoinMetaData(NamedTuple):
 
 
 def make_time_series_frame(data: any, coin_meta: CoinMetaData) -> pd.DataFrame:
+    """ Frames with a timestamp column also get a UTC 'datetime' index, built once here
+    so plotters and session makers don't have to parse timestamps again. """
     df = pd.DataFrame(data)
+    if 'timestamp' in df.columns:
+        df.index = utc_index_from_cached_ts(df['timestamp'])
     df.attrs['coin_id'], df.attrs['currency'] = tuple(coin_meta)
     return df
 
 
+def concat_time_series_frames(frames: dict[CoinMetaData, pd.DataFrame]) -> pd.DataFrame:
+    """ Stacks single-coin frames into one frame indexed by (coin_id, currency, datetime). """
+    return pd.concat(
+        {tuple(coin_meta): frame for coin_meta, frame in frames.items()},
+        names=[*CoinMetaData._fields, 'datetime'],
+    )
+
+
 def set_dt_index_using_ts_column(ts_frame: pd.DataFrame) -> pd.DataFrame:
     if ts_frame.index.name == 'datetime':
         return ts_frame
@@ -26,10 +40,7 @@ def set_dt_index_using_ts_column(ts_frame: pd.DataFrame) -> pd.DataFrame:
     if not 'timestamp' in ts_frame.columns:
         raise ValueError('ts_frame must have timestamp column')
 
-    return (ts_frame
-            .assign(timestamp=pd.to_datetime(ts_frame.timestamp, unit='ms').dt.floor('s'))
-            .set_index('timestamp')
-            .rename_axis('datetime'))
+    return ts_frame.set_axis(utc_index_from_cached_ts(ts_frame['timestamp'])).drop(columns='timestamp')
 
 
 def _check_attrs(ts_frame: pd.DataFrame) -> None:
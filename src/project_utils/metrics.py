@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, ContextManager, NamedTuple
+
+# Upper bounds (seconds) of the histogram buckets, as in Prometheus client defaults
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Metrics:
+    """ Instrumentation hooks called along fetch -> cache -> prep -> plot.
+
+    This base class records nothing and is the default, so instrumented code costs a call to an
+    empty method. Install a recording implementation (e.g. InMemoryMetrics) with set_metrics. """
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """ Adds value to a counter. """
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """ Records one value (seconds) in a histogram. """
+
+
+class HistogramSnapshot(NamedTuple):
+    buckets: tuple[float, ...]
+    bucket_counts: tuple[int, ...]  # per bucket, the last one counts values above every bound
+    count: int
+    sum: float
+
+
+class MetricsSnapshot(NamedTuple):
+    counters: dict[tuple[str, Labels], float]
+    histograms: dict[tuple[str, Labels], HistogramSnapshot]
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self.counters.get((name, _labels_key(labels)), 0.0)
+
+    def counter_total(self, name: str) -> float:
+        """ Sum of a counter over all its label values. """
+        return sum(value for (counter_name, _), value in self.counters.items() if counter_name == name)
+
+
+class InMemoryMetrics(Metrics):
+    """ Thread-safe counters and fixed-bucket histograms, read through snapshot() or the exporters. """
+    enabled = True
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._histograms: dict[tuple[str, Labels], list] = {}   # [bucket counts, count, sum]
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, _labels_key(labels))
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            return MetricsSnapshot(
+                dict(self._counters),
+                {key: HistogramSnapshot(self.buckets, tuple(counts), count, total)
+                 for key, (counts, count, total) in self._histograms.items()},
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+_metrics: Metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics | None) -> Metrics:
+    """ Installs metrics process-wide (None restores the no-op default) and returns the previous ones. """
+    global _metrics
+    previous, _metrics = _metrics, metrics or Metrics()
+    return previous
+
+
+def timer(name: str, **labels: str) -> ContextManager[None]:
+    """ Observes the block's wall time in the histogram name; skips the clock when metrics are off. """
+    metrics = _metrics
+    if not metrics.enabled:
+        return _NO_TIMER
+    return _Timer(metrics, name, labels)
+
+
+def timed(name: str, **labels: str) -> Callable:
+    """ Decorator form of timer. """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics = _metrics
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.observe(name, time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+def prometheus_text(metrics: InMemoryMetrics) -> str:
+    """ Renders the metrics in the Prometheus text exposition format. """
+    snapshot = metrics.snapshot()
+    lines = []
+
+    for name in sorted({name for name, _ in snapshot.counters}):
+        lines.append(f'# TYPE {name} counter')
+        for (counter_name, labels), value in sorted(snapshot.counters.items()):
+            if counter_name == name:
+                lines.append(f'{name}{_labels_text(labels)} {value:g}')
+
+    for name in sorted({name for name, _ in snapshot.histograms}):
+        lines.append(f'# TYPE {name} histogram')
+        for (histogram_name, labels), histogram in sorted(snapshot.histograms.items()):
+            if histogram_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, float('inf')), histogram.bucket_counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{name}_bucket{_labels_text(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels_text(labels)} {histogram.sum:g}')
+            lines.append(f'{name}_count{_labels_text(labels)} {histogram.count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def log_metrics(metrics: InMemoryMetrics,
+                logger: logging.Logger | None = None,
+                level: int = logging.INFO) -> None:
+    """ Logs one line per counter and one per histogram (count, mean and total seconds). """
+    logger = logger or logging.getLogger('coingecko.metrics')
+    snapshot = metrics.snapshot()
+
+    for (name, labels), value in sorted(snapshot.counters.items()):
+        logger.log(level, '%s%s = %g', name, _labels_text(labels), value)
+    for (name, labels), histogram in sorted(snapshot.histograms.items()):
+        mean = histogram.sum / histogram.count if histogram.count else 0.0
+        logger.log(level, '%s%s count=%d mean=%.4fs total=%.3fs',
+                   name, _labels_text(labels), histogram.count, mean, histogram.sum)
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics: Metrics, name: str, labels: dict[str, str]):
+        self.metrics, self.name, self.labels = metrics, name, labels
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def _labels_key(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _labels_text(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
@@ -1,6 +1,9 @@
 import math
 from datetime import datetime, timedelta, timezone
 
+import numpy as np
+import pandas as pd
+
 from config import DEFAULT_DAYS
 
 
@@ -48,6 +51,17 @@ def utc_from_cached_ts(ts: int) -> datetime:
     """Returns the UTC datetime from the given timestamp."""
     return datetime.fromtimestamp(ts/1000, tz=timezone.utc)
 
+def utc_index_from_cached_ts(timestamps: np.ndarray | pd.Series) -> pd.DatetimeIndex:
+    """Returns a UTC DatetimeIndex ('datetime', ms resolution) of cached (millisecond) timestamps,
+    reinterpreted in one vectorized step instead of parsed value by value."""
+    as_ms = np.asarray(timestamps, dtype=np.int64).view('datetime64[ms]')
+    return pd.DatetimeIndex(as_ms, name='datetime').tz_localize('UTC')
+
+def cached_ts_from_utc(dt: datetime) -> int:
+    """Returns the cached (millisecond) timestamp of the given UTC datetime."""
+    require_utc_aware(dt)
+    return int(dt.timestamp() * 1000)
+
 def days_for_free_api(days: int) -> int:
     """Adjust days to supported by CoinGecko free tier limits."""
     limits = (1, 7, 14, 30, 90, 180)
@@ -1,7 +1,16 @@
 from visualizations.plotters import OHLCPlotter, HistPlotter
 from visualizations.ax_formatter import AxFormatter
+from visualizations.multi_plotter import MultiSeriesPlotter
+from visualizations.live_charts import LiveChart, LiveLineChart, LiveCandleChart
+from visualizations.batch_render import render_charts, RenderResult
 
 __all__ = [
     "OHLCPlotter",
     "HistPlotter",
+    "MultiSeriesPlotter",
+    "LiveChart",
+    "LiveLineChart",
+    "LiveCandleChart",
+    "render_charts",
+    "RenderResult",
 ]
\ No newline at end of file
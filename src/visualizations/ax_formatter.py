@@ -20,11 +20,22 @@ class AxFormatter:
         self._format_ax_date(ax)
         self._format_ax_prices(ax)
 
+    def format_axes(self, axes: list[plt.Axes]):
+        """ Formats axes of one figure sharing their x-axis (plt.subplots(sharex=True)):
+        the date locator and formatter are set once, on the shared x-axis. """
+        if not axes:
+            return
+        self._format_ax_date(axes[0])
+        for ax in axes:
+            self._format_ax_prices(ax)
+
 
     def _format_ax_date(
             self,
             ax: plt.Axes,
     ) -> None:
+        # locators and formatters are bound to the axis they're set on (the locator reads
+        # its view limits), so every axis gets its own
         ax.xaxis.set_major_locator(DayLocator(interval=self._interval))
         ax.figure.autofmt_xdate(rotation=self._rotation)
         if self.should_format_date:
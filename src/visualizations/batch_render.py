@@ -0,0 +1,124 @@
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import matplotlib
+import pandas as pd
+
+from project_utils import CoinMetaData, make_time_series_frame
+
+CHART_KINDS = ('price', 'market_cap', 'total_volume', 'candlestick')
+
+
+class RenderResult(NamedTuple):
+    coin_meta: CoinMetaData
+    kind: str
+    path: Path | None
+    seconds: float
+    peak_rss_bytes: int     # peak RSS of the worker process after this chart
+    error: str | None = None
+
+
+def render_charts(
+        coin_metas: list[CoinMetaData],
+        kinds: tuple[str, ...] | list[str] = CHART_KINDS,
+        output_dir: str | Path = 'reports',
+        *,
+        fmt: str = 'png',
+        plot_size: tuple[int, int] = (10, 5),
+        dpi: int = 100,
+        max_workers: int | None = None,
+        max_tasks_per_child: int = 20,
+) -> list[RenderResult]:
+    """ Renders `kinds` charts for every coin from the local cache (no network calls)
+    into output_dir as '<coin_id>_<currency>_<kind>.<fmt>'.
+
+    Coins are spread over a process pool using the headless Agg backend; each worker closes
+    its figures after saving and is replaced after max_tasks_per_child coins, so memory stays
+    bounded on long runs. Workers are spawned, so they open the cache configure_engine points at
+    in this process. Failures are reported in RenderResult.error instead of raised. """
+    from cache import engine_settings
+
+    unknown = set(kinds) - set(CHART_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown chart kinds: {', '.join(sorted(unknown))}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_worker,
+                             initargs=engine_settings(),
+                             max_tasks_per_child=max_tasks_per_child) as pool:
+        futures = [pool.submit(_render_coin, coin_meta, tuple(kinds), output_dir, fmt, plot_size, dpi)
+                   for coin_meta in coin_metas]
+        return [result for future in futures for result in future.result()]
+
+
+def _init_worker(db_url: str, profile) -> None:
+    from cache import configure_engine
+
+    matplotlib.use('Agg')
+    configure_engine(db_url, profile)
+
+
+def _render_coin(
+        coin_meta: CoinMetaData,
+        kinds: tuple[str, ...],
+        output_dir: Path,
+        fmt: str,
+        plot_size: tuple[int, int],
+        dpi: int,
+) -> list[RenderResult]:
+    # imported here so the worker's backend is set before pyplot is loaded
+    from matplotlib import pyplot as plt
+    from data_prep import OHLCSessionMaker
+    from visualizations.plotters import HistPlotter, OHLCPlotter
+
+    results = []
+    try:
+        hist_df = _load_cached_frame(coin_meta, 'historical_data')
+        if hist_df.empty:
+            raise ValueError(f"No cached historical data for {coin_meta.coin_id}/{coin_meta.currency}")
+        ohlc_df = _load_cached_frame(coin_meta, 'ohlc_data') if 'candlestick' in kinds else None
+    except Exception as e:
+        return [RenderResult(coin_meta, kind, None, 0.0, _peak_rss_bytes(), repr(e)) for kind in kinds]
+
+    for kind in kinds:
+        started = time.perf_counter()
+        path = output_dir / f"{coin_meta.coin_id}_{coin_meta.currency}_{kind}.{fmt}"
+        fig = None
+        try:
+            if kind == 'candlestick':
+                session = OHLCSessionMaker(hist_df, ohlc_df).make_session()
+                fig, _ = OHLCPlotter(session, plot_size).plot_candlestick(has_volume=True)
+            else:
+                fig = getattr(HistPlotter(hist_df, plot_size), f'plot_{kind}')().figure
+
+            fig.savefig(path, dpi=dpi)
+            results.append(RenderResult(coin_meta, kind, path, time.perf_counter() - started, _peak_rss_bytes()))
+        except Exception as e:
+            results.append(RenderResult(coin_meta, kind, None, time.perf_counter() - started,
+                                        _peak_rss_bytes(), repr(e)))
+        finally:
+            if fig is not None:
+                plt.close(fig)
+
+    return results
+
+
+def _load_cached_frame(coin_meta: CoinMetaData, table_name: str) -> pd.DataFrame:
+    from cache import CacheManager, get_connection
+
+    with get_connection() as conn:
+        data = CacheManager(coin_meta, table_name, conn=conn).fetch_columns()
+    return make_time_series_frame(data, coin_meta)
+
+
+def _peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+
+# narrowest candle (in pixels) still worth drawing on its own
+MIN_CANDLE_WIDTH_PX = 3
+
+
+def target_width_px(plot_size: tuple[float, float] | None, dpi: float | None = None) -> int:
+    """ Width of the figure in pixels, for matplotlib's default size/DPI when not given. """
+    width_in = (plot_size or plt.rcParams['figure.figsize'])[0]
+    return max(1, int(width_in * (dpi or plt.rcParams['figure.dpi'])))
+
+
+def min_max_decimate(ts_frame: pd.DataFrame, columns: list[str], n_buckets: int) -> pd.DataFrame:
+    """ Splits the series into n_buckets equal runs of rows (one per pixel column) and keeps,
+    for every plotted column, the rows holding each run's minimum and maximum, plus the
+    first and last row. The drawn line keeps every peak and trough. """
+    n_rows = len(ts_frame)
+    if n_rows <= 2 * n_buckets * len(columns) + 2:
+        return ts_frame
+
+    keep = [min_max_rows(ts_frame[col].to_numpy(dtype=np.float64), n_buckets) for col in columns]
+    return ts_frame.iloc[np.unique(np.concatenate(keep))]
+
+
+def min_max_rows(values: np.ndarray, n_buckets: int, x: np.ndarray | None = None) -> np.ndarray:
+    """ Positions of the rows min_max_decimate keeps for one column, in order. NaNs are never picked
+    as a minimum or maximum unless a whole bucket is NaN.
+
+    With x (increasing, e.g. date numbers) buckets span equal ranges of x instead of equal runs of rows,
+    which keeps unevenly spaced rows (e.g. already thinned ones) in their place. """
+    n_rows = len(values)
+    if n_rows <= 2 * n_buckets + 2:
+        return np.arange(n_rows)
+
+    if x is None or x[-1] == x[0]:
+        buckets = np.arange(n_rows) * n_buckets // n_rows
+    else:
+        buckets = np.minimum(((x - x[0]) / (x[-1] - x[0]) * n_buckets).astype(np.int64), n_buckets - 1)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    is_nan = np.isnan(values)
+    return np.unique(np.concatenate([
+        [0, n_rows - 1],
+        _first_extreme_rows(np.where(is_nan, np.inf, values), buckets, starts, np.minimum),
+        _first_extreme_rows(np.where(is_nan, -np.inf, values), buckets, starts, np.maximum),
+    ]))
+
+
+def resample_candles(ohlc_frame: pd.DataFrame, max_candles: int) -> pd.DataFrame:
+    """ Merges candles into coarser OHLC bars (first open, max high, min low, last close,
+    summed volume) so that at most max_candles remain. Expects a DatetimeIndex. """
+    if len(ohlc_frame) <= max_candles:
+        return ohlc_frame
+
+    span = ohlc_frame.index[-1] - ohlc_frame.index[0]
+    rule = pd.Timedelta(seconds=math.ceil(span.total_seconds() / max_candles / 60) * 60)
+    aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'total_volume': 'sum'}
+
+    resampled = (ohlc_frame
+                 .resample(rule)
+                 .agg({col: agg for col, agg in aggregations.items() if col in ohlc_frame.columns})
+                 .dropna(subset=['open', 'close']))
+    resampled.attrs = ohlc_frame.attrs
+    return resampled
+
+
+def _first_extreme_rows(values: np.ndarray, buckets: np.ndarray, starts: np.ndarray, extreme: np.ufunc) -> np.ndarray:
+    """ Row of the first minimum (np.minimum) or maximum (np.maximum) of every bucket,
+    as groupby idxmin / idxmax, without building a groupby per column. """
+    is_extreme = values == extreme.reduceat(values, starts)[buckets]
+    rows = np.flatnonzero(is_extreme)
+    _, first = np.unique(buckets[rows], return_index=True)
+    return rows[first]
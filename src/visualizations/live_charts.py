@@ -0,0 +1,345 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import mplfinance as mpf
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.dates import AutoDateLocator, date2num
+from matplotlib.figure import Figure
+
+from cache import CacheManager, get_connection, subscribe_upserts, UpsertEvent
+from config import LIVE_CHART_MAX_FPS
+from data_prep import StreamingSessionMaker
+from project_utils import CoinMetaData, make_time_series_frame, utc_from_cached_ts
+from visualizations.ax_formatter import AxFormatter
+from visualizations.decimation import min_max_rows, target_width_px, MIN_CANDLE_WIDTH_PX
+
+_MS_PER_DAY = 86_400_000
+_MAX_DATE_TICKS = 12
+
+
+class LiveChart(ABC):
+    """ A figure kept current by the rows CacheManager.upsert writes for one coin.
+
+    Upserts only queue their rows (see cache.subscribe_upserts); poll applies the queued rows to
+    the existing artists and redraws, at most max_fps times per second. start also drives poll
+    from a canvas timer, which runs on GUI / notebook backends; headless code calls poll itself.
+
+        with HistPlotter(frame).plot_live() as chart:
+            ...  # the figure follows get_historical_data(..., delta=True) refreshes
+
+    Every frame costs the same however long the history grows: artists hold a bounded
+    number of points (see LiveLineChart and LiveCandleChart). """
+    _tables: tuple[str, ...] = ()
+
+    def __init__(self, figure: Figure, coin_meta: CoinMetaData, max_fps: float = LIVE_CHART_MAX_FPS):
+        if max_fps <= 0:
+            raise ValueError("max_fps must be positive")
+        self.figure = figure
+        self.coin_meta = coin_meta
+        self.max_fps = max_fps
+        self.frames = 0
+
+        self._pending: list[UpsertEvent] = []
+        self._lock = threading.Lock()
+        self._unsubscribes = []
+        self._last_frame = float('-inf')
+        self._timer = figure.canvas.new_timer(interval=max(1, int(1000 / max_fps)))
+        self._timer.add_callback(self.poll)
+        figure.canvas.mpl_connect('close_event', lambda _: self.stop())
+
+    def start(self) -> 'LiveChart':
+        if not self._unsubscribes:
+            self._unsubscribes = [subscribe_upserts(self._on_upsert, table_name, self.coin_meta)
+                                  for table_name in self._tables]
+            self._timer.start()
+        return self
+
+    def stop(self) -> None:
+        self._timer.stop()
+        for unsubscribe in self._unsubscribes:
+            unsubscribe()
+        self._unsubscribes = []
+
+    def poll(self) -> bool:
+        """ Applies the rows upserted since the last frame and redraws. Returns False without
+        drawing when nothing arrived or the previous frame is too recent (rows then wait). """
+        now = time.monotonic()
+        if now - self._last_frame < 1 / self.max_fps:
+            return False
+        with self._lock:
+            events, self._pending = self._pending, []
+        if not events or not self._apply(events):
+            return False
+
+        self._rescale()
+        self.figure.canvas.draw_idle()
+        self._last_frame = now
+        self.frames += 1
+        return True
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _on_upsert(self, event: UpsertEvent) -> None:
+        with self._lock:
+            self._pending.append(event)
+
+    @abstractmethod
+    def _apply(self, events: list[UpsertEvent]) -> bool:
+        """ Moves the new rows into the artists; returns whether anything changed. """
+
+    @abstractmethod
+    def _rescale(self) -> None:
+        """ Fits the axes to the artists' data. """
+
+    @staticmethod
+    def _limit_date_ticks(ax: plt.Axes) -> None:
+        """ AxFormatter ticks every few days, which over a long live history means hundreds of
+        labels to lay out each frame; past _MAX_DATE_TICKS the axis switches to an AutoDateLocator. """
+        locator = ax.xaxis.get_major_locator()
+        if not isinstance(locator, AutoDateLocator) and len(locator()) > _MAX_DATE_TICKS:
+            ax.xaxis.set_major_locator(AutoDateLocator(maxticks=_MAX_DATE_TICKS))
+
+
+class LiveLineChart(LiveChart):
+    _tables = ('historical_data',)
+
+    def __init__(
+            self,
+            ts_frame: pd.DataFrame,
+            columns: list[str],
+            title: str,
+            plot_size: tuple[int, int] = (10, 5),
+            ax_formatter: AxFormatter = None,
+            max_fps: float = LIVE_CHART_MAX_FPS,
+    ):
+        """ Lines of historical_data columns, drawn like HistPlotter._plot_by_columns from ts_frame
+        (with its datetime index), then extended with every newer upserted row.
+
+        Each line keeps at most ~4 points per pixel column: once it holds more, it is thinned
+        by min/max decimation over equal time spans (peaks and troughs stay). """
+        coin_meta = CoinMetaData.from_ts_frame(ts_frame)
+        figure, self.ax = plt.subplots(figsize=plot_size)
+        super().__init__(figure, coin_meta, max_fps)
+        self.columns = columns
+        self._n_buckets = target_width_px(plot_size)
+
+        x = _date_numbers(ts_frame.index.tz_convert('UTC').tz_localize(None).to_numpy())
+        self._last_ts = ts_frame.index.max().value // 1_000_000 if len(ts_frame) else None
+        self._data = {}
+        self.lines = {}
+        for column in columns:
+            self._data[column] = self._thinned(x, ts_frame[column].to_numpy(dtype=np.float64))
+            self.lines[column], = self.ax.plot(*self._data[column], label=column)
+
+        self.ax.set_title(f'{coin_meta.coin_id}: {title}')
+        self.ax.set_xlabel('Date')
+        self.ax.set_ylabel(coin_meta.currency)
+        self.ax.grid(True)
+        self.ax.legend()
+        self.ax.xaxis_date()
+        (ax_formatter or AxFormatter()).format_ax(self.ax)
+        self._rescale()
+
+    def _apply(self, events: list[UpsertEvent]) -> bool:
+        changed = False
+        for event in events:
+            rows = event.rows
+            is_new = rows['timestamp'] > self._last_ts if self._last_ts is not None \
+                else np.ones(len(rows['timestamp']), dtype=bool)
+            if not is_new.any():
+                continue
+
+            timestamps = rows['timestamp'][is_new]
+            x = _date_numbers(timestamps.view('datetime64[ms]'))
+            for column in self.columns:
+                old_x, old_y = self._data[column]
+                self._data[column] = self._thinned(np.concatenate([old_x, x]),
+                                                   np.concatenate([old_y, rows[column][is_new]]))
+                self.lines[column].set_data(*self._data[column])
+            self._last_ts = int(timestamps[-1])
+            changed = True
+        return changed
+
+    def _thinned(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        is_known = ~np.isnan(y)
+        x, y = x[is_known], y[is_known]
+        if len(y) > 4 * self._n_buckets:
+            kept = min_max_rows(y, self._n_buckets, x)
+            x, y = x[kept], y[kept]
+        return x, y
+
+    def _rescale(self) -> None:
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self._limit_date_ticks(self.ax)
+
+
+class LiveCandleChart(LiveChart):
+    _tables = ('historical_data', 'ohlc_data')
+
+    def __init__(
+            self,
+            session: pd.DataFrame,
+            title: str,
+            freq: str = '1D',
+            has_volume: bool = False,
+            plot_size: tuple[int, int] | None = None,
+            ax_formatter: AxFormatter = None,
+            max_fps: float = LIVE_CHART_MAX_FPS,
+    ):
+        """ Candles of OHLC sessions (as OHLCSessionMaker.make_session with freq), drawn from session
+        and then kept current: upserted rows of both tables are folded into the open bars by
+        a StreamingSessionMaker and the candle artists are updated in place.
+
+        The chart shows the latest candles that fit its width (MIN_CANDLE_WIDTH_PX each),
+        older ones scroll out. """
+        coin_meta = CoinMetaData.from_ts_frame(session)
+        if has_volume:
+            figure, (self.ax, self.volume_ax) = plt.subplots(2, 1, sharex=True, figsize=plot_size,
+                                                             gridspec_kw={'height_ratios': [3, 1]})
+        else:
+            figure, self.ax = plt.subplots(figsize=plot_size)
+            self.volume_ax = None
+        super().__init__(figure, coin_meta, max_fps)
+
+        self.freq = freq
+        self._bucket_days = pd.Timedelta(freq).total_seconds() / 86_400
+        self._max_candles = max(1, target_width_px(plot_size) // MIN_CANDLE_WIDTH_PX)
+        self._session_maker = StreamingSessionMaker(coin_meta, freq)
+        self._colors = mpf.make_mpf_style(base_mpf_style='default')['marketcolors']
+
+        self._bars = self._as_arrays(session)
+        self._trim()
+        self._wicks = LineCollection([], linewidths=0.8)
+        self._bodies = PolyCollection([], linewidths=0.8)
+        self.ax.add_collection(self._wicks)
+        self.ax.add_collection(self._bodies)
+        if self.volume_ax is not None:
+            self._volume_bars = PolyCollection([], alpha=self._colors['alpha'])
+            self.volume_ax.add_collection(self._volume_bars)
+            self.volume_ax.set_ylabel('Volume')
+
+        self.ax.set_title(f'{coin_meta.coin_id}: {title}')
+        (self.volume_ax or self.ax).set_xlabel('Date')
+        self.ax.set_ylabel(coin_meta.currency)
+        ax_formatter = ax_formatter or AxFormatter()
+        for ax in (self.ax, self.volume_ax):
+            if ax is not None:
+                ax.xaxis_date()
+                ax_formatter.format_ax(ax)
+
+        self._draw_bars()
+        self._rescale()
+
+    def start(self) -> 'LiveCandleChart':
+        """ Also seeds the session maker with the cached rows of the last plotted bar,
+        so the still-open candle keeps its earlier rows once new ones arrive. """
+        if not self._unsubscribes:
+            super().start()
+            seed_from = utc_from_cached_ts(int(round((self._bars['x'][-1] - _EPOCH_DAYS) * _MS_PER_DAY))) \
+                if len(self._bars['x']) else None
+            with get_connection() as conn:
+                frames = [make_time_series_frame(CacheManager(self.coin_meta, table_name, conn=conn)
+                                                 .fetch_columns(start=seed_from), self.coin_meta)
+                          for table_name in self._tables]
+            self._merge(self._session_maker.update(*frames))
+            self._draw_bars()
+        return self
+
+    def _apply(self, events: list[UpsertEvent]) -> bool:
+        rows = {table_name: [event.rows for event in events if event.table_name == table_name]
+                for table_name in self._tables}
+        frames = [make_time_series_frame(_concat_rows(rows[table_name]), self.coin_meta)
+                  for table_name in self._tables]
+        update = self._session_maker.update(*frames)
+        if update.finalized.empty and update.open.empty:
+            return False
+
+        self._merge(update)
+        self._draw_bars()
+        return True
+
+    def _merge(self, update) -> None:
+        """ finalized and open bars together cover every bucket from the first one they changed on,
+        so drawn bars from there on are replaced. """
+        new = self._as_arrays(pd.concat([update.finalized, update.open]).sort_index())
+        if not len(new['x']):
+            return
+        keep = self._bars['x'] < new['x'][0]
+        self._bars = {name: np.concatenate([values[keep], new[name]]) for name, values in self._bars.items()}
+        self._trim()
+
+    def _trim(self) -> None:
+        self._bars = {name: values[-self._max_candles:] for name, values in self._bars.items()}
+
+    def _draw_bars(self) -> None:
+        bars = self._bars
+        x, half = bars['x'], 0.4 * self._bucket_days
+        center = x + self._bucket_days / 2
+        is_up = bars['close'] >= bars['open']
+
+        self._wicks.set_segments(np.stack([np.column_stack([center, bars['low']]),
+                                           np.column_stack([center, bars['high']])], axis=1))
+        self._wicks.set_color(self._pick(is_up, 'wick'))
+
+        low, high = np.minimum(bars['open'], bars['close']), np.maximum(bars['open'], bars['close'])
+        self._bodies.set_verts(_rectangles(center - half, center + half, low, high))
+        self._bodies.set_facecolor(self._pick(is_up, 'candle'))
+        self._bodies.set_edgecolor(self._pick(is_up, 'edge'))
+
+        if self.volume_ax is not None:
+            self._volume_bars.set_verts(_rectangles(center - half, center + half,
+                                                    np.zeros_like(x), bars['total_volume']))
+            self._volume_bars.set_facecolor(self._pick(is_up, 'volume'))
+
+    def _pick(self, is_up: np.ndarray, part: str) -> list[str]:
+        colors = self._colors[part]
+        return [colors['up'] if up else colors['down'] for up in is_up]
+
+    def _rescale(self) -> None:
+        bars = self._bars
+        if not len(bars['x']):
+            return
+        self.ax.set_xlim(bars['x'][0] - self._bucket_days / 2, bars['x'][-1] + 1.5 * self._bucket_days)
+        self._limit_date_ticks(self.ax)
+        low, high = np.nanmin(bars['low']), np.nanmax(bars['high'])
+        margin = (high - low) * 0.05 or abs(high) * 0.01 or 1.0
+        self.ax.set_ylim(low - margin, high + margin)
+        if self.volume_ax is not None:
+            self.volume_ax.set_ylim(0, (np.nanmax(bars['total_volume']) or 1.0) * 1.1)
+
+    @staticmethod
+    def _as_arrays(session: pd.DataFrame) -> dict[str, np.ndarray]:
+        index = session.index.tz_convert('UTC').tz_localize(None) if session.index.tz is not None \
+            else session.index
+        arrays = {'x': _date_numbers(index.to_numpy())}
+        for column in ('open', 'high', 'low', 'close', 'total_volume'):
+            arrays[column] = session[column].to_numpy(dtype=np.float64) if column in session \
+                else np.zeros(len(session))
+        return arrays
+
+
+_EPOCH_DAYS = date2num(np.datetime64('1970-01-01T00:00:00'))
+
+
+def _date_numbers(datetimes: np.ndarray) -> np.ndarray:
+    return np.asarray(date2num(datetimes), dtype=np.float64)
+
+
+def _concat_rows(chunks: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    if not chunks:
+        return {}
+    return {column: np.concatenate([chunk[column] for chunk in chunks]) for column in chunks[0]}
+
+
+def _rectangles(left: np.ndarray, right: np.ndarray, bottom: np.ndarray, top: np.ndarray) -> np.ndarray:
+    return np.stack([np.column_stack(corner) for corner in
+                     ((left, bottom), (left, top), (right, top), (right, bottom))], axis=1)
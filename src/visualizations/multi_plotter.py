@@ -0,0 +1,234 @@
+import math
+
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+from matplotlib.dates import date2num
+from matplotlib.figure import Figure
+
+from project_utils import timed
+from visualizations.ax_formatter import AxFormatter
+from visualizations.decimation import min_max_rows, target_width_px
+
+
+class MultiSeriesPlotter:
+    def __init__(
+            self,
+            column: str = 'price',
+            *,
+            overlay: bool = False,
+            ncols: int = 5,
+            plot_size: tuple[float, float] | None = None,
+            ax_formatter: AxFormatter = None,
+            decimate: bool = True,
+            rebase: bool = False,
+            blit: bool = True,
+            headroom: float = 0.1,
+    ):
+        """ Draws many series of one column into a single figure: a grid of small multiples
+        (one axes per coin, sharing the x-axis, its locator and formatters) or, with overlay=True,
+        one axes holding every line.
+
+        Series come as a wide frame with a DatetimeIndex and a column per coin, as Panel.frame returns.
+        rebase=True plots every series as 100 * value / its first value, which makes overlays comparable.
+
+        After plot, update redraws new data by moving the existing line artists. With blit=True
+        only the lines are drawn again over a saved background, as long as the data stays inside
+        the axes limits; limits are set with headroom (a fraction of the data range) to spare,
+        so appended rows keep blitting for a while before a full redraw is needed. """
+        if ncols < 1:
+            raise ValueError("ncols must be at least 1")
+        if headroom < 0:
+            raise ValueError("headroom must not be negative")
+
+        self.column = column
+        self.overlay = overlay
+        self.ncols = ncols
+        self.plot_size = plot_size
+        self.ax_formatter = ax_formatter or AxFormatter()
+        self.decimate = decimate
+        self.rebase = rebase
+        self.blit = blit
+        self.headroom = headroom
+
+        self.figure: Figure | None = None
+        self.lines: dict = {}               # series label -> Line2D
+        self._axes: dict = {}               # series label -> its axes
+        self._bases: dict = {}              # series label -> value rebased to 100
+        self._background = None
+        self._background_size: tuple[int, int] | None = None
+
+    @timed('render_seconds', kind='multi')
+    def plot(self, series_frame: pd.DataFrame) -> Figure:
+        """ Builds the figure and returns it; the plotter keeps it for update. """
+        self._check_series_frame(series_frame)
+        labels = list(series_frame.columns)
+        if self.figure is not None:
+            plt.close(self.figure)
+
+        axes = self._make_axes(len(labels))
+        self._axes = {label: axes[0 if self.overlay else i] for i, label in enumerate(labels)}
+        self._bases = {label: self._first_valid(series_frame[label]) for label in labels} if self.rebase else {}
+
+        x, values = self._x_values(series_frame.index), series_frame.to_numpy(dtype=np.float64)
+        self.lines = {}
+        for i, label in enumerate(labels):
+            line_x, line_y = self._line_data(x, values[:, i], label)
+            self.lines[label], = self._axes[label].plot(line_x, line_y, linewidth=1,
+                                                        label=self._series_title(label))
+
+        for ax in axes:
+            ax.xaxis_date()
+            ax.grid(True)
+        if self.overlay:
+            axes[0].legend(fontsize='small', ncols=max(1, len(labels) // 15))
+        else:
+            for label, ax in self._axes.items():
+                ax.set_title(self._series_title(label), fontsize='small')
+        self.figure.suptitle(f"{self.column}{' (rebased to 100)' if self.rebase else ''}")
+        self.ax_formatter.format_axes(axes)
+
+        self._rescale()
+        self._redraw()
+        return self.figure
+
+    @timed('render_seconds', kind='multi_update')
+    def update(self, series_frame: pd.DataFrame) -> bool:
+        """ Moves the plotted lines to the rows of series_frame (same columns as the plotted frame)
+        without rebuilding the figure. Returns True if only the lines were redrawn (blitted). """
+        if self.figure is None:
+            raise ValueError("Nothing plotted yet, call plot first")
+        self._check_series_frame(series_frame)
+        unknown = set(series_frame.columns) - set(self.lines)
+        if unknown:
+            raise ValueError(f"Series not in the plot: {', '.join(map(str, unknown))}")
+
+        x, values = self._x_values(series_frame.index), series_frame.to_numpy(dtype=np.float64)
+        for i, label in enumerate(series_frame.columns):
+            self.lines[label].set_data(*self._line_data(x, values[:, i], label))
+
+        if self.blit and self._can_blit() and self._lines_fit():
+            self._blit_lines()
+            return True
+
+        self._rescale()
+        self._redraw()
+        return False
+
+    def _make_axes(self, n_series: int) -> list[plt.Axes]:
+        if self.overlay:
+            self.figure, ax = plt.subplots(figsize=self.plot_size or (10, 5))
+            return [ax]
+
+        ncols = min(self.ncols, n_series)
+        nrows = math.ceil(n_series / ncols)
+        self.figure, grid = plt.subplots(nrows, ncols, sharex=True, squeeze=False,
+                                         figsize=self.plot_size or (3 * ncols, 2 * nrows))
+        axes = list(grid.ravel())
+        for ax in axes[n_series:]:
+            ax.set_visible(False)
+        return axes[:n_series]
+
+    def _line_data(self, x: np.ndarray, y: np.ndarray, label) -> tuple[np.ndarray, np.ndarray]:
+        if self.rebase:
+            y = y / self._bases[label] * 100
+        is_known = ~np.isnan(y)
+        x, y = x[is_known], y[is_known]
+
+        width_px = target_width_px(self.plot_size) // (1 if self.overlay else self.ncols)
+        if self.decimate:
+            kept = min_max_rows(y, width_px)
+            x, y = x[kept], y[kept]
+        return x, y
+
+    def _lines_fit(self) -> bool:
+        """ Whether every line still lies inside the limits of its axes. """
+        for label, line in self.lines.items():
+            x, y = line.get_xdata(), line.get_ydata()
+            if not len(x):
+                continue
+            ax = self._axes[label]
+            (x_low, x_high), (y_low, y_high) = ax.get_xlim(), ax.get_ylim()
+            if x.min() < x_low or x.max() > x_high or y.min() < y_low or y.max() > y_high:
+                return False
+        return True
+
+    def _rescale(self) -> None:
+        """ Sets limits around the data with headroom to spare: x to the right (new rows are appended),
+        y on both sides. Axes in the grid share x, so x is set from all lines at once. """
+        x_low, x_high = np.inf, -np.inf
+        y_limits: dict = {}
+        for label, line in self.lines.items():
+            x, y = line.get_xdata(), line.get_ydata()
+            if not len(x):
+                continue
+            x_low, x_high = min(x_low, x.min()), max(x_high, x.max())
+            ax = self._axes[label]
+            low, high = y_limits.get(ax, (np.inf, -np.inf))
+            y_limits[ax] = (min(low, y.min()), max(high, y.max()))
+
+        if x_low > x_high:
+            return
+        x_span = (x_high - x_low) or 1.0
+        for ax in dict.fromkeys(self._axes.values()):
+            ax.set_xlim(x_low, x_high + self.headroom * x_span)
+        for ax, (low, high) in y_limits.items():
+            margin = max(high - low, abs(high) * 0.01 or 1.0) * max(self.headroom, 0.05)
+            ax.set_ylim(low - margin, high + margin)
+
+    def _can_blit(self) -> bool:
+        canvas = self.figure.canvas
+        return (canvas.supports_blit and self._background is not None
+                and self._background_size == canvas.get_width_height())
+
+    def _redraw(self) -> None:
+        """ Draws the whole figure; when blitting, keeps a copy of it without the lines for _blit_lines. """
+        canvas = self.figure.canvas
+        if not (self.blit and canvas.supports_blit):
+            canvas.draw_idle()
+            return
+
+        for line in self.lines.values():
+            line.set_animated(True)
+        canvas.draw()
+        self._background = canvas.copy_from_bbox(self.figure.bbox)
+        self._background_size = canvas.get_width_height()
+        for line in self.lines.values():
+            line.set_animated(False)
+        self._draw_lines()
+
+    def _blit_lines(self) -> None:
+        self.figure.canvas.restore_region(self._background)
+        self._draw_lines()
+
+    def _draw_lines(self) -> None:
+        for label, line in self.lines.items():
+            self._axes[label].draw_artist(line)
+        self.figure.canvas.blit(self.figure.bbox)
+        self.figure.canvas.flush_events()
+
+    @staticmethod
+    def _x_values(index: pd.DatetimeIndex) -> np.ndarray:
+        """ Matplotlib date numbers, converted once per frame for all its series. """
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return date2num(index.to_numpy())
+
+    @staticmethod
+    def _first_valid(series: pd.Series) -> float:
+        values = series.dropna()
+        if values.empty or values.iloc[0] == 0:
+            raise ValueError(f"Series {series.name} has no non-zero value to rebase on")
+        return float(values.iloc[0])
+
+    @staticmethod
+    def _series_title(label) -> str:
+        """ Panel frames label series by (coin_id, currency); the coin id is enough for a title. """
+        return str(label[0]) if isinstance(label, tuple) else str(label)
+
+    @staticmethod
+    def _check_series_frame(series_frame: pd.DataFrame) -> None:
+        if series_frame.empty or not len(series_frame.columns):
+            raise ValueError("Empty dataframes not supported")
+        if not isinstance(series_frame.index, pd.DatetimeIndex):
+            raise ValueError("series_frame must have a DatetimeIndex")
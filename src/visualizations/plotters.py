@@ -2,8 +2,11 @@ import pandas as pd
 import mplfinance as mpf
 from matplotlib import pyplot as plt
 
-from project_utils import CoinMetaData, set_dt_index_using_ts_column
+from config import LIVE_CHART_MAX_FPS
+from project_utils import CoinMetaData, set_dt_index_using_ts_column, timed
 from visualizations.ax_formatter import AxFormatter
+from visualizations.live_charts import LiveLineChart, LiveCandleChart
+from visualizations.decimation import min_max_decimate, resample_candles, target_width_px, MIN_CANDLE_WIDTH_PX
 
 
 class TimeSeriesPlotter:
@@ -12,11 +15,15 @@ class TimeSeriesPlotter:
             time_series_frame: pd.DataFrame,
             plot_size: tuple[int,int] = (10, 5),
             ax_formatter: AxFormatter = None,
+            decimate: bool = True,
     ):
+        """ With decimate=True, long series are thinned to what the figure can show
+        (see visualizations.decimation) before they're handed to matplotlib. """
         self._time_series_frame = time_series_frame.pipe(set_dt_index_using_ts_column)
         self._coin_meta = CoinMetaData.from_ts_frame(time_series_frame)
         self.plot_size = plot_size
         self.ax_formatter = ax_formatter or AxFormatter()
+        self.decimate = decimate
 
 
 class HistPlotter(TimeSeriesPlotter):
@@ -29,13 +36,24 @@ class HistPlotter(TimeSeriesPlotter):
     def plot_market_cap(self):
         return self._plot_by_columns(['market_cap'])
 
+    def plot_live(self, columns: list[str] = None, max_fps: float = LIVE_CHART_MAX_FPS) -> LiveLineChart:
+        """ Plots columns (default: price) and keeps the chart current with the rows later upserted
+        to the cache for this coin, see LiveLineChart. Call stop() (or use it as a context manager)
+        to detach it. """
+        columns = columns or ['price']
+        return LiveLineChart(self._time_series_frame, columns, self._plot_title(columns),
+                             self.plot_size, self.ax_formatter, max_fps).start()
+
+    @timed('render_seconds', kind='hist')
     def _plot_by_columns(
             self,
             columns: list[str],
     ):
         title = self._plot_title(columns)
+        frame = min_max_decimate(self._time_series_frame, columns, target_width_px(self.plot_size)) \
+            if self.decimate else self._time_series_frame
 
-        ax = self._time_series_frame.plot(
+        ax = frame.plot(
             y=columns,
             figsize= self.plot_size,
             title=f'{self._coin_meta.coin_id}: {title}',
@@ -65,16 +83,21 @@ class OHLCPlotter(TimeSeriesPlotter):
             ohlc_df: pd.DataFrame,
             plot_size: tuple[int, int] = None,
             ax_formatter: AxFormatter = None,
+            decimate: bool = True,
     ):
         self._check_if_ohlc_df(ohlc_df)
-        super().__init__(ohlc_df, plot_size, ax_formatter)
+        super().__init__(ohlc_df, plot_size, ax_formatter, decimate)
         self.ax_formatter.should_format_date = False
 
+    @timed('render_seconds', kind='ohlc')
     def plot_candlestick(self, has_volume: bool = False):
         title = 'OHLCV' if has_volume else 'OHLC'
+        max_candles = target_width_px(self.plot_size) // MIN_CANDLE_WIDTH_PX
+        frame = resample_candles(self._time_series_frame, max_candles) \
+            if self.decimate else self._time_series_frame
 
         fig, axes = mpf.plot(
-            self._time_series_frame,
+            frame,
             figsize=self.plot_size,
             title=f'{self._coin_meta.coin_id}: {title}',
             xlabel='Date',
@@ -93,6 +116,18 @@ class OHLCPlotter(TimeSeriesPlotter):
 
         return fig, axes
 
+    def plot_candlestick_live(
+            self,
+            has_volume: bool = False,
+            freq: str = '1D',
+            max_fps: float = LIVE_CHART_MAX_FPS,
+    ) -> LiveCandleChart:
+        """ Candlestick chart of the session (built with freq, as OHLCSessionMaker) kept current with
+        the rows later upserted to the cache for this coin, see LiveCandleChart. """
+        title = 'OHLCV' if has_volume else 'OHLC'
+        return LiveCandleChart(self._time_series_frame, title, freq, has_volume,
+                               self.plot_size, self.ax_formatter, max_fps).start()
+
     def _format_volume_ax(self, volume_ax: plt.Axes):
         volume_ax.set_ylabel('Volume')
         self.ax_formatter.format_ax(volume_ax)
@@ -0,0 +1,38 @@
+""" Shared fixtures: a throwaway SQLite cache per test and the local CoinGecko stub
+(benchmarks/stub_coingecko.py) in place of the API. """
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / 'src'), str(ROOT / 'benchmarks')]
+
+from api_client import http_client
+from cache import configure_engine, frame_cache
+from stub_coingecko import stub_coingecko
+
+
+@pytest.fixture(scope='session')
+def stub():
+    http_client._rate_limiter.max_calls = 10 ** 9
+    http_client._session.mount('http://', http_client._adapter)  # the stub speaks plain http
+    with stub_coingecko() as stub:
+        yield stub
+
+
+@pytest.fixture(scope='session')
+def slow_stub(stub):
+    """ A stub with a round trip long enough for concurrent calls to overlap. """
+    with stub_coingecko(latency=0.3) as slow_stub:
+        yield slow_stub
+
+
+@pytest.fixture
+def cache_db(tmp_path):
+    configure_engine(f"sqlite:///{os.path.join(tmp_path, 'cache.db')}")
+    frame_cache.clear()
+    yield
+    frame_cache.clear()
+    http_client._fresh_until.clear()   # set by RefreshScheduler for the series it keeps warm
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from api_client import async_coingecko, async_http_client, coingecko
+from cache import frame_cache
+from project_utils import CoinMetaData
+
+COIN = CoinMetaData('bitcoin', 'usd')
+
+
+def _stub_urls(monkeypatch, stub):
+    for module in (async_coingecko, coingecko):
+        monkeypatch.setattr(module, '_market_chart_url', lambda m: f'{stub.url}/coins/{m.coin_id}/market_chart')
+
+
+def test_frame_cache_hit_after_async_call(monkeypatch, stub, cache_db):
+    _stub_urls(monkeypatch, stub)
+    starting_dt = datetime.now(timezone.utc) - timedelta(days=1)
+
+    async def twice():
+        try:
+            return [await async_coingecko.get_historical_data_async(COIN, starting_dt) for _ in range(2)]
+        finally:
+            await async_http_client.aclose()
+
+    first, second = asyncio.run(twice())
+    assert first.attrs['sync_report'].rows_upserted > 0
+    assert second.attrs['sync_report'].rows_received == 0   # served by the frame cache
+    assert second.attrs['sync_report'].last_cached_ts == first.attrs['sync_report'].last_cached_ts
+    assert len(second) == len(first)
+
+    # the sync client shares the frame cache keys
+    third = coingecko.get_historical_data(COIN, starting_dt)
+    assert third.attrs['sync_report'].last_cached_ts == first.attrs['sync_report'].last_cached_ts
+
+
+def test_max_staleness_serves_the_cache_while_revalidating(monkeypatch, stub, cache_db):
+    _stub_urls(monkeypatch, stub)
+    starting_dt = datetime.now(timezone.utc) - timedelta(days=1)
+    coingecko.get_historical_data(COIN, starting_dt)
+    frame_cache.clear()
+
+    async def stale():
+        try:
+            return await async_coingecko.get_historical_data_async(COIN, starting_dt,
+                                                                   max_staleness=timedelta(hours=1))
+        finally:
+            await async_http_client.aclose()
+
+    frame = asyncio.run(stale())
+    assert frame.attrs['sync_report'].revalidating
+    assert frame.attrs['freshness'].revalidating
+    assert len(frame) > 0
+    assert frame_cache.stats().entries == 0   # outdated once the refresh lands, so not kept
@@ -0,0 +1,64 @@
+import asyncio
+import socket
+import time
+
+import pytest
+import requests
+
+from api_client import async_http_client
+from stub_coingecko import stub_coingecko
+
+
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(async_http_client, '_retry_policy', async_http_client._retry_policy.new(backoff_factor=0))
+
+
+def _get_all(urls):
+    async def get_all():
+        try:
+            return await asyncio.gather(*[async_http_client.get(url) for url in urls])
+        finally:
+            await async_http_client.aclose()
+
+    return asyncio.run(get_all())
+
+
+def test_requests_in_flight_are_capped(monkeypatch, slow_stub):
+    monkeypatch.setattr(async_http_client, 'ASYNC_MAX_CONCURRENCY', 2)
+
+    started = time.perf_counter()
+    _get_all([f'{slow_stub.url}/simple/supported_vs_currencies'] * 6)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed >= 3 * 0.3   # three waves of two 0.3 s round trips
+
+
+def test_throttled_requests_are_retried(monkeypatch, stub):
+    _no_backoff(monkeypatch)
+    with stub_coingecko(throttle_every=2, retry_after=0) as throttling:
+        results = _get_all([f'{throttling.url}/simple/supported_vs_currencies'] * 4)
+        assert throttling.throttled > 0
+
+    assert all('usd' in result for result in results)
+
+
+def test_status_errors_raise_requests_http_error(stub):
+    with pytest.raises(requests.HTTPError) as raised:
+        _get_all([f'{stub.url}/no/such/endpoint'])
+
+    assert raised.value.response.status_code == 404
+    assert raised.value.response.json() == {'error': 'Not found'}
+
+
+def test_exhausted_retries_raise_requests_errors(monkeypatch, stub):
+    _no_backoff(monkeypatch)
+    with stub_coingecko(throttle_every=1, retry_after=0) as throttling:
+        with pytest.raises(requests.HTTPError) as raised:
+            _get_all([f'{throttling.url}/simple/supported_vs_currencies'])
+    assert raised.value.response.status_code == 429
+
+    with socket.socket() as sock:   # a port nobody listens on
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        _get_all([f'http://127.0.0.1:{port}/simple/supported_vs_currencies'])
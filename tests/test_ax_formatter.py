@@ -0,0 +1,19 @@
+import matplotlib
+matplotlib.use('Agg')
+
+from matplotlib import pyplot as plt
+
+from visualizations.ax_formatter import AxFormatter
+
+
+def test_every_axis_gets_its_own_tickers():
+    formatter = AxFormatter()
+    first, second = plt.figure().gca(), plt.figure().gca()
+    formatter.format_ax(first)
+    formatter.format_ax(second)
+
+    for ax in (first, second):
+        assert ax.xaxis.get_major_locator().axis is ax.xaxis
+        assert ax.xaxis.get_major_formatter().axis is ax.xaxis
+        assert ax.yaxis.get_major_formatter().axis is ax.yaxis
+    plt.close('all')
@@ -0,0 +1,29 @@
+import numpy as np
+
+from cache import CacheManager
+from project_utils import CoinMetaData
+from visualizations.batch_render import render_charts, CHART_KINDS
+
+COIN = CoinMetaData('bitcoin', 'usd')
+HOUR_MS = 3_600_000
+
+
+def test_workers_render_from_the_configured_cache(cache_db, tmp_path, monkeypatch):
+    timestamps = 1_700_000_000_000 + np.arange(72) * HOUR_MS
+    prices = 100 + np.arange(72) % 24
+    with CacheManager(COIN, 'historical_data') as cache:
+        cache.upsert({'prices': np.c_[timestamps, prices].tolist(),
+                      'market_caps': np.c_[timestamps, prices * 1e9].tolist(),
+                      'total_volumes': np.c_[timestamps, prices * 1e6].tolist()})
+    with CacheManager(COIN, 'ohlc_data') as cache:
+        cache.upsert(np.c_[timestamps, prices, prices + 1, prices - 1, prices].tolist())
+
+    workdir = tmp_path / 'cwd'
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+
+    results = render_charts([COIN], output_dir=tmp_path / 'reports', max_workers=1)
+
+    assert [result.error for result in results] == [None] * len(CHART_KINDS)
+    assert all(result.path.exists() for result in results)
+    assert not (workdir / 'cache.db').exists()   # workers didn't fall back to the default cache
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from api_client import coingecko
+from cache import CacheManager, frame_cache
+from project_utils import CoinMetaData
+
+COIN = CoinMetaData('bitcoin', 'usd')
+
+
+def test_repeat_call_with_a_new_starting_dt_is_a_hit(monkeypatch, stub, cache_db):
+    monkeypatch.setattr(coingecko, '_market_chart_url', lambda m: f'{stub.url}/coins/{m.coin_id}/market_chart')
+
+    def fetch():
+        return coingecko.get_historical_data(COIN, datetime.now(timezone.utc) - timedelta(days=1))
+
+    first = fetch()
+    requests_before, stats_before = stub.requests, frame_cache.stats()
+    second = fetch()
+
+    assert frame_cache.stats().hits - stats_before.hits == 1
+    assert stub.requests == requests_before
+    assert second.attrs['sync_report'].rows_received == 0
+    assert second.index.equals(first.index)
+
+
+def test_read_options_still_key_the_frame(monkeypatch, stub, cache_db):
+    monkeypatch.setattr(coingecko, '_market_chart_url', lambda m: f'{stub.url}/coins/{m.coin_id}/market_chart')
+    starting_dt = datetime.now(timezone.utc) - timedelta(days=1)
+
+    full = coingecko.get_historical_data(COIN, starting_dt)
+    prices = coingecko.get_historical_data(COIN, starting_dt, columns=['price'])
+
+    assert 'market_cap' in full.columns
+    assert 'market_cap' not in prices.columns
+
+
+def test_writes_to_a_series_drop_its_frames(monkeypatch, stub, cache_db):
+    monkeypatch.setattr(coingecko, '_market_chart_url', lambda m: f'{stub.url}/coins/{m.coin_id}/market_chart')
+    first = coingecko.get_historical_data(COIN)
+    last_ts = int(first['timestamp'].iloc[-1])
+
+    stats_before = frame_cache.stats()
+    with CacheManager(COIN, 'historical_data') as cache:
+        cache.upsert({'prices': [[last_ts + 1, 1.0]], 'market_caps': [[last_ts + 1, 1.0]],
+                      'total_volumes': [[last_ts + 1, 1.0]]})
+    assert frame_cache.stats().invalidations - stats_before.invalidations == 1
+
+    assert last_ts + 1 in coingecko.get_historical_data(COIN)['timestamp'].to_numpy()
@@ -0,0 +1,24 @@
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+from api_client import http_client
+from project_utils import InMemoryMetrics, set_metrics
+from stub_coingecko import stub_coingecko
+
+
+def test_accept_encoding_offers_every_codec_urllib3_can_decode():
+    # requests lists br and zstd whenever brotli / zstandard are installed
+    assert http_client._session.headers['Accept-Encoding'] == DEFAULT_ACCEPT_ENCODING
+
+
+def test_compressed_responses_count_wire_bytes(stub):
+    metrics = InMemoryMetrics()
+    previous = set_metrics(metrics)
+    try:
+        with stub_coingecko(compress=True) as compressing:
+            _, size = http_client.get_with_size(f'{compressing.url}/coins/list')
+    finally:
+        set_metrics(previous)
+
+    wire_bytes = metrics.snapshot().counter('http_bytes_total', endpoint='list')
+    assert wire_bytes == compressing.bytes_sent
+    assert wire_bytes < size / 2
@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from api_client import RefreshScheduler, http_client
+from project_utils import CoinMetaData
+
+BITCOIN, ETHEREUM = CoinMetaData('bitcoin', 'usd'), CoinMetaData('ethereum', 'usd')
+
+
+def test_due_series_are_refreshed_in_priority_order(stub, cache_db):
+    scheduler = RefreshScheduler(api_url=stub.url)
+    scheduler.watch([BITCOIN, ETHEREUM], tables=['historical_data'])
+
+    results = scheduler.run_pending()
+    assert [result.series.coin_meta for result in results] == [BITCOIN, ETHEREUM]
+    assert all(result.error is None and result.report.rows_upserted > 0 for result in results)
+    assert scheduler.run_pending() == []   # nothing due until the tier's interval has passed
+
+    stats = scheduler.stats()
+    assert (stats.refreshes, stats.failures, stats.overdue) == (2, 0, 0)
+    assert stats.rows_upserted == sum(result.report.rows_upserted for result in results)
+
+
+def test_foreground_reads_of_warm_series_skip_the_network(stub, cache_db):
+    scheduler = RefreshScheduler(api_url=stub.url)
+    scheduler.watch([BITCOIN], tables=['historical_data'])
+    scheduler.run_pending()
+
+    requests_before = stub.requests
+    data, report = http_client.get_time_series(f'{stub.url}/coins/bitcoin/market_chart', BITCOIN,
+                                               datetime.now(timezone.utc) - timedelta(days=1), 'historical_data')
+    assert stub.requests == requests_before
+    assert report.rows_received == 0 and len(data) > 0
+
+    scheduler.unwatch([BITCOIN])
+    http_client.get_time_series(f'{stub.url}/coins/bitcoin/market_chart', BITCOIN, None, 'historical_data',
+                                delta=True)
+    assert stub.requests == requests_before + 1
+
+
+def test_budget_leaves_series_overdue(stub, cache_db):
+    scheduler = RefreshScheduler(calls_per_minute=1, api_url=stub.url)
+    scheduler.watch([BITCOIN, ETHEREUM], tables=['historical_data'])
+
+    assert len(scheduler.run_pending()) == 1
+    assert scheduler.stats().overdue == 1
+
+
+def test_failures_are_reported_and_retried_later(stub, cache_db):
+    scheduler = RefreshScheduler(api_url=f'{stub.url}/missing')   # the stub answers 404
+    scheduler.watch([BITCOIN], tables=['historical_data'])
+
+    [result] = scheduler.run_pending()
+    assert result.report is None and result.error is not None
+    stats = scheduler.stats()
+    assert (stats.refreshes, stats.failures, stats.overdue) == (0, 1, 0)
+
+
+def test_background_thread_keeps_the_watchlist_warm(stub, cache_db):
+    with RefreshScheduler(api_url=stub.url) as scheduler:
+        scheduler.watch([BITCOIN], tables=['historical_data'])
+        deadline = time.monotonic() + 10
+        while scheduler.stats().refreshes == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert scheduler.stats().refreshes == 1
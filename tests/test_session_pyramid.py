@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, select
+
+from cache import CacheManager, SessionPyramid, get_connection
+from cache.db_schema import ohlc_sessions, session_pyramids
+from data_prep import get_cached_session
+from project_utils import CoinMetaData, make_time_series_frame
+
+COIN = CoinMetaData('bitcoin', 'usd')
+START_MS = 1_700_000_000_000 - 1_700_000_000_000 % 86_400_000
+HOUR_MS = 3_600_000
+
+
+def _upsert(first_hour: int, n_hours: int) -> None:
+    timestamps = START_MS + np.arange(first_hour, first_hour + n_hours) * HOUR_MS
+    prices = 100 + np.arange(first_hour, first_hour + n_hours) % 24
+    with CacheManager(COIN, 'historical_data') as cache:
+        cache.upsert({'prices': np.c_[timestamps, prices].tolist(),
+                      'market_caps': np.c_[timestamps, prices * 1e9].tolist(),
+                      'total_volumes': np.c_[timestamps, prices * 1e6].tolist()})
+    with CacheManager(COIN, 'ohlc_data') as cache:
+        cache.upsert(np.c_[timestamps, prices, prices + 1, prices - 1, prices].tolist())
+
+
+def test_pyramid_is_built_for_caches_written_before_it(cache_db):
+    _upsert(0, 60 * 24)
+    expected = get_cached_session(COIN, '1D')
+    assert len(expected) == 60
+
+    # a cache written before the pyramid existed: raw rows only
+    with get_connection(immediate=True) as conn, conn.begin():
+        conn.execute(delete(ohlc_sessions))
+        conn.execute(delete(session_pyramids))
+
+    _upsert(60 * 24, 1)
+    sessions = get_cached_session(COIN, '1D')
+    assert len(sessions) == 61
+    assert sessions.iloc[:60].equals(expected)
+
+
+def _stored_bars() -> int:
+    with get_connection() as conn:
+        return conn.execute(select(func.count()).select_from(ohlc_sessions)).scalar()
+
+
+def test_upserts_defer_pyramid_work_to_the_next_read(cache_db):
+    _upsert(0, 3 * 24)
+    assert len(get_cached_session(COIN, '1D')) == 3
+    bars = _stored_bars()
+
+    _upsert(3 * 24, 2 * 24)
+    assert _stored_bars() == bars   # the write only marked the pyramid stale
+    with get_connection() as conn:
+        assert not SessionPyramid(COIN, conn).is_current()
+
+    sessions = get_cached_session(COIN, '1D')
+    assert len(sessions) == 5
+    assert sessions['total_volume'].iloc[-1] == sum(100 + h % 24 for h in range(24)) * 1e6
+
+
+def test_weekly_bars_start_on_mondays(cache_db):
+    _upsert(0, 30 * 24)
+    with get_connection() as conn:
+        hist, ohlc = (make_time_series_frame(CacheManager(COIN, table_name, conn=conn).fetch_columns(), COIN)
+                      for table_name in ('historical_data', 'ohlc_data'))
+
+    weeks = get_cached_session(COIN, '7D')
+    assert (weeks.index.dayofweek == 0).all()
+
+    expected = pd.DataFrame({
+        'open': ohlc['open'].resample('W-MON', closed='left', label='left').first(),
+        'high': ohlc['high'].resample('W-MON', closed='left', label='left').max(),
+        'low': ohlc['low'].resample('W-MON', closed='left', label='left').min(),
+        'close': ohlc['close'].resample('W-MON', closed='left', label='left').last(),
+        'total_volume': hist['total_volume'].resample('W-MON', closed='left', label='left').sum(),
+    })
+    assert np.allclose(weeks.to_numpy(), expected.to_numpy())
+    assert (weeks.index == expected.index).all()
@@ -0,0 +1,46 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from api_client import http_client, coalescing_stats
+from project_utils import CoinMetaData
+
+COIN = CoinMetaData('bitcoin', 'usd')
+
+
+def test_concurrent_refreshes_of_a_series_share_one_request(slow_stub, cache_db):
+    url = f'{slow_stub.url}/coins/{COIN.coin_id}/market_chart'
+    requests_before, stats_before = slow_stub.requests, coalescing_stats()
+    barrier = threading.Barrier(6)
+    reports = []
+
+    def fetch():
+        barrier.wait()
+        # every caller computes its own starting_dt, as the getters do
+        starting_dt = datetime.now(timezone.utc) - timedelta(days=1)
+        reports.append(http_client.get_time_series(url, COIN, starting_dt, 'historical_data')[1])
+
+    threads = [threading.Thread(target=fetch) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = coalescing_stats()
+    assert slow_stub.requests - requests_before == 1
+    assert stats.executions - stats_before.executions == 1
+    assert stats.coalesced - stats_before.coalesced == 5
+    assert len({report.rows_upserted for report in reports}) == 1
+
+
+def test_refresh_is_planned_with_the_earliest_starting_dt():
+    now = datetime.now(timezone.utc)
+    key = http_client._flight_key('url', COIN, 'historical_data', now - timedelta(days=1))
+    http_client._flight_key('url', COIN, 'historical_data', now - timedelta(days=7))
+    http_client._flight_key('url', COIN, 'historical_data', now - timedelta(days=3))
+
+    assert http_client._planned_starting_dt(key, now - timedelta(days=1)) == now - timedelta(days=7)
+    # taken by the leader: the next refresh starts from its own starting_dt again
+    assert http_client._planned_starting_dt(key, now - timedelta(days=1)) == now - timedelta(days=1)
+
+    http_client._flight_key('url', COIN, 'historical_data', None)   # DEFAULT_DAYS back
+    assert http_client._planned_starting_dt(key, now - timedelta(days=7)) is None